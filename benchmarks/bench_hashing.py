@@ -0,0 +1,58 @@
+"""Benchmark piece hashing throughput against the number of workers.
+
+Usage: python benchmarks/bench_hashing.py [size_mb] [piece_size_kb]
+
+Writes a temporary file of random data, then hashes it with torf's
+single-reader pipeline and with backend.hashing at 1, 2, 4, ... workers.
+The first pass warms the page cache, so the numbers show CPU scaling; run it
+against a file on the real output disk (with a cold cache) to find the point
+where the disk becomes the bottleneck.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from torf import Torrent  # noqa: E402
+
+from backend.hashing import hash_pieces  # noqa: E402
+
+
+def main():
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 512
+    piece_size = (int(sys.argv[2]) if len(sys.argv) > 2 else 4096) * 1024
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.bin")
+        with open(path, "wb") as fh:
+            for _ in range(size_mb):
+                fh.write(os.urandom(1024 * 1024))
+
+        # Warm the page cache
+        hash_pieces([path], piece_size, 1)
+
+        torrent = Torrent(path=path, piece_size=piece_size)
+        start = time.perf_counter()
+        torrent.generate()
+        elapsed = time.perf_counter() - start
+        print(f"torf generate()        : {size_mb / elapsed:8.1f} MB/s")
+
+        cores = os.cpu_count() or 1
+        workers = 1
+        baseline = None
+        while workers <= cores:
+            start = time.perf_counter()
+            pieces, _ = hash_pieces([path], piece_size, workers)
+            elapsed = time.perf_counter() - start
+            assert pieces == torrent.metainfo["info"]["pieces"]
+            rate = size_mb / elapsed
+            baseline = baseline or rate
+            print(f"hash_pieces workers={workers:<3}: {rate:8.1f} MB/s  ({rate / baseline:.2f}x)")
+            workers *= 2
+
+
+if __name__ == "__main__":
+    main()
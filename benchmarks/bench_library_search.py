@@ -0,0 +1,167 @@
+"""Benchmark library search at scale.
+
+Usage: python benchmarks/bench_library_search.py [count]
+
+Builds a library index of 100,000 synthetic torrents (by default) in a
+temporary directory, each with a release name, parsed title, technical
+fields and an NFO linking IMDb and TMDB ids, then times a mix of searches:
+titles, ids, technical fields, NFO text, short words, very common words and
+typos (the fuzzy fallback).  Fails if any query's median is over 10 ms.
+"""
+
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from backend.library import LibraryIndex, _parsed_columns  # noqa: E402
+
+BUDGET_MS = 10.0
+RUNS = 20
+
+WORDS = [
+    "Dark", "Night", "Return", "Empire", "Shadow", "Storm", "Silent", "River", "Broken", "Crown",
+    "Last", "City", "Ghost", "Winter", "Iron", "Glass", "Hidden", "Road", "Fire", "Ocean",
+    "Red", "Star", "Lost", "Kingdom", "Wild", "Echo", "Black", "Summer", "Steel", "Moon",
+]
+RESOLUTIONS = ["720p", "1080p", "2160p"]
+SOURCES = [("BluRay", "Blu-ray"), ("WEB-DL", "Web"), ("HDTV", "HDTV")]
+CODECS = [("x264", "H.264"), ("x265", "H.265")]
+HDR = ["", "HDR10", "DV"]
+GROUPS = ["SPARKS", "NTb", "FLUX", "GROUP", "RARBG", "CMRG"]
+
+
+def make_library(count: int, seed: int = 1):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        title_words = rng.sample(WORDS, rng.randint(1, 3)) + [f"T{i}"]
+        title = " ".join(title_words)
+        year = 1970 + i % 55
+        resolution = rng.choice(RESOLUTIONS)
+        source, parsed_source = rng.choice(SOURCES)
+        codec, parsed_codec = rng.choice(CODECS)
+        hdr = rng.choice(HDR)
+        group = rng.choice(GROUPS)
+        parts = [".".join(title_words)]
+        if i % 3 == 0:
+            media_type = "episode"
+            parts.append(f"S{i % 12 + 1:02}E{i % 24 + 1:02}")
+        elif i % 3 == 1:
+            media_type = "season"
+            parts.append(f"S{i % 12 + 1:02}")
+        else:
+            media_type = "movie"
+            parts.append(str(year))
+        parts += [resolution, source] + ([hdr] if hdr else []) + [codec]
+        name = ".".join(parts) + f"-{group}"
+
+        imdb_id = f"tt{1000000 + i}"
+        tmdb_id = str(500000 + i)
+        nfo = "\n".join([
+            f"Title       : {title}",
+            f"Year        : {year}",
+            f"Resolution  : {resolution}",
+            f"Video Codec : {parsed_codec}",
+            "Audio Codec : E-AC-3",
+            f"HDR Format  : {'Dolby Vision' if hdr == 'DV' else hdr or 'SDR'}",
+            f"IMDb        : https://www.imdb.com/title/{imdb_id}/",
+            f"TMDB        : https://www.themoviedb.org/movie/{tmdb_id}",
+            "",
+            f"Notes       : Encoded by {group}. Enjoy and seed!",
+        ])
+        parsed = {
+            "title": title, "year": year, "screen_size": resolution, "source": parsed_source,
+            "video_codec": parsed_codec, "release_group": group, "type": media_type,
+        }
+        if hdr:
+            parsed["other"] = ["HDR10"] if hdr == "HDR10" else ["Dolby Vision"]
+        rows.append(({
+            "path": f"/library/{media_type}s/{name}",
+            "name": name,
+            "media_type": media_type,
+            "file_count": 2,
+            "total_size": rng.randint(1, 80) * 1024 ** 3,
+            "ctime": 1700000000.0 + i,
+            "mtime_ns": i,
+            "torrent_mtime_ns": i,
+            "infohash": f"{i:040x}",
+            "infohash_v2": None,
+            "nfo": nfo,
+            "ids": f"{imdb_id} {tmdb_id}",
+        }, parsed))
+    return rows
+
+
+def build_index(path: str, rows: list) -> LibraryIndex:
+    index = LibraryIndex(path)
+    with index._connection() as conn:
+        for row, parsed in rows:
+            index._upsert(conn, row, 1)
+            columns = _parsed_columns(parsed)
+            conn.execute(
+                "UPDATE torrents SET parsed = ?, title = ?, year = ?, season = ?, resolution = ?, "
+                "source = ?, video_codec = ?, tech = ? WHERE path = ?",
+                (columns["parsed"], columns["title"], columns["year"], columns["season"],
+                 columns["resolution"], columns["source"], columns["video_codec"], columns["tech"],
+                 row["path"]),
+            )
+        conn.execute("UPDATE meta SET version = 1")
+        conn.commit()
+    return index
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    rows = make_library(count)
+    middle = count // 2
+    queries = [
+        ("title word", "Kingdom"),
+        ("title, unique", f"T{middle}"),
+        ("imdb id", f"tt{1000000 + middle}"),
+        ("tmdb id", str(500000 + middle)),
+        ("tech fields", "2160p HDR10 x265"),
+        ("nfo text", "Dolby Vision"),
+        ("title + tech", "Ghost Winter 1080p"),
+        ("short word", "DV"),
+        ("word start", "Kingd"),
+        ("common word", "seed"),
+        ("part of a word", "ingdo"),
+        ("typo (fuzzy)", f"Kingdon T{middle}"),
+        ("no match", "zzqqxx"),
+    ]
+
+    tmp = tempfile.mkdtemp(prefix="bench-library-")
+    try:
+        start = time.perf_counter()
+        index = build_index(os.path.join(tmp, "library.db"), rows)
+        print(f"Indexed {count} torrents in {time.perf_counter() - start:.1f} s")
+        print(f"Tokenizer: {'trigram' if index.trigram else 'unicode61 (prefix match)'}")
+
+        failed = False
+        for label, q in queries:
+            index.search(q)  # warm the page cache
+            timings = []
+            for _ in range(RUNS):
+                start = time.perf_counter()
+                result = index.search(q)
+                timings.append((time.perf_counter() - start) * 1000)
+            median = statistics.median(timings)
+            over = median > BUDGET_MS
+            failed = failed or over
+            print(f"  {label:14} {q!r:28} {median:7.2f} ms median  {max(timings):7.2f} ms max  "
+                  f"{len(result['results']):3} results{' (fuzzy)' if result['fuzzy'] else ''}"
+                  f"{'  OVER BUDGET' if over else ''}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Benchmark the native container header reader against ffprobe.
+
+Usage: python benchmarks/bench_metadata.py [video files...]
+
+Without arguments, a 4K HDR10 HEVC/E-AC-3 Matroska file and a 1080p
+H.264/AAC MP4 are synthesised (headers followed by a large sparse payload) in
+a temporary directory.  Each file is read with container.read_container_info
+and, if ffprobe is installed, probed with ffprobe; the resulting metadata
+fields are printed side by side and any difference is reported.
+"""
+
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from backend import container  # noqa: E402
+from backend.metadata import _apply_ffprobe_data, _empty_metadata, probe_file_metadata  # noqa: E402
+
+ITERATIONS = 200
+PAYLOAD_SIZE = 2 * 1024 ** 3
+
+
+def _ebml(element_id: int, payload: bytes) -> bytes:
+    return element_id.to_bytes((element_id.bit_length() + 7) // 8, "big") + b"\x01" + len(payload).to_bytes(7, "big") + payload
+
+
+def _ebml_uint(element_id: int, value: int) -> bytes:
+    return _ebml(element_id, value.to_bytes(max(1, (value.bit_length() + 7) // 8), "big"))
+
+
+def write_mkv(path: str):
+    hvcc = bytearray(23)
+    hvcc[0] = 1
+    hvcc[17] = 0xF8 | 2  # bitDepthLumaMinus8 = 2
+    video = _ebml(container.TRACK_ENTRY, b"".join([
+        _ebml_uint(container.TRACK_TYPE, 1),
+        _ebml(container.CODEC_ID, b"V_MPEGH/ISO/HEVC"),
+        _ebml(container.CODEC_PRIVATE, bytes(hvcc)),
+        _ebml(container.VIDEO, b"".join([
+            _ebml_uint(container.PIXEL_WIDTH, 3840),
+            _ebml_uint(container.PIXEL_HEIGHT, 2160),
+            _ebml(container.COLOUR, b"".join([
+                _ebml_uint(container.MATRIX_COEFFICIENTS, 9),
+                _ebml_uint(container.TRANSFER_CHARACTERISTICS, 16),
+            ])),
+        ])),
+    ]))
+    audio = _ebml(container.TRACK_ENTRY, b"".join([
+        _ebml_uint(container.TRACK_TYPE, 2),
+        _ebml(container.CODEC_ID, b"A_EAC3"),
+        _ebml(container.AUDIO, _ebml_uint(container.CHANNELS, 6)),
+    ]))
+    segment = b"".join([
+        _ebml(container.INFO, _ebml_uint(container.TIMESTAMP_SCALE, 1000000)
+              + _ebml(container.DURATION, struct.pack(">d", 2712345.0))),
+        _ebml(container.TRACKS, video + audio),
+        # Unknown-size cluster standing in for the media data
+        container.CLUSTER.to_bytes(4, "big") + b"\x01\xff\xff\xff\xff\xff\xff\xff",
+    ])
+    with open(path, "wb") as fh:
+        fh.write(_ebml(container.EBML_HEADER, _ebml(container.DOC_TYPE, b"matroska")))
+        fh.write(container.SEGMENT.to_bytes(4, "big") + b"\x01\xff\xff\xff\xff\xff\xff\xff" + segment)
+        fh.truncate(PAYLOAD_SIZE)
+
+
+def _box(box_type: bytes, payload: bytes) -> bytes:
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+
+def _track(handler: bytes, entry: bytes) -> bytes:
+    hdlr = _box(b"hdlr", bytes(8) + handler + bytes(12) + b"\0")
+    stsd = _box(b"stsd", bytes(4) + struct.pack(">I", 1) + entry)
+    return _box(b"trak", _box(b"mdia", hdlr + _box(b"minf", _box(b"stbl", stsd))))
+
+
+def write_mp4(path: str):
+    avcc = bytes([1, 100, 0, 40, 0xFF, 0xE0, 0, 0xFD, 0xF8, 0xF8, 0])
+    avc1 = _box(b"avc1", bytes(24) + struct.pack(">HH", 1920, 1080) + bytes(50) + _box(b"avcC", avcc))
+    asc = bytes([0x11, 0xB0])  # AAC LC, 48 kHz, channel configuration 6
+    decoder_config = bytes([0x04, 13 + 2 + len(asc), 0x40, 0x15]) + bytes(11) + bytes([0x05, len(asc)]) + asc
+    es_descriptor = bytes([0x03, 3 + len(decoder_config), 0, 1, 0]) + decoder_config
+    mp4a = _box(b"mp4a", bytes(16) + struct.pack(">HH", 2, 16) + bytes(8) + _box(b"esds", bytes(4) + es_descriptor))
+    mvhd = _box(b"mvhd", bytes(12) + struct.pack(">II", 1000, 5400000) + bytes(80))
+    with open(path, "wb") as fh:
+        fh.write(_box(b"ftyp", b"isom" + bytes(4) + b"isomavc1"))
+        fh.write(_box(b"moov", mvhd + _track(b"vide", avc1) + _track(b"soun", mp4a)))
+        fh.write(struct.pack(">I4s", 0, b"mdat"))
+        fh.truncate(PAYLOAD_SIZE)
+
+
+def main():
+    files = sys.argv[1:]
+    tmp = None
+    if not files:
+        tmp = tempfile.TemporaryDirectory()
+        files = [os.path.join(tmp.name, "fixture.mkv"), os.path.join(tmp.name, "fixture.mp4")]
+        write_mkv(files[0])
+        write_mp4(files[1])
+
+    have_ffprobe = shutil.which("ffprobe") is not None
+    if not have_ffprobe:
+        print("ffprobe not found - timing the native reader only\n")
+
+    for path in files:
+        print(os.path.basename(path))
+        start = time.perf_counter()
+        for _ in range(ITERATIONS):
+            data = container.read_container_info(path)
+        native_ms = (time.perf_counter() - start) / ITERATIONS * 1000
+        if data is None:
+            print("  native : cannot answer (would fall back to ffprobe)")
+            native = None
+        else:
+            native = _empty_metadata(path)
+            _apply_ffprobe_data(native, data)
+            print(f"  native : {native_ms:8.3f} ms  {native}")
+
+        if have_ffprobe:
+            start = time.perf_counter()
+            ffprobe, probed = probe_file_metadata(path, native=False)
+            ffprobe_ms = (time.perf_counter() - start) * 1000
+            print(f"  ffprobe: {ffprobe_ms:8.3f} ms  {ffprobe}")
+            if native is not None and probed and native != ffprobe:
+                differing = [k for k in native if native[k] != ffprobe[k]]
+                print(f"  MISMATCH in {', '.join(differing)}")
+
+    if tmp is not None:
+        tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Benchmark naming template rendering.
+
+Usage: python benchmarks/bench_naming.py [count]
+
+Renders names for 10,000 episodes (by default) three ways: the previous
+str.replace/re.sub implementation of apply_episode_template, the compiled
+template one call at a time, and render_many over the whole batch.  The
+season pack file names from the default episode_file template are also
+checked against the f-string that built them before, including episodes
+with no release group, resolution, source or codec.  The outputs are
+compared, so a difference in behaviour fails the run.
+"""
+
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from backend.naming import DEFAULT_TEMPLATES, compile_template, render_many, render_template  # noqa: E402
+
+TEMPLATES = [
+    DEFAULT_TEMPLATES["episode"],
+    "{title} - {season}x{episode:02} - {episode_title} [{quality}]",
+    "{title}.S{season:02}E{episode:03}.{year}.{quality}.{source}.{codec}-{group}",
+]
+
+
+def legacy_episode_template(template: str, details: dict) -> str:
+    """apply_episode_template as it was before templates were compiled."""
+    show_name = details.get("show_name", details.get("name", "Unknown")).replace(" ", ".")
+    episode_title = details.get("episode_title", "").replace(" ", ".")
+    season = details.get("season", 0)
+    episode = details.get("episode", 0)
+
+    result = template
+    result = result.replace("{title}", show_name)
+    result = result.replace("{year}", details.get("year", ""))
+    result = result.replace("{quality}", details.get("resolution", ""))
+    result = result.replace("{source}", details.get("source", ""))
+    result = result.replace("{codec}", details.get("video_codec", ""))
+    result = result.replace("{group}", details.get("release_group", ""))
+    result = result.replace("{episode_title}", episode_title)
+
+    def replace_formatted(match):
+        val = int(season) if match.group(1) == "season" else int(episode)
+        try:
+            return format(val, match.group(2))
+        except (ValueError, TypeError):
+            return str(val)
+
+    result = re.sub(r"\{(season|episode):([^}]+)\}", replace_formatted, result)
+    result = result.replace("{season}", str(season))
+    result = result.replace("{episode}", str(episode))
+    while ".." in result:
+        result = result.replace("..", ".")
+    result = result.replace(".-", "-")
+    return result.strip(".")
+
+
+def legacy_episode_file_name(details: dict) -> str:
+    """The season pack file name as create.py built it before the episode_file template.
+
+    The show name is dotted, as the template does (the one intended change).
+    """
+    new_filename = f"{details['show_name'].replace(' ', '.')}.S{details['season']:02d}E{details['episode']:02d}"
+    if details.get("resolution"):
+        new_filename += f".{details['resolution']}"
+    if details.get("source"):
+        new_filename += f".{details['source']}"
+    if details.get("video_codec"):
+        new_filename += f".{details['video_codec']}"
+    if details.get("release_group"):
+        new_filename += f"-{details['release_group']}"
+    return new_filename
+
+
+def make_episodes(count: int) -> list:
+    episodes = []
+    for i in range(count):
+        episodes.append({
+            "show_name": f"Show Number {i % 97}",
+            "season": i % 30 + 1,
+            "episode": i % 250 + 1,
+            "episode_title": "" if i % 5 == 0 else f"Episode Title {i}",
+            "year": "" if i % 7 == 0 else str(1990 + i % 35),
+            "resolution": ["1080p", "720p", "2160p", ""][i % 4],
+            "source": ["WEB-DL", "BluRay", ""][i % 3],
+            "video_codec": ["x264", "x265", "H.264", ""][i % 4 if i % 13 == 0 else i % 3],
+            "release_group": "" if i % 11 == 0 else "GROUP",
+        })
+    return episodes
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    episodes = make_episodes(count)
+    failed = False
+
+    for template in TEMPLATES:
+        compile_template.cache_clear()
+        legacy, legacy_s = timed(lambda: [legacy_episode_template(template, d) for d in episodes])
+        single, single_s = timed(lambda: [render_template(template, "episode", d) for d in episodes])
+        many, many_s = timed(lambda: render_many(template, "episode", episodes))
+
+        print(template)
+        print(f"  legacy replace chain : {legacy_s * 1000:8.1f} ms")
+        print(f"  compiled, per call   : {single_s * 1000:8.1f} ms  ({legacy_s / single_s:.1f}x)")
+        print(f"  compiled, render_many: {many_s * 1000:8.1f} ms  ({legacy_s / many_s:.1f}x)")
+        mismatches = sum(1 for a, b, c in zip(legacy, single, many) if not a == b == c)
+        if mismatches:
+            failed = True
+            print(f"  MISMATCHES: {mismatches}")
+
+    file_episodes = episodes + [{
+        "show_name": "Breaking Bad", "season": 1, "episode": 2, "resolution": "1080p",
+        "source": "WEB", "video_codec": "x264", "release_group": "",
+    }]
+    legacy = [legacy_episode_file_name(d) for d in file_episodes]
+    many = render_many(DEFAULT_TEMPLATES["episode_file"], "episode_file", file_episodes)
+    mismatches = [(a, b) for a, b in zip(legacy, many) if a != b]
+    no_group = sum(1 for d in file_episodes if not d["release_group"])
+    print(f"{DEFAULT_TEMPLATES['episode_file']}")
+    print(f"  vs old season pack f-string: {len(file_episodes)} names ({no_group} without a group), "
+          f"{len(mismatches)} mismatches")
+    for old, new in mismatches[:5]:
+        print(f"    {old!r} != {new!r}")
+    failed = failed or bool(mismatches)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Benchmark batch filename parsing throughput.
+
+Usage: python benchmarks/bench_parse_batch.py [count]
+
+Parses a corpus of release-style filenames (1,000 by default) one at a time
+with parse_name, the way the batch flow used to call /parse per file, and
+then with parse_batch across a warm process pool of 1, 2, 4, ... workers.
+The parse cache is cleared before each run so every name is really parsed.
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from backend import parsing  # noqa: E402
+
+from filename_corpus import make_corpus  # noqa: E402
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    names = make_corpus(count)
+
+    # Build guessit's rules before timing anything
+    parsing.parse_name(parsing.WARMUP_NAME)
+
+    parsing._cache.clear()
+    start = time.perf_counter()
+    for name in names:
+        parsing.parse_name(name)
+    elapsed = time.perf_counter() - start
+    baseline = count / elapsed
+    print(f"parse_name sequential   : {baseline:8.1f} names/s")
+
+    cores = os.cpu_count() or 1
+    workers = 1
+    while workers <= cores:
+        pool = parsing.start_parse_pool({"parsing": {"workers": workers}})
+        # Wait until every worker has spawned and warmed up
+        for future in [pool.submit(parsing._pool_worker_ready) for _ in range(workers)]:
+            future.result()
+
+        parsing._cache.clear()
+        start = time.perf_counter()
+        results = parsing.parse_batch(names, workers)
+        elapsed = time.perf_counter() - start
+        assert len(results) == count
+        rate = count / elapsed
+        print(f"parse_batch workers={workers:<3}: {rate:8.1f} names/s  ({rate / baseline:.2f}x)")
+        parsing.shutdown_parse_pool()
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
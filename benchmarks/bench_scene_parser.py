@@ -0,0 +1,114 @@
+"""Check the scene fast path against guessit and time both.
+
+Usage: python benchmarks/bench_scene_parser.py [count]
+
+Builds a corpus (20,000 names by default) from filename_corpus plus names
+with awkward titles, tags and release groups, rendered both in the scene
+layout and through a set of naming templates.  Every name the fast path
+answers must give exactly the dict guessit gives; any difference is printed
+and the script exits non-zero.  Also reports how many names the fast path
+covers and the per-name latency of each parser.
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from guessit import guessit  # noqa: E402
+
+from backend.config import DEFAULT_CONFIG  # noqa: E402
+from backend.scene_parser import TAGS, ScenePatterns  # noqa: E402
+
+from filename_corpus import make_corpus  # noqa: E402
+
+# Titles that collide with languages, countries, services, editions, ...
+AWKWARD_TITLES = [
+    "This Is Us", "The Office US", "It", "Us", "French Connection", "English Teacher",
+    "Mad Max", "Dune Part Two", "Proper Job", "The Final Countdown", "Pilot Season",
+    "Extended Family", "Limited Edition", "Complete Unknown", "Hulu Nights", "Netflix Party",
+    "The Criterion", "Dual Survival", "The Italian Job", "Spanish Princess", "True Grit",
+    "A Quiet Place", "Pride and Prejudice", "Lord of the Rings", "Once Upon a Time in Hollywood",
+    "The Boys", "Vikings", "Sherlock", "Doctor Who", "The Wire", "Lost", "Friends",
+    "Hacks", "Invincible", "Reacher", "Silo", "Foundation", "Dexter", "Yellowstone",
+    "Fallout", "Arcane", "Loki", "Hawkeye", "Wednesday", "Euphoria", "Ozark",
+    "Mindhunter", "Westworld", "Monk", "Bones", "House", "Scrubs", "Cheers",
+    "Community", "Glee", "Heroes", "Fringe", "Alias", "Angel", "Lucifer", "Limitless",
+    "The Expanse", "The Crown", "The Americans", "The Sopranos", "The Leftovers",
+]
+AWKWARD_GROUPS = [
+    "GROUP", "DL", "Rip", "HD", "AMZN", "NF", "PROPER", "DUAL", "MULTI", "FRENCH",
+    "EN", "RARBG", "YTS", "TGx", "ION10", "NOGRP", "DON", "FGT", "ETHEL", "SMURF",
+]
+TEMPLATES = {
+    "movie": "{title} ({year}) [{quality}] [{source}]",
+    "episode": "{title} - S{season:02}E{episode:02} - {quality}",
+    "season": "{title}_S{season:02}_{quality}_{codec}-{group}",
+}
+
+
+def _awkward_names(count: int, seed: int = 1) -> list:
+    rng = random.Random(seed)
+    tags = [tag for kind in TAGS.values() for tag in kind]
+    names = []
+    for i in range(count):
+        title = rng.choice(AWKWARD_TITLES)
+        dotted = title.replace(" ", ".")
+        if rng.random() < 0.3:
+            dotted = dotted.lower()
+        year = rng.randint(1915, 2032)
+        season, episode = rng.randint(0, 30), rng.randint(0, 120)
+        picked = ".".join(rng.sample(tags, rng.randint(0, 4)))
+        group = rng.choice(AWKWARD_GROUPS)
+        ext = rng.choice([".mkv", ".mp4", ".avi", ".MKV", ""])
+        layout = i % 6
+        if layout == 0:
+            names.append(f"{dotted}.{year}.{picked}-{group}{ext}")
+        elif layout == 1:
+            names.append(f"{dotted}.S{season:02d}E{episode:02d}.{picked}-{group}{ext}")
+        elif layout == 2:
+            names.append(f"{dotted}.S{season:02d}.{picked}-{group}")
+        elif layout == 3:
+            names.append(f"{title} ({year}) [{rng.choice(list(TAGS['screen_size']))}] [{rng.choice(list(TAGS['source']))}]{ext}")
+        elif layout == 4:
+            names.append(f"{title} - S{season:02d}E{episode:02d} - {rng.choice(list(TAGS['screen_size']))}{ext}")
+        else:
+            names.append(f"{dotted.replace('.', '_')}_S{season:02d}_{rng.choice(list(TAGS['screen_size']))}_x265-{group}")
+    return [name.replace("..", ".").replace(".-", "-") for name in names]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    names = list(dict.fromkeys(make_corpus(count // 2) + _awkward_names(count // 2)))
+    patterns = ScenePatterns({**DEFAULT_CONFIG["naming_templates"], **{f"custom_{k}": v for k, v in TEMPLATES.items()}})
+    guessit(names[0])
+
+    start = time.perf_counter()
+    fast = [patterns.parse(name) for name in names]
+    fast_elapsed = time.perf_counter() - start
+
+    covered = [(name, parsed) for name, parsed in zip(names, fast) if parsed is not None]
+    start = time.perf_counter()
+    expected = [dict(guessit(name)) for name, _ in covered]
+    guessit_elapsed = time.perf_counter() - start
+
+    mismatches = 0
+    for (name, parsed), reference in zip(covered, expected):
+        if parsed != reference:
+            mismatches += 1
+            if mismatches <= 20:
+                print(f"MISMATCH {name}\n  fast:    {parsed}\n  guessit: {reference}")
+
+    print(f"names            : {len(names)}")
+    print(f"fast path covers : {len(covered)} ({len(covered) / len(names):.1%})")
+    print(f"fast path        : {fast_elapsed / len(names) * 1e6:8.1f} us/name")
+    if covered:
+        print(f"guessit          : {guessit_elapsed / len(covered) * 1e6:8.1f} us/name")
+    print(f"mismatches       : {mismatches}")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Benchmark TMDB lookups served from the response cache.
+
+Usage: python benchmarks/bench_tmdb_cache.py [latency_ms]
+
+Points routes/tmdb.py at a local TMDB stub (see tmdb_stub.py) answering in
+latency_ms (20 by default) and at a cache in a temporary directory, then
+times the lookups a batch of episodes makes: a search, the show, a season
+and its episodes.  Each is timed uncached, cached, and after expiring so it
+is revalidated with its ETag (a 304 from the stub).  Fails if a cached
+lookup's median is over 1 ms.
+"""
+
+import asyncio
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend import tmdb_cache  # noqa: E402
+from backend.routes.tmdb import _tmdb_get  # noqa: E402
+from backend.tmdb_client import close_tmdb_client, start_tmdb_client  # noqa: E402
+from tmdb_stub import StubServer  # noqa: E402
+
+BUDGET_MS = 1.0
+RUNS = 200
+
+LOOKUPS = [
+    ("search", "/search/tv", {"query": "Some Show", "include_adult": False}),
+    ("tv", "/tv/1399", {}),
+    ("season", "/tv/1399/season/1", {}),
+] + [("episode", f"/tv/1399/season/1/episode/{n}", {}) for n in (1, 2, 3)]
+
+
+async def timed(path: str, params: dict, kind: str) -> float:
+    start = time.perf_counter()
+    await _tmdb_get(path, {"api_key": "bench", **params}, kind)
+    return (time.perf_counter() - start) * 1000
+
+
+def expire_all(cache):
+    with cache._lock:
+        cache._conn.execute("UPDATE responses SET expires = 0")
+        cache._conn.commit()
+
+
+async def run(latency_ms: float) -> bool:
+    tmp = tempfile.mkdtemp(prefix="bench-tmdb-cache-")
+    cache = tmdb_cache._cache = tmdb_cache.TMDBCache(os.path.join(tmp, "tmdb-cache.db"))
+    failed = False
+    try:
+        with StubServer(0.0, latency_ms / 1000) as stub:
+            start_tmdb_client(stub.base_url)
+            print(f"Stub TMDB: {latency_ms:g} ms per response")
+            print(f"  {'lookup':34} {'uncached':>9} {'cached':>9} {'revalidated':>12}")
+            uncached = {path: await timed(path, params, kind) for kind, path, params in LOOKUPS}
+
+            cached = {}
+            for kind, path, params in LOOKUPS:
+                cached[path] = statistics.median([await timed(path, params, kind) for _ in range(RUNS)])
+
+            expire_all(cache)
+            revalidated = {path: await timed(path, params, kind) for kind, path, params in LOOKUPS}
+
+            for kind, path, params in LOOKUPS:
+                over = cached[path] > BUDGET_MS
+                failed = failed or over
+                print(f"  {path:34} {uncached[path]:7.2f}ms {cached[path]:7.3f}ms {revalidated[path]:10.2f}ms"
+                      f"{'  OVER BUDGET' if over else ''}")
+            print(f"Upstream requests: {sum(stub.hits.values())} ({stub.not_modified} answered 304) "
+                  f"for {len(LOOKUPS) * (RUNS + 2)} lookups")
+            print(f"Cache: {cache.stats()}")
+    finally:
+        await close_tmdb_client()
+        shutil.rmtree(tmp, ignore_errors=True)
+    return not failed
+
+
+def main():
+    latency_ms = float(sys.argv[1]) if len(sys.argv) > 1 else 20.0
+    sys.exit(0 if asyncio.run(run(latency_ms)) else 1)
+
+
+if __name__ == "__main__":
+    main()
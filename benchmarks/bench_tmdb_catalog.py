@@ -0,0 +1,144 @@
+"""Benchmark importing and searching the local TMDB catalog.
+
+Usage: python benchmarks/bench_tmdb_catalog.py [movies] [shows]
+
+Writes synthetic TMDB daily ID exports the size of the real ones (1,000,000
+movies and 170,000 shows by default) to a temporary directory, imports them
+with tmdb_catalog.py, and reports import time and peak memory.  Then times
+searches of each sort the renderer sends: whole titles, short titles, common
+words, partial words and typos.  Fails if a known title isn't the top
+result or a sort of search has a median over BUDGET_MS.
+"""
+
+import gzip
+import json
+import os
+import random
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from backend.tmdb_catalog import TMDBCatalog  # noqa: E402
+
+BUDGET_MS = 25.0
+RUNS = 20
+
+WORDS = (
+    "the of a and in love night man last day dark house dead world star life lost city girl blood "
+    "black king war time home story secret red river road return power dream ghost wild little "
+    "great summer winter moon fire shadow heart island big street good american hunter angel "
+    "devil zero blue silent golden empire legend final escape"
+).split()
+
+# Real titles planted among the synthetic ones: (kind, title, popularity)
+KNOWN = [
+    ("movie", "The Matrix", 80.0),
+    ("movie", "The Matrix Reloaded", 45.0),
+    ("movie", "Up", 60.0),
+    ("movie", "Avatar", 120.0),
+    ("movie", "Spider-Man: Into the Spider-Verse", 90.0),
+    ("movie", "Amélie", 30.0),
+    ("tv", "Breaking Bad", 250.0),
+    ("tv", "The Wire", 70.0),
+    ("tv", "Game of Thrones", 300.0),
+    ("tv", "Ted Lasso", 40.0),
+]
+
+# (label, kind, query, expected top title or None)
+QUERIES = [
+    ("whole title", "movie", "the matrix", "The Matrix"),
+    ("whole title", "tv", "Breaking Bad", "Breaking Bad"),
+    ("whole title", "movie", "spider man into the spider verse", "Spider-Man: Into the Spider-Verse"),
+    ("short title", "movie", "up", "Up"),
+    ("short title", "tv", "ted lasso", "Ted Lasso"),
+    ("common words", "movie", "the night", None),
+    ("common words", "tv", "love", None),
+    ("partial word", "movie", "avat", "Avatar"),
+    ("partial word", "tv", "game of thro", "Game of Thrones"),
+    ("typo", "movie", "the matrx", "The Matrix"),
+    ("typo", "tv", "braking bad", "Breaking Bad"),
+    ("typo", "movie", "amelie", "Amélie"),
+]
+
+
+def write_export(path: str, kind: str, count: int, rng: random.Random):
+    title_field = "original_title" if kind == "movie" else "original_name"
+    planted = {rng.randrange(count): (title, popularity) for k, title, popularity in KNOWN if k == kind}
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        for n in range(count):
+            if n in planted:
+                title, popularity = planted[n]
+            else:
+                title = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 5))).title()
+                if rng.random() < 0.3:
+                    title += f" {rng.randint(2, 2000)}"
+                # Most titles are barely looked at; a few are very popular
+                popularity = round(min(rng.lognormvariate(-0.5, 1.5), 60.0), 3)
+            entry = {"adult": rng.random() < 0.02, "id": n + 1, title_field: title, "popularity": popularity}
+            if kind == "movie":
+                entry["video"] = False
+            f.write(json.dumps(entry) + "\n")
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def main():
+    movies = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    shows = int(sys.argv[2]) if len(sys.argv) > 2 else 170_000
+    tmp = tempfile.mkdtemp(prefix="bench-tmdb-catalog-")
+    failed = False
+    try:
+        rng = random.Random(25)
+        exports = {
+            "movie": os.path.join(tmp, "movie_ids_01_01_2026.json.gz"),
+            "tv": os.path.join(tmp, "tv_series_ids_01_01_2026.json.gz"),
+        }
+        write_export(exports["movie"], "movie", movies, rng)
+        write_export(exports["tv"], "tv", shows, rng)
+
+        catalog = TMDBCatalog(os.path.join(tmp, "tmdb-catalog.db"))
+        print(f"Peak memory before import: {peak_rss_mb():.0f} MB")
+        for kind, path in exports.items():
+            result = catalog.import_export(path, kind)
+            print(f"  imported {result['rows']:>9,} {kind:5} titles ({result['skipped']:,} skipped) "
+                  f"from {os.path.getsize(path) / 1e6:.1f} MB in {result['seconds']:.1f} s; "
+                  f"peak memory {peak_rss_mb():.0f} MB")
+        print(f"Catalog: {os.path.getsize(catalog.path) / 1e6:.0f} MB")
+
+        print(f"  {'search':14} {'kind':5} {'query':34} {'median':>8} {'p95':>8}  top result")
+        by_label = {}
+        for label, kind, query, expected in QUERIES:
+            timings = []
+            for _ in range(RUNS):
+                start = time.perf_counter()
+                results = catalog.search(kind, query)
+                timings.append((time.perf_counter() - start) * 1000)
+            median = statistics.median(timings)
+            p95 = sorted(timings)[int(len(timings) * 0.95) - 1]
+            by_label.setdefault(label, []).append(median)
+            top = results[0]["title"] if results else "(none)"
+            wrong = expected is not None and top != expected
+            failed = failed or wrong
+            print(f"  {label:14} {kind:5} {query!r:34} {median:6.2f}ms {p95:6.2f}ms  {top}"
+                  f"{'  EXPECTED ' + expected if wrong else ''}")
+
+        for label, medians in by_label.items():
+            over = statistics.median(medians) > BUDGET_MS
+            failed = failed or over
+            if over:
+                print(f"  {label}: median {statistics.median(medians):.2f} ms is OVER BUDGET ({BUDGET_MS:g} ms)")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Benchmark TMDB lookups with a client per request against the shared client.
+
+Usage: python benchmarks/bench_tmdb_client.py [handshake_ms] [latency_ms]
+
+Runs a local TMDB stub (see tmdb_stub.py) that charges handshake_ms (20 by
+default) for each new connection and latency_ms (5) for each response, then
+times single lookups one after another and a burst of 50 concurrent lookups,
+first opening a new httpx.AsyncClient for every request as routes/tmdb.py
+used to, then through the shared pooled client in tmdb_client.py.
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend.tmdb_client import HAS_HTTP2, close_tmdb_client, get_tmdb_client, start_tmdb_client  # noqa: E402
+from tmdb_stub import StubServer  # noqa: E402
+
+SEQUENTIAL = 30
+BURST = 50
+
+
+async def fresh_client_get(base_url: str, path: str) -> dict:
+    async with httpx.AsyncClient() as client:
+        response = await client.get(f"{base_url}{path}", params={"api_key": "bench"})
+        return response.json()
+
+
+async def shared_client_get(base_url: str, path: str) -> dict:
+    # The client on its own, without the response cache in front of it
+    response = await get_tmdb_client().get(path, params={"api_key": "bench"})
+    return response.json()
+
+
+async def measure(get, base_url: str) -> tuple:
+    timings = []
+    for i in range(SEQUENTIAL):
+        start = time.perf_counter()
+        await get(base_url, f"/movie/{i}")
+        timings.append((time.perf_counter() - start) * 1000)
+    start = time.perf_counter()
+    await asyncio.gather(*(get(base_url, f"/tv/{i}/season/1") for i in range(BURST)))
+    burst = (time.perf_counter() - start) * 1000
+    return statistics.median(timings), burst
+
+
+async def run(handshake_ms: float, latency_ms: float):
+    with StubServer(handshake_ms / 1000, latency_ms / 1000) as stub:
+        print(f"Stub TMDB: {handshake_ms:g} ms per new connection, {latency_ms:g} ms per response")
+        print(f"HTTP/2: {'available' if HAS_HTTP2 else 'not installed (pip install h2)'}; stub speaks HTTP/1.1")
+
+        before = stub.connections
+        per_call, burst = await measure(fresh_client_get, stub.base_url)
+        fresh_connections = stub.connections - before
+        print(f"  client per request  {per_call:7.2f} ms per lookup  {burst:8.1f} ms for {BURST} at once  "
+              f"{fresh_connections} connections")
+
+        start_tmdb_client(stub.base_url)
+        try:
+            before = stub.connections
+            per_call, burst = await measure(shared_client_get, stub.base_url)
+            shared_connections = stub.connections - before
+        finally:
+            await close_tmdb_client()
+        print(f"  shared client       {per_call:7.2f} ms per lookup  {burst:8.1f} ms for {BURST} at once  "
+              f"{shared_connections} connections")
+
+
+def main():
+    handshake_ms = float(sys.argv[1]) if len(sys.argv) > 1 else 20.0
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+    asyncio.run(run(handshake_ms, latency_ms))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Check TMDB request coalescing, rate limiting and 429 handling against a stub.
+
+Usage: python benchmarks/bench_tmdb_limits.py
+
+Runs routes/tmdb.py's lookups against a local TMDB stub (see tmdb_stub.py)
+that counts upstream requests and can answer with 429s, using a throwaway
+config directory with the response cache turned off:
+- 50 concurrent identical lookups must reach TMDB once
+- 100 distinct lookups must not go faster than the token bucket allows
+- a 429 with Retry-After must be waited out and retried, holding back
+  other lookups meanwhile
+- once retries run out the caller gets a 503 with Retry-After, not TMDB's 429
+Exits non-zero if any check fails.
+"""
+
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+# A throwaway config directory; must be set before the backend is imported
+TMP_HOME = tempfile.mkdtemp(prefix="bench-tmdb-limits-")
+os.environ["HOME"] = TMP_HOME
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import HTTPException  # noqa: E402
+
+from backend.config import DEFAULT_CONFIG, save_config  # noqa: E402
+from backend.routes import tmdb  # noqa: E402
+from backend.tmdb_client import close_tmdb_client, start_tmdb_client  # noqa: E402
+from tmdb_stub import StubServer  # noqa: E402
+
+RATE = 50
+BURST = 10
+
+
+def configure(max_retries: int = 3):
+    save_config({
+        **DEFAULT_CONFIG,
+        "api_keys": {"tmdb": "bench", "tvdb": ""},
+        "tmdb_cache": {"enabled": False},
+        "tmdb_requests": {"requests_per_second": RATE, "burst": BURST, "max_retries": max_retries},
+    })
+
+
+def check(label: str, ok: bool, detail: str) -> bool:
+    print(f"  {'ok  ' if ok else 'FAIL'} {label:34} {detail}")
+    return ok
+
+
+async def lookup(path: str) -> dict:
+    return await tmdb._tmdb_get(path, {"api_key": "bench"}, "season")
+
+
+async def run() -> bool:
+    results = []
+    configure()
+    with StubServer(latency=0.02) as stub:
+        start_tmdb_client(stub.base_url)
+        try:
+            print(f"Token bucket: {RATE} requests/s, burst {BURST}")
+
+            # Identical lookups in flight together share one upstream request
+            await asyncio.sleep(1)  # let the bucket fill
+            start = time.perf_counter()
+            await asyncio.gather(*(lookup("/tv/1/season/1") for _ in range(50)))
+            elapsed = time.perf_counter() - start
+            hits = stub.hits["/tv/1/season/1"]
+            results.append(check("50 identical lookups", hits == 1,
+                                 f"{hits} upstream request in {elapsed * 1000:.0f} ms"))
+
+            # Distinct lookups are paced by the token bucket
+            await asyncio.sleep(1)
+            stub.times.clear()
+            start = time.perf_counter()
+            await asyncio.gather(*(lookup(f"/tv/2/season/{n}") for n in range(100)))
+            elapsed = time.perf_counter() - start
+            floor = (100 - BURST) / RATE
+            results.append(check("100 distinct lookups", elapsed >= floor * 0.95,
+                                 f"{elapsed:.2f} s (bucket allows no less than {floor:.2f} s)"))
+
+            # A 429 pauses everyone until Retry-After, then the request is retried
+            await asyncio.sleep(1)
+            stub.throttle, stub.retry_after = 1, 1
+            start = time.perf_counter()
+            first = asyncio.ensure_future(lookup("/tv/3/season/1"))
+            await asyncio.sleep(0.1)
+            second_start = time.perf_counter()
+            await asyncio.gather(first, lookup("/tv/3/season/2"))
+            elapsed = time.perf_counter() - start
+            second_wait = time.perf_counter() - second_start
+            results.append(check("429 with Retry-After: 1", elapsed >= 1.0 and stub.hits["/tv/3/season/1"] == 2,
+                                 f"retried after {elapsed:.2f} s; a lookup sent meanwhile waited "
+                                 f"{second_wait:.2f} s"))
+
+            # Retries exhausted: a 503 with Retry-After instead of TMDB's 429
+            configure(max_retries=1)
+            stub.throttle, stub.retry_after = 5, 0
+            try:
+                await lookup("/tv/4/season/1")
+                error = None
+            except HTTPException as e:
+                error = e
+            stub.throttle = 0
+            results.append(check(
+                "429 after every retry",
+                error is not None and error.status_code == 503 and "Retry-After" in (error.headers or {}),
+                f"{error.status_code if error else 'no error'} {error.headers if error else ''} after "
+                f"{stub.hits['/tv/4/season/1']} upstream requests",
+            ))
+
+            print(f"Stub: {sum(stub.hits.values())} requests, {stub.throttled} answered 429; "
+                  f"coalesced lookups: {tmdb._flight_stats['coalesced']}")
+        finally:
+            await close_tmdb_client()
+    return all(results)
+
+
+def main():
+    try:
+        ok = asyncio.run(run())
+    finally:
+        shutil.rmtree(TMP_HOME, ignore_errors=True)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""Check v2 and hybrid torrents from torrent_v2.py against a naive BEP 52 reference.
+
+Usage: python benchmarks/check_torrent_v2.py
+
+Writes fixture files below, equal to and just past 16 KiB and the piece
+size, and sizes that are multiples of neither, then builds v2 and hybrid
+metainfo for each file on its own and for a folder of them, at two piece
+sizes, without a hash cache and with one (cold, then warm).  Each result is
+bencoded, decoded again and compared with a reference that builds each
+file's whole Merkle tree from its 16 KiB blocks and SHA-1 hashes the
+padded v1 piece stream:
+- every file's "pieces root"
+- "piece layers", present for exactly the files larger than a piece
+- the hybrid torrent's v1 "pieces" and file list with BEP 47 pad files
+Also writes one torrent with write_torrent() and checks it the same way.
+Exits non-zero if anything differs.
+"""
+
+import hashlib
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from torf import Torrent  # noqa: E402
+
+from backend.hash_cache import HashCache  # noqa: E402
+from backend.torrent_v2 import bencode, build_metainfo, hash_files, list_files, write_torrent  # noqa: E402
+
+BLOCK = 16 * 1024
+PIECE_SIZES = (BLOCK, 4 * BLOCK)
+
+
+def fixture_sizes(piece_size: int) -> list:
+    return sorted({
+        1, BLOCK - 1, BLOCK, BLOCK + 1, 3 * BLOCK + 5,
+        piece_size - 1, piece_size, piece_size + 1,
+        2 * piece_size, 3 * piece_size + BLOCK + 7, 5 * piece_size + 1,
+    })
+
+
+# ---------------------------------------------------------------------------
+# Reference implementation: no shortcuts, every tree built from its leaves
+# ---------------------------------------------------------------------------
+
+def bdecode(data: bytes, pos: int = 0):
+    token = data[pos:pos + 1]
+    if token == b"i":
+        end = data.index(b"e", pos)
+        return int(data[pos + 1:end]), end + 1
+    if token in (b"l", b"d"):
+        items, pos = [], pos + 1
+        while data[pos:pos + 1] != b"e":
+            item, pos = bdecode(data, pos)
+            items.append(item)
+        if token == b"d":
+            return dict(zip(items[::2], items[1::2])), pos + 1
+        return items, pos + 1
+    colon = data.index(b":", pos)
+    end = colon + 1 + int(data[pos:colon])
+    return data[colon + 1:end], end
+
+
+def _pow2_at_least(n: int) -> int:
+    width = 1
+    while width < n:
+        width *= 2
+    return width
+
+
+def reference_tree(data: bytes, piece_size: int) -> tuple:
+    """(pieces root, piece layer or None) for one file's contents."""
+    leaves = [hashlib.sha256(data[i:i + BLOCK]).digest() for i in range(0, len(data), BLOCK)]
+    blocks_per_piece = piece_size // BLOCK
+    if len(data) > piece_size:
+        width = _pow2_at_least(max(len(leaves), blocks_per_piece))
+    else:
+        width = _pow2_at_least(len(leaves))
+    layers = [leaves + [bytes(32)] * (width - len(leaves))]
+    while len(layers[-1]) > 1:
+        below = layers[-1]
+        layers.append([hashlib.sha256(below[i] + below[i + 1]).digest() for i in range(0, len(below), 2)])
+    root = layers[-1][0]
+    if len(data) <= piece_size:
+        return root, None
+    height = blocks_per_piece.bit_length() - 1
+    piece_count = -(-len(data) // piece_size)
+    return root, b"".join(layers[height][:piece_count])
+
+
+def reference_v1(contents: list, piece_size: int) -> bytes:
+    """SHA-1 piece digests of the files back to back, each but the last padded to a piece boundary."""
+    stream = bytearray()
+    for index, data in enumerate(contents):
+        stream += data
+        if index < len(contents) - 1:
+            stream += bytes(-len(data) % piece_size)
+    return b"".join(hashlib.sha1(stream[i:i + piece_size]).digest() for i in range(0, len(stream), piece_size))
+
+
+# ---------------------------------------------------------------------------
+# Comparison
+# ---------------------------------------------------------------------------
+
+def tree_entries(node: dict, parts=()) -> dict:
+    entries = {}
+    for name, child in node.items():
+        if name == b"":
+            entries[parts] = child
+        else:
+            entries.update(tree_entries(child, parts + (name.decode("utf-8"),)))
+    return entries
+
+
+def compare(label: str, torrent: bytes, path: str, piece_size: int, hybrid: bool) -> list:
+    """List of mismatches between a bencoded torrent and the reference."""
+    metainfo, _ = bdecode(torrent)
+    info = metainfo[b"info"]
+    layers = metainfo[b"piece layers"]
+    files = list_files(path)
+    entries = tree_entries(info[b"file tree"])
+    if os.path.isfile(path):
+        entries = {(os.path.basename(path),): entry for entry in entries.values()}
+
+    problems = []
+    if info[b"piece length"] != piece_size:
+        problems.append(f"{label}: piece length {info[b'piece length']} != {piece_size}")
+    if sorted(entries) != sorted(parts for parts, _, _ in files):
+        problems.append(f"{label}: file tree lists {sorted(entries)}")
+        return problems
+
+    contents = []
+    expected_layers = {}
+    for parts, filepath, size in files:
+        with open(filepath, "rb") as fh:
+            data = fh.read()
+        contents.append(data)
+        root, layer = reference_tree(data, piece_size)
+        entry = entries[parts]
+        name = "/".join(parts)
+        if entry[b"length"] != size:
+            problems.append(f"{label}: {name} length {entry[b'length']} != {size}")
+        if entry[b"pieces root"] != root:
+            problems.append(f"{label}: {name} ({size} bytes) pieces root differs")
+        if layer is not None:
+            expected_layers[root] = layer
+            if layers.get(root) != layer:
+                problems.append(f"{label}: {name} ({size} bytes) piece layer differs")
+    if set(layers) != set(expected_layers):
+        problems.append(f"{label}: piece layers has {len(set(layers) - set(expected_layers))} unexpected and "
+                        f"{len(set(expected_layers) - set(layers))} missing roots")
+
+    if hybrid:
+        if info.get(b"pieces") != reference_v1(contents, piece_size):
+            problems.append(f"{label}: hybrid v1 pieces differ")
+        if len(files) > 1:
+            expected = []
+            for index, (parts, _, size) in enumerate(files):
+                expected.append((size, [p.encode("utf-8") for p in parts]))
+                pad = -size % piece_size
+                if pad and index < len(files) - 1:
+                    expected.append((pad, [b".pad", str(pad).encode()]))
+            actual = [(f[b"length"], f[b"path"]) for f in info[b"files"]]
+            if actual != expected:
+                problems.append(f"{label}: hybrid v1 file list differs")
+        elif info.get(b"length") != files[0][2]:
+            problems.append(f"{label}: hybrid v1 length {info.get(b'length')} != {files[0][2]}")
+    elif b"pieces" in info:
+        problems.append(f"{label}: v2-only torrent has v1 pieces")
+    return problems
+
+
+def build(path: str, piece_size: int, hybrid: bool, cache) -> tuple:
+    files = list_files(path)
+    results, stats = hash_files(files, piece_size, 4, hybrid, cache)
+    return bencode(build_metainfo(path, files, results, piece_size, hybrid, [], "")), stats
+
+
+def write_fixtures(root: str, piece_size: int, rng: random.Random) -> tuple:
+    """(single file paths, folder path) for one piece size."""
+    singles = []
+    folder = os.path.join(root, f"folder-{piece_size // 1024}k")
+    os.makedirs(os.path.join(folder, "Extras"))
+    for size in fixture_sizes(piece_size):
+        filepath = os.path.join(root, f"single-{piece_size // 1024}k-{size}.bin")
+        with open(filepath, "wb") as fh:
+            fh.write(rng.randbytes(size) if hasattr(rng, "randbytes") else os.urandom(size))
+        singles.append(filepath)
+        # The folder holds the same sizes, one in a subfolder, plus files list_files skips
+        target = os.path.join(folder, "Extras" if size == piece_size + 1 else "", f"File {size:08d}.bin")
+        shutil.copyfile(filepath, target)
+    open(os.path.join(folder, ".hidden"), "wb").write(b"skipped")
+    open(os.path.join(folder, "empty.bin"), "wb").close()
+    return singles, folder
+
+
+def main():
+    tmp = tempfile.mkdtemp(prefix="check-torrent-v2-")
+    problems = []
+    checked = 0
+    try:
+        rng = random.Random(4)
+        cache = HashCache(os.path.join(tmp, "hash-cache.db"))
+        for piece_size in PIECE_SIZES:
+            singles, folder = write_fixtures(tmp, piece_size, rng)
+            for path in singles + [folder]:
+                for hybrid in (False, True):
+                    kind = "hybrid" if hybrid else "v2"
+                    base = f"{os.path.basename(path)} {kind} @{piece_size // 1024}k"
+                    runs = [("no cache", None), ("cold cache", cache), ("warm cache", cache)]
+                    for cache_label, run_cache in runs:
+                        torrent, stats = build(path, piece_size, hybrid, run_cache)
+                        label = f"{base} {cache_label}"
+                        problems += compare(label, torrent, path, piece_size, hybrid)
+                        if cache_label == "warm cache" and stats["misses"]:
+                            problems.append(f"{label}: {stats['misses']} cache misses")
+                        checked += 1
+
+        # The whole pipeline, with torf choosing the piece size
+        folder = os.path.join(tmp, "folder-64k")
+        piece_size = Torrent.calculate_piece_size(sum(size for _, _, size in list_files(folder)))
+        for torrent_format in ("v2", "hybrid"):
+            torrent_path = os.path.join(tmp, f"{torrent_format}.torrent")
+            write_torrent(folder, torrent_path, torrent_format, ["http://tracker.invalid/announce"], "", 2, cache)
+            with open(torrent_path, "rb") as fh:
+                problems += compare(f"write_torrent {torrent_format}", fh.read(), folder, piece_size,
+                                    torrent_format == "hybrid")
+            checked += 1
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    for problem in problems:
+        print(f"  FAIL {problem}")
+    print(f"{checked} torrents checked against the reference, {len(problems)} mismatches")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
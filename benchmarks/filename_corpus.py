@@ -0,0 +1,54 @@
+"""Deterministic corpus of release-style filenames for parsing benchmarks.
+
+Mixes movies, episodes and season packs in the layouts the naming templates
+produce and in common scene/P2P variations (spaces, brackets, years in the
+title, multi-episode ranges, missing groups).
+"""
+
+import random
+
+TITLES = [
+    "The Matrix", "Blade Runner", "Dune Part Two", "The Office", "Breaking Bad",
+    "Better Call Saul", "Severance", "The Bear", "Arrival", "Spirited Away",
+    "Mr Robot", "Fargo", "True Detective", "Chernobyl", "Interstellar",
+    "The Last of Us", "House of the Dragon", "Oppenheimer", "Top Gun Maverick",
+    "Stranger Things", "Andor", "Succession", "Ted Lasso", "Dark", "Shogun",
+    "Parasite", "Whiplash", "Mad Max Fury Road", "Slow Horses", "Blue Eye Samurai",
+]
+RESOLUTIONS = ["2160p", "1080p", "720p", "480p"]
+SOURCES = ["WEB-DL", "BluRay", "WEBRip", "HDTV", "REMUX"]
+CODECS = ["x264", "x265", "H.264", "HEVC", "AV1"]
+AUDIO = ["DDP5.1", "AAC2.0", "DTS-HD.MA.5.1", "TrueHD.7.1.Atmos", "AC3"]
+GROUPS = ["NTb", "FLUX", "GROUP", "SPARKS", "playWEB", "EDITH", "CAKES", "RARBG"]
+EXTENSIONS = [".mkv", ".mp4", ".mkv", ".mkv"]
+
+
+def make_corpus(count: int = 1000, seed: int = 0) -> list:
+    """Build count filenames; the same seed always gives the same list."""
+    rng = random.Random(seed)
+    names = []
+    for i in range(count):
+        title = rng.choice(TITLES)
+        dotted = title.replace(" ", ".")
+        year = rng.randint(1970, 2025)
+        res, src, codec = rng.choice(RESOLUTIONS), rng.choice(SOURCES), rng.choice(CODECS)
+        audio, group, ext = rng.choice(AUDIO), rng.choice(GROUPS), rng.choice(EXTENSIONS)
+        season, episode = rng.randint(1, 12), rng.randint(1, 24)
+        layout = i % 8
+        if layout == 0:
+            names.append(f"{dotted}.{year}.{res}.{src}.{codec}-{group}{ext}")
+        elif layout == 1:
+            names.append(f"{dotted}.S{season:02d}E{episode:02d}.{res}.{src}.{codec}-{group}{ext}")
+        elif layout == 2:
+            names.append(f"{dotted}.S{season:02d}.{res}.{src}.{audio}.{codec}-{group}")
+        elif layout == 3:
+            names.append(f"{title} ({year}) [{res}] [{src}]{ext}")
+        elif layout == 4:
+            names.append(f"{dotted}.S{season:02d}E{episode:02d}E{episode + 1:02d}.{res}.{src}.{audio}.{codec}-{group}{ext}")
+        elif layout == 5:
+            names.append(f"{dotted}.{year}.{res}.{src}.{audio}.{codec}{ext}")
+        elif layout == 6:
+            names.append(f"{title} - {season}x{episode:02d} - Episode {episode}{ext}")
+        else:
+            names.append(f"{dotted}.{year}.S{season:02d}E{episode:02d}.{res}.{src}.{codec}-{group}{ext}")
+    return names
@@ -0,0 +1,188 @@
+"""Local stand-in for the TMDB API used by the TMDB benchmarks.
+
+Serves plausible JSON for the endpoints routes/tmdb.py calls, over HTTP/1.1
+with keep-alive.  Each new connection waits `handshake` seconds before its
+first response, standing in for the TCP and TLS handshakes a real client
+pays, and every response waits `latency` seconds, standing in for the round
+trip.  Responses carry an ETag and answer a matching If-None-Match with
+304.  Setting `throttle` answers that many upcoming requests with 429 and a
+Retry-After of `retry_after` seconds.  Requests are counted per path so
+benchmarks can check how many went upstream.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+def _show(tv_id: int) -> dict:
+    return {
+        "id": tv_id,
+        "name": f"Show {tv_id}",
+        "original_name": f"Show {tv_id}",
+        "first_air_date": "2015-01-01",
+        "overview": "A show.",
+        "genres": [{"id": 18, "name": "Drama"}],
+        "spoken_languages": [{"english_name": "English"}],
+        "original_language": "en",
+        "number_of_seasons": 3,
+        "seasons": [
+            {"season_number": n, "name": f"Season {n}", "episode_count": 10, "air_date": f"{2014 + n}-01-01"}
+            for n in range(0, 4)
+        ],
+    }
+
+
+def _season(tv_id: int, season_number: int) -> dict:
+    return {
+        "season_number": season_number,
+        "name": f"Season {season_number}",
+        "episodes": [_episode(tv_id, season_number, n) for n in range(1, 11)],
+    }
+
+
+def _episode(tv_id: int, season_number: int, episode_number: int) -> dict:
+    return {
+        "episode_number": episode_number,
+        "season_number": season_number,
+        "name": f"Episode {episode_number}",
+        "overview": "An episode.",
+        "air_date": "2015-01-01",
+        "runtime": 45,
+        "still_path": None,
+        "vote_average": 7.5,
+    }
+
+
+def _movie(movie_id: int) -> dict:
+    return {
+        "id": movie_id,
+        "imdb_id": f"tt{movie_id:07}",
+        "title": f"Movie {movie_id}",
+        "original_title": f"Movie {movie_id}",
+        "release_date": "2010-01-01",
+        "overview": "A movie.",
+        "runtime": 120,
+        "genres": [{"id": 28, "name": "Action"}],
+        "spoken_languages": [{"english_name": "English"}],
+        "original_language": "en",
+    }
+
+
+def tmdb_body(path: str, query: dict):
+    """The JSON body for an API path (without the /3 prefix), or None for a 404."""
+    parts = path.strip("/").split("/")
+    if parts[0] == "search" and len(parts) == 2:
+        text = query.get("query", [""])[0]
+        key = "title" if parts[1] == "movie" else "name"
+        return {"results": [{"id": i, key: f"{text} {i}", "overview": ""} for i in range(1, 21)]}
+    try:
+        ids = [int(part) for part in parts[1::2]]
+    except ValueError:
+        return None
+    if parts[0] == "movie" and len(parts) == 2:
+        return _movie(ids[0])
+    if parts[0] != "tv":
+        return None
+    if len(parts) == 2:
+        body = _show(ids[0])
+        for extra in query.get("append_to_response", [""])[0].split(","):
+            if extra == "external_ids":
+                body["external_ids"] = {"imdb_id": f"tt{ids[0]:07}"}
+            elif extra.startswith("season/"):
+                body[extra] = _season(ids[0], int(extra.split("/")[1]))
+        return body
+    if len(parts) == 3 and parts[2] == "external_ids":
+        return {"imdb_id": f"tt{ids[0]:07}"}
+    if len(parts) == 4 and parts[2] == "season":
+        return _season(ids[0], ids[1])
+    if len(parts) == 6 and parts[4] == "episode":
+        return _episode(ids[0], ids[1], ids[2])
+    return None
+
+
+class StubServer:
+    """A TMDB stub on 127.0.0.1 in a background thread; use as a context manager."""
+
+    def __init__(self, handshake: float = 0.0, latency: float = 0.0):
+        self.handshake = handshake
+        self.latency = latency
+        self.hits = Counter()
+        self.connections = 0
+        self.not_modified = 0
+        self.throttle = 0
+        self.retry_after = 1
+        self.throttled = 0
+        self.times = []
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with stub._lock:
+                    stub.connections += 1
+                time.sleep(stub.handshake)
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                path = url.path[len("/3"):] if url.path.startswith("/3/") else url.path
+                with stub._lock:
+                    stub.hits[path] += 1
+                    stub.times.append(time.monotonic())
+                    throttle = stub.throttle > 0
+                    if throttle:
+                        stub.throttle -= 1
+                        stub.throttled += 1
+                time.sleep(stub.latency)
+                if throttle:
+                    self._send(429, {"status_code": 25, "status_message": "Rate limit exceeded"},
+                               {"Retry-After": str(stub.retry_after)})
+                    return
+                body = tmdb_body(path, parse_qs(url.query))
+                if body is None:
+                    self._send(404, {"status_message": "Not found"})
+                    return
+                etag = '"' + hashlib.sha1(json.dumps(body, sort_keys=True).encode()).hexdigest() + '"'
+                if self.headers.get("If-None-Match") == etag:
+                    with stub._lock:
+                        stub.not_modified += 1
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self._send(200, body, {"ETag": etag})
+
+            def _send(self, status: int, body: dict, headers: dict = None):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}/3"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
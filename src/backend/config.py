@@ -1,8 +1,18 @@
-"""Configuration management for Torrent Creator backend."""
+"""Configuration management for Torrent Creator backend.
 
+The config and ASCII art are read on almost every request (the NFO
+generators alone load both for each preview), so the parsed contents are
+kept in memory and revalidated with a single stat of the file.  Saves write
+a temp file and rename it into place, so a reader never sees a half-written
+file, and update the in-memory copy straight away.
+"""
+
+import copy
 import os
 import json
 import shutil
+import tempfile
+import threading
 
 # Config paths
 CONFIG_DIR = os.path.expanduser("~/.torrent-creator")
@@ -24,7 +34,8 @@ DEFAULT_CONFIG = {
     "naming_templates": {
         "movie": "{title}.{year}.{quality}.{source}.{codec}-{group}",
         "episode": "{title}.S{season:02}E{episode:02}.{episode_title}.{quality}.{source}.{codec}-{group}",
-        "season": "{title}.S{season:02}.{quality}.{source}.{codec}-{group}"
+        "season": "{title}.S{season:02}.{quality}.{source}.{codec}-{group}",
+        "episode_file": "{title}.S{season:02}E{episode:02}.{quality}.{source}.{codec}{-group}"
     },
     "trackers": [],
     "output_directory": "~/Documents/torrents",
@@ -32,6 +43,55 @@ DEFAULT_CONFIG = {
     "nfo": {
         "include_notes": True,
         "notes_template": "Enjoy and seed!"
+    },
+    "torrent_format": "v1",
+    "hashing": {
+        "workers": 0
+    },
+    "hash_cache": {
+        "enabled": True,
+        "max_mb": 256
+    },
+    "jobs": {
+        "workers": 1
+    },
+    "ingest": {
+        "strategy": "reflink",
+        "hash_on_copy": True
+    },
+    "parsing": {
+        "workers": 0,
+        "fast_path": True
+    },
+    "metadata": {
+        "probe_workers": 8,
+        "native_probe": True
+    },
+    "metadata_cache": {
+        "enabled": True,
+        "max_entries": 10000
+    },
+    "library": {
+        "watch_interval": 10
+    },
+    "tmdb_cache": {
+        "enabled": True,
+        "max_mb": 64,
+        "ttl_hours": {
+            "search": 24,
+            "movie": 168,
+            "tv": 24,
+            "season": 24,
+            "episode": 168
+        }
+    },
+    "tmdb_requests": {
+        "requests_per_second": 40,
+        "burst": 20,
+        "max_retries": 3
+    },
+    "tmdb_catalog": {
+        "enabled": True
     }
 }
 
@@ -63,43 +123,109 @@ def init_config():
         if os.path.exists(EXAMPLE_ASCII_PATH):
             shutil.copy(EXAMPLE_ASCII_PATH, ASCII_ART_PATH)
         else:
-            with open(ASCII_ART_PATH, "w") as f:
-                f.write(DEFAULT_ASCII_ART)
+            save_ascii_art(DEFAULT_ASCII_ART)
+
+
+# path -> (file identity, parsed contents)
+_file_cache = {}
+_file_cache_lock = threading.Lock()
+
+
+def _file_identity(path: str):
+    """(mtime_ns, size, inode) of path, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def _cached(path: str, identity):
+    with _file_cache_lock:
+        entry = _file_cache.get(path)
+    if entry is not None and entry[0] == identity:
+        return entry[1]
+    return None
+
+
+def _remember(path: str, identity, value):
+    with _file_cache_lock:
+        _file_cache[path] = (identity, value)
+
+
+def atomic_write(path: str, text: str) -> tuple:
+    """Write text to path via a temp file and rename. Returns the new file identity."""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        # mkstemp creates the file 0600; keep the mode the file already had
+        try:
+            mode = os.stat(path).st_mode & 0o777
+        except OSError:
+            mode = 0o644
+        os.chmod(tmp_path, mode)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return _file_identity(path)
 
 
 def load_config() -> dict:
-    """Load configuration from file."""
-    if os.path.exists(CONFIG_PATH):
+    """Load configuration, re-reading the file only if it changed on disk.
+
+    Returns a copy, so callers may modify it.
+    """
+    identity = _file_identity(CONFIG_PATH)
+    if identity is None:
+        return copy.deepcopy(DEFAULT_CONFIG)
+
+    config = _cached(CONFIG_PATH, identity)
+    if config is None:
         try:
             with open(CONFIG_PATH, "r") as f:
-                return json.load(f)
+                config = json.load(f)
         except (json.JSONDecodeError, IOError) as e:
             print(f"Warning: Failed to load config ({e}), using defaults")
-            return DEFAULT_CONFIG.copy()
-    return DEFAULT_CONFIG.copy()
+            return copy.deepcopy(DEFAULT_CONFIG)
+        _remember(CONFIG_PATH, identity, config)
+    return copy.deepcopy(config)
 
 
 def save_config(config: dict):
-    """Save configuration to file."""
-    os.makedirs(CONFIG_DIR, exist_ok=True)
-    with open(CONFIG_PATH, "w") as f:
-        json.dump(config, f, indent=2)
+    """Save configuration to file atomically."""
+    text = json.dumps(config, indent=2)
+    identity = atomic_write(CONFIG_PATH, text)
+    _remember(CONFIG_PATH, identity, json.loads(text))
 
 
 def load_ascii_art() -> str:
-    """Load ASCII art from file."""
-    if os.path.exists(ASCII_ART_PATH):
+    """Load ASCII art, re-reading the file only if it changed on disk."""
+    identity = _file_identity(ASCII_ART_PATH)
+    if identity is None:
+        return DEFAULT_ASCII_ART
+
+    art = _cached(ASCII_ART_PATH, identity)
+    if art is None:
         try:
             with open(ASCII_ART_PATH, "r", encoding="utf-8") as f:
-                return f.read()
+                art = f.read()
         except (IOError, UnicodeDecodeError) as e:
             print(f"Warning: Failed to load ASCII art ({e}), using defaults")
             return DEFAULT_ASCII_ART
-    return DEFAULT_ASCII_ART
+        _remember(ASCII_ART_PATH, identity, art)
+    return art
 
 
 def save_ascii_art(art: str):
-    """Save ASCII art to file."""
-    os.makedirs(CONFIG_DIR, exist_ok=True)
-    with open(ASCII_ART_PATH, "w") as f:
-        f.write(art)
+    """Save ASCII art to file atomically."""
+    identity = atomic_write(ASCII_ART_PATH, art)
+    _remember(ASCII_ART_PATH, identity, art)
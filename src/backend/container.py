@@ -0,0 +1,557 @@
+"""Pure-Python Matroska and MP4 header reader.
+
+Spawning ffprobe costs tens to hundreds of milliseconds per file and fails
+entirely when ffprobe is not installed.  Matroska keeps its Info and Tracks
+elements near the start of the file and an MP4's moov box can be found by
+walking top-level box headers, so the few fields metadata.py needs can be
+read from a few hundred KB.  read_container_info() returns them in the shape
+of ffprobe's -show_format -show_streams JSON, or None when the headers do not
+answer every field and ffprobe has to be asked instead.
+"""
+
+import os
+import struct
+
+# Upper bound on bytes read from one file
+MAX_READ = 512 * 1024
+
+EBML_MAGIC = b"\x1a\x45\xdf\xa3"
+MP4_TOP_LEVEL = (b"ftyp", b"moov", b"mdat", b"free", b"skip", b"wide", b"pnot")
+
+# Matroska element IDs
+EBML_HEADER = 0x1A45DFA3
+DOC_TYPE = 0x4282
+SEGMENT = 0x18538067
+SEEK_HEAD = 0x114D9B74
+SEEK = 0x4DBB
+SEEK_ID = 0x53AB
+SEEK_POSITION = 0x53AC
+INFO = 0x1549A966
+TIMESTAMP_SCALE = 0x2AD7B1
+DURATION = 0x4489
+TRACKS = 0x1654AE6B
+TRACK_ENTRY = 0xAE
+TRACK_TYPE = 0x83
+CODEC_ID = 0x86
+CODEC_PRIVATE = 0x63A2
+VIDEO = 0xE0
+PIXEL_WIDTH = 0xB0
+PIXEL_HEIGHT = 0xBA
+COLOUR = 0x55B0
+MATRIX_COEFFICIENTS = 0x55B1
+BITS_PER_CHANNEL = 0x55B2
+TRANSFER_CHARACTERISTICS = 0x55BA
+AUDIO = 0xE1
+CHANNELS = 0x9F
+BIT_DEPTH = 0x6264
+CLUSTER = 0x1F43B675
+
+# Codec IDs mapped to ffprobe codec names
+MATROSKA_VIDEO_CODECS = {
+    "V_MPEG4/ISO/AVC": "h264",
+    "V_MPEGH/ISO/HEVC": "hevc",
+    "V_AV1": "av1",
+    "V_VP9": "vp9",
+    "V_VP8": "vp8",
+    "V_MPEG2": "mpeg2video",
+    "V_MPEG4/ISO/ASP": "mpeg4",
+}
+MATROSKA_AUDIO_CODECS = {
+    "A_AAC": "aac",
+    "A_AC3": "ac3",
+    "A_EAC3": "eac3",
+    "A_DTS": "dts",
+    "A_TRUEHD": "truehd",
+    "A_FLAC": "flac",
+    "A_OPUS": "opus",
+    "A_VORBIS": "vorbis",
+    "A_MPEG/L3": "mp3",
+    "A_MPEG/L2": "mp2",
+    "A_ALAC": "alac",
+}
+MP4_VIDEO_CODECS = {
+    b"avc1": "h264",
+    b"avc3": "h264",
+    b"hvc1": "hevc",
+    b"hev1": "hevc",
+    b"dvh1": "hevc",
+    b"dvhe": "hevc",
+    b"av01": "av1",
+    b"vp09": "vp9",
+}
+
+# ISO/IEC 23001-8 code points mapped to ffprobe names
+TRANSFER_NAMES = {1: "bt709", 6: "smpte170m", 14: "bt2020-10", 15: "bt2020-12", 16: "smpte2084", 18: "arib-std-b67"}
+MATRIX_NAMES = {1: "bt709", 5: "bt470bg", 6: "smpte170m", 9: "bt2020nc", 10: "bt2020c"}
+HDR_TRANSFERS = (16, 18)
+
+# Channel count of each AC-3 audio coding mode (without LFE)
+AC3_ACMOD_CHANNELS = (2, 1, 2, 3, 3, 4, 4, 5)
+AAC_CHANNEL_CONFIGS = {1: 1, 2: 2, 3: 3, 4: 4, 5: 5, 6: 6, 7: 8}
+
+
+class _Unanswerable(Exception):
+    """The headers do not determine every field; ask ffprobe instead."""
+
+
+class _Reader:
+    """Positioned reads from a file, capped at MAX_READ bytes in total."""
+
+    def __init__(self, fh):
+        self.fh = fh
+        self.file_size = os.fstat(fh.fileno()).st_size
+        self.remaining = MAX_READ
+
+    def read(self, offset: int, size: int) -> bytes:
+        size = min(size, self.file_size - offset)
+        if size < 0 or size > self.remaining:
+            raise _Unanswerable()
+        self.remaining -= size
+        self.fh.seek(offset)
+        return self.fh.read(size)
+
+
+class _Bits:
+    """MSB-first bit reader for packed codec configuration records."""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = 0
+
+    def read(self, count: int) -> int:
+        value = 0
+        for _ in range(count):
+            byte = self.data[self.pos >> 3]
+            value = (value << 1) | ((byte >> (7 - (self.pos & 7))) & 1)
+            self.pos += 1
+        return value
+
+
+def _video_stream(codec_name, width, height, bit_depth, transfer, matrix) -> dict:
+    """Build an ffprobe-shaped video stream, refusing if HDR cannot be decided."""
+    if codec_name is None or not width or not height or bit_depth is None:
+        raise _Unanswerable()
+    if bit_depth > 8:
+        # 10/12-bit video may be HDR; without container colour info only the
+        # bitstream knows, and only ffprobe reads that
+        if transfer is None or (matrix is None and transfer not in HDR_TRANSFERS):
+            raise _Unanswerable()
+    return {
+        "codec_type": "video",
+        "codec_name": codec_name,
+        "width": width,
+        "height": height,
+        "pix_fmt": "yuv420p" if bit_depth == 8 else f"yuv420p{bit_depth}le",
+        "color_transfer": TRANSFER_NAMES.get(transfer, ""),
+        "color_space": MATRIX_NAMES.get(matrix, ""),
+    }
+
+
+def _avcc_bit_depth(avcc: bytes):
+    profile = avcc[1]
+    pos = 6
+    for _ in range(avcc[5] & 0x1F):
+        pos += 2 + int.from_bytes(avcc[pos:pos + 2], "big")
+    pps_count = avcc[pos]
+    pos += 1
+    for _ in range(pps_count):
+        pos += 2 + int.from_bytes(avcc[pos:pos + 2], "big")
+    if profile in (100, 110, 122, 144, 244) and len(avcc) >= pos + 2:
+        return (avcc[pos + 1] & 0x07) + 8
+    # Baseline, Main, Extended and High are 8-bit only
+    return 8 if profile in (66, 77, 88, 100) else None
+
+
+def _codec_bit_depth(codec_name: str, private: bytes):
+    """Bit depth from a codec configuration record (avcC, hvcC, av1C)."""
+    if codec_name in ("vp8", "mpeg2video", "mpeg4"):
+        return 8
+    if not private:
+        return None
+    if codec_name == "h264":
+        return _avcc_bit_depth(private)
+    if codec_name == "hevc" and len(private) > 17:
+        return (private[17] & 0x07) + 8
+    if codec_name == "av1" and len(private) > 2:
+        high_bitdepth, twelve_bit = private[2] & 0x40, private[2] & 0x20
+        return 12 if high_bitdepth and twelve_bit else 10 if high_bitdepth else 8
+    return None
+
+
+def _format(duration_seconds) -> dict:
+    if not duration_seconds or duration_seconds <= 0:
+        raise _Unanswerable()
+    return {"duration": f"{duration_seconds:.6f}"}
+
+
+# Matroska
+
+def _vint(data: bytes, pos: int) -> tuple:
+    """Decode an EBML variable-length integer. Returns (length, raw, value)."""
+    first = data[pos]
+    if first == 0:
+        raise _Unanswerable()
+    length = 9 - first.bit_length()
+    if pos + length > len(data):
+        raise _Unanswerable()
+    raw = int.from_bytes(data[pos:pos + length], "big")
+    return length, raw, raw & ((1 << (7 * length)) - 1)
+
+
+def _element_header(data: bytes, pos: int) -> tuple:
+    """Returns (element_id, body_offset, body_size) with size None if unknown."""
+    id_length, element_id, _ = _vint(data, pos)
+    size_length, _, size = _vint(data, pos + id_length)
+    if size == (1 << (7 * size_length)) - 1:
+        size = None
+    return element_id, pos + id_length + size_length, size
+
+
+def _children(data: bytes) -> list:
+    """Split a fully read master element body into (id, payload) pairs."""
+    children = []
+    pos = 0
+    while pos < len(data):
+        element_id, body, size = _element_header(data, pos)
+        if size is None or body + size > len(data):
+            raise _Unanswerable()
+        children.append((element_id, data[body:body + size]))
+        pos = body + size
+    return children
+
+
+def _uint(payload: bytes) -> int:
+    return int.from_bytes(payload, "big")
+
+
+def _float(payload: bytes) -> float:
+    if len(payload) == 4:
+        return struct.unpack(">f", payload)[0]
+    return struct.unpack(">d", payload)[0]
+
+
+def _read_element(reader: _Reader, offset: int) -> tuple:
+    element_id, body, size = _element_header(reader.read(offset, 12), 0)
+    return element_id, offset + body, size
+
+
+def _matroska_tracks(tracks: bytes) -> list:
+    streams = []
+    for element_id, entry in _children(tracks):
+        if element_id != TRACK_ENTRY:
+            continue
+        fields = dict(_children(entry))
+        track_type = _uint(fields.get(TRACK_TYPE, b""))
+        codec_id = fields.get(CODEC_ID, b"").rstrip(b"\0").decode("ascii", "replace")
+
+        if track_type == 1:
+            video = dict(_children(fields.get(VIDEO, b"")))
+            colour = dict(_children(video.get(COLOUR, b"")))
+            codec_name = MATROSKA_VIDEO_CODECS.get(codec_id)
+            bit_depth = _uint(colour[BITS_PER_CHANNEL]) if BITS_PER_CHANNEL in colour else None
+            if not bit_depth and codec_name:
+                bit_depth = _codec_bit_depth(codec_name, fields.get(CODEC_PRIVATE, b""))
+            transfer = _uint(colour[TRANSFER_CHARACTERISTICS]) if TRANSFER_CHARACTERISTICS in colour else None
+            matrix = _uint(colour[MATRIX_COEFFICIENTS]) if MATRIX_COEFFICIENTS in colour else None
+            streams.append(_video_stream(
+                codec_name,
+                _uint(video.get(PIXEL_WIDTH, b"")),
+                _uint(video.get(PIXEL_HEIGHT, b"")),
+                bit_depth, transfer, matrix,
+            ))
+
+        elif track_type == 2:
+            audio = dict(_children(fields.get(AUDIO, b"")))
+            codec_name = MATROSKA_AUDIO_CODECS.get(codec_id) or MATROSKA_AUDIO_CODECS.get(codec_id.split("/")[0])
+            if codec_id.startswith("A_PCM/INT/") and BIT_DEPTH in audio:
+                endian = "le" if codec_id.endswith("LIT") else "be"
+                codec_name = f"pcm_s{_uint(audio[BIT_DEPTH])}{endian}"
+            if codec_name is None:
+                raise _Unanswerable()
+            channels = _uint(audio[CHANNELS]) if CHANNELS in audio else 1
+            streams.append({"codec_type": "audio", "codec_name": codec_name, "channels": channels})
+    return streams
+
+
+def _read_matroska(reader: _Reader) -> dict:
+    element_id, body, size = _read_element(reader, 0)
+    if element_id != EBML_HEADER or size is None:
+        raise _Unanswerable()
+    doc_type = dict(_children(reader.read(body, size))).get(DOC_TYPE, b"").rstrip(b"\0")
+    if doc_type not in (b"matroska", b"webm"):
+        raise _Unanswerable()
+
+    element_id, segment_start, segment_size = _read_element(reader, body + size)
+    if element_id != SEGMENT:
+        raise _Unanswerable()
+    segment_end = reader.file_size if segment_size is None else segment_start + segment_size
+
+    found = {}
+    seek_positions = {}
+    pos = segment_start
+    while pos < segment_end and not (INFO in found and TRACKS in found):
+        element_id, body, size = _read_element(reader, pos)
+        if size is None or element_id == CLUSTER:
+            break
+        if element_id in (INFO, TRACKS):
+            found[element_id] = reader.read(body, size)
+        elif element_id == SEEK_HEAD:
+            for seek_id, seek in _children(reader.read(body, size)):
+                if seek_id == SEEK:
+                    entry = dict(_children(seek))
+                    seek_positions[_uint(entry.get(SEEK_ID, b""))] = _uint(entry.get(SEEK_POSITION, b""))
+        pos = body + size
+
+    # Elements written after the clusters are located through the SeekHead
+    for wanted in (INFO, TRACKS):
+        if wanted not in found and wanted in seek_positions:
+            element_id, body, size = _read_element(reader, segment_start + seek_positions[wanted])
+            if element_id == wanted and size is not None:
+                found[wanted] = reader.read(body, size)
+    if INFO not in found or TRACKS not in found:
+        raise _Unanswerable()
+
+    info = dict(_children(found[INFO]))
+    scale = _uint(info[TIMESTAMP_SCALE]) if TIMESTAMP_SCALE in info else 1000000
+    duration = _float(info[DURATION]) * scale / 1e9 if DURATION in info else None
+    return {"streams": _matroska_tracks(found[TRACKS]), "format": _format(duration)}
+
+
+# MP4 / QuickTime
+
+def _read_box(reader: _Reader, offset: int) -> tuple:
+    """Returns (box_type, body_offset, body_size) for a top-level box."""
+    header = reader.read(offset, 16)
+    size, box_type = struct.unpack(">I4s", header[:8])
+    if size == 1:
+        size = struct.unpack(">Q", header[8:16])[0]
+        header_size = 16
+    else:
+        header_size = 8
+        if size == 0:
+            size = reader.file_size - offset
+    if size < header_size:
+        raise _Unanswerable()
+    return box_type, offset + header_size, size - header_size
+
+
+def _boxes(data: bytes, start: int = 0, end: int = None) -> dict:
+    """Map box type to (body_start, body_end) for the boxes in data[start:end]."""
+    end = len(data) if end is None else end
+    boxes = {}
+    pos = start
+    while pos + 8 <= end:
+        size, box_type = struct.unpack(">I4s", data[pos:pos + 8])
+        header_size = 8
+        if size == 1:
+            size = struct.unpack(">Q", data[pos + 8:pos + 16])[0]
+            header_size = 16
+        elif size == 0:
+            size = end - pos
+        if size < header_size or pos + size > end:
+            raise _Unanswerable()
+        boxes.setdefault(box_type, []).append((pos + header_size, pos + size))
+        pos += size
+    return boxes
+
+
+def _find_box(data: bytes, start: int, end: int, *path) -> tuple:
+    for box_type in path:
+        found = _boxes(data, start, end).get(box_type)
+        if not found:
+            raise _Unanswerable()
+        start, end = found[0]
+    return start, end
+
+
+def _mp4_duration(data: bytes, start: int, end: int) -> float:
+    """Duration in seconds from an mvhd or mdhd body."""
+    version = data[start]
+    if version == 1:
+        timescale, duration = struct.unpack(">IQ", data[start + 20:start + 32])
+    else:
+        timescale, duration = struct.unpack(">II", data[start + 12:start + 20])
+    if not timescale or duration in (0xFFFFFFFF, 0xFFFFFFFFFFFFFFFF):
+        raise _Unanswerable()
+    return duration / timescale
+
+
+def _esds_audio(esds: bytes) -> tuple:
+    """(codec_name, channels or None) from an esds box body."""
+
+    def descriptor(pos):
+        tag = esds[pos]
+        size = 0
+        pos += 1
+        for _ in range(4):
+            byte = esds[pos]
+            pos += 1
+            size = (size << 7) | (byte & 0x7F)
+            if not byte & 0x80:
+                break
+        return tag, pos, size
+
+    tag, pos, _ = descriptor(4)
+    if tag != 0x03:
+        raise _Unanswerable()
+    flags = esds[pos + 2]
+    pos += 3
+    if flags & 0x80:
+        pos += 2
+    if flags & 0x40:
+        pos += 1 + esds[pos]
+    if flags & 0x20:
+        pos += 2
+    tag, pos, _ = descriptor(pos)
+    if tag != 0x04:
+        raise _Unanswerable()
+    object_type = esds[pos]
+    if object_type in (0x69, 0x6B):
+        return "mp3", None
+    if object_type not in (0x40, 0x66, 0x67, 0x68):
+        raise _Unanswerable()
+
+    tag, pos, size = descriptor(pos + 13)
+    if tag != 0x05:
+        raise _Unanswerable()
+    bits = _Bits(esds[pos:pos + size])
+    audio_object_type = bits.read(5)
+    if audio_object_type == 31:
+        raise _Unanswerable()
+    if bits.read(4) == 15:
+        bits.read(24)
+    channel_config = bits.read(4)
+    if audio_object_type == 29:
+        # HE-AACv2 signals mono; parametric stereo decodes to two channels
+        return "aac", 2
+    if channel_config not in AAC_CHANNEL_CONFIGS:
+        raise _Unanswerable()
+    return "aac", AAC_CHANNEL_CONFIGS[channel_config]
+
+
+def _mp4_audio(entry_type: bytes, data: bytes, start: int, end: int) -> dict:
+    version = struct.unpack(">H", data[start + 8:start + 10])[0]
+    if version > 1:
+        raise _Unanswerable()
+    channels = struct.unpack(">H", data[start + 16:start + 18])[0]
+    children = _boxes(data, start + (44 if version == 1 else 28), end)
+
+    def child(box_type):
+        if box_type not in children:
+            raise _Unanswerable()
+        child_start, child_end = children[box_type][0]
+        return data[child_start:child_end]
+
+    if entry_type == b"mp4a":
+        codec_name, esds_channels = _esds_audio(child(b"esds"))
+        channels = esds_channels or channels
+    elif entry_type == b"ac-3":
+        value = int.from_bytes(child(b"dac3")[:3], "big")
+        codec_name = "ac3"
+        channels = AC3_ACMOD_CHANNELS[(value >> 11) & 0x07] + ((value >> 10) & 0x01)
+    elif entry_type == b"ec-3":
+        bits = _Bits(child(b"dec3"))
+        bits.read(13)
+        if bits.read(3) != 0:
+            raise _Unanswerable()
+        bits.read(2 + 5 + 1 + 1 + 3)
+        acmod = bits.read(3)
+        lfe = bits.read(1)
+        bits.read(3)
+        if bits.read(4) != 0:
+            # Dependent substreams (7.1 and up) add channels named in chan_loc
+            raise _Unanswerable()
+        codec_name = "eac3"
+        channels = AC3_ACMOD_CHANNELS[acmod] + lfe
+    elif entry_type == b"Opus":
+        codec_name = "opus"
+        channels = child(b"dOps")[1]
+    elif entry_type in (b"fLaC", b"alac"):
+        codec_name = "flac" if entry_type == b"fLaC" else "alac"
+    else:
+        raise _Unanswerable()
+    return {"codec_type": "audio", "codec_name": codec_name, "channels": channels}
+
+
+def _mp4_video(entry_type: bytes, data: bytes, start: int, end: int) -> dict:
+    codec_name = MP4_VIDEO_CODECS.get(entry_type)
+    if codec_name is None:
+        raise _Unanswerable()
+    width, height = struct.unpack(">HH", data[start + 24:start + 28])
+    children = _boxes(data, start + 78, end)
+
+    bit_depth = transfer = matrix = None
+    config_box = {"h264": b"avcC", "hevc": b"hvcC", "av1": b"av1C", "vp9": b"vpcC"}[codec_name]
+    if config_box in children:
+        config_start, config_end = children[config_box][0]
+        config = data[config_start:config_end]
+        if codec_name == "vp9":
+            bit_depth = config[6] >> 4
+            if config[0] >= 1:
+                transfer, matrix = config[8], config[9]
+        else:
+            bit_depth = _codec_bit_depth(codec_name, config)
+
+    if b"colr" in children:
+        colr_start, _ = children[b"colr"][0]
+        if data[colr_start:colr_start + 4] in (b"nclx", b"nclc"):
+            _, transfer, matrix = struct.unpack(">HHH", data[colr_start + 4:colr_start + 10])
+
+    return _video_stream(codec_name, width, height, bit_depth, transfer, matrix)
+
+
+def _read_mp4(reader: _Reader) -> dict:
+    moov = None
+    pos = 0
+    while pos < reader.file_size:
+        box_type, body, size = _read_box(reader, pos)
+        if box_type == b"moov":
+            moov = reader.read(body, size)
+            break
+        pos = body + size
+    if moov is None:
+        raise _Unanswerable()
+
+    boxes = _boxes(moov)
+    if b"mvhd" not in boxes:
+        raise _Unanswerable()
+    duration = _mp4_duration(moov, *boxes[b"mvhd"][0])
+
+    streams = []
+    for trak_start, trak_end in boxes.get(b"trak", []):
+        mdia_start, mdia_end = _find_box(moov, trak_start, trak_end, b"mdia")
+        hdlr_start, _ = _find_box(moov, mdia_start, mdia_end, b"hdlr")
+        handler = moov[hdlr_start + 8:hdlr_start + 12]
+        if handler not in (b"vide", b"soun"):
+            continue
+        stsd_start, stsd_end = _find_box(moov, mdia_start, mdia_end, b"minf", b"stbl", b"stsd")
+        # Skip version/flags and entry count; describe the first sample entry
+        entries = _boxes(moov, stsd_start + 8, stsd_end)
+        if len(entries) != 1:
+            raise _Unanswerable()
+        entry_type, [(entry_start, entry_end)] = next(iter(entries.items()))
+        if handler == b"vide":
+            streams.append(_mp4_video(entry_type, moov, entry_start, entry_end))
+        else:
+            streams.append(_mp4_audio(entry_type, moov, entry_start, entry_end))
+    return {"streams": streams, "format": _format(duration)}
+
+
+def read_container_info(filepath: str):
+    """Read stream info from Matroska/WebM or MP4/MOV headers.
+
+    Returns a dict shaped like ffprobe's -show_format -show_streams JSON, or
+    None if the file is another container or its headers cannot answer
+    every field.
+    """
+    try:
+        with open(filepath, "rb") as fh:
+            reader = _Reader(fh)
+            magic = reader.read(0, 8)
+            if magic[:4] == EBML_MAGIC:
+                return _read_matroska(reader)
+            if magic[4:8] in MP4_TOP_LEVEL:
+                return _read_mp4(reader)
+    except (_Unanswerable, IndexError, KeyError, ValueError, struct.error, OSError):
+        pass
+    return None
@@ -0,0 +1,238 @@
+"""Content fingerprints for finding duplicate files across the library.
+
+/parse and /parse-season copy files into movies/, episodes/ and seasons/,
+so the same video can end up on disk more than once.  Hashing every file
+in a multi-TB library would take hours, so files are fingerprinted in
+stages:
+- only files whose size matches another file's can be duplicates, so the
+  rest are never read
+- those get a sample hash of SAMPLE_SIZE blocks from the head, middle and
+  tail (files up to three blocks long are hashed whole)
+- files whose sizes and samples match form a candidate group, which a full
+  hash confirms on demand
+
+Fingerprints are stored in SQLite keyed by path and validated against
+(device, inode, size, mtime_ns), so a rescan only reads new or changed
+files.  Hard links share an inode and so share storage: they are listed
+in a group but never counted as reclaimable space.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+from .config import CONFIG_DIR
+from .helpers import get_torrent_subfolder
+from .library import MEDIA_TYPES
+
+FINGERPRINT_INDEX_PATH = os.path.join(CONFIG_DIR, "fingerprints.db")
+
+# Bytes read from each of the head, middle and tail of a file
+SAMPLE_SIZE = 1024 * 1024
+
+# Smaller files (NFOs, subtitles) aren't worth reporting
+MIN_FILE_SIZE = 1024 * 1024
+
+# Read size for full hashes
+FULL_HASH_CHUNK = 8 * 1024 * 1024
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS files (
+        path TEXT PRIMARY KEY,
+        dev INTEGER NOT NULL,
+        ino INTEGER NOT NULL,
+        size INTEGER NOT NULL,
+        mtime_ns INTEGER NOT NULL,
+        sample TEXT,
+        full TEXT
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS files_size ON files (size)",
+)
+
+
+def _sample_hash(filepath: str, size: int) -> tuple:
+    """Hash the size plus head, middle and tail blocks. Returns (digest, bytes read, whole file)."""
+    digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+    with open(filepath, "rb") as f:
+        if size <= 3 * SAMPLE_SIZE:
+            data = f.read()
+            digest.update(data)
+            return digest.hexdigest(), len(data), True
+        read = 0
+        for offset in (0, (size - SAMPLE_SIZE) // 2, size - SAMPLE_SIZE):
+            f.seek(offset)
+            data = f.read(SAMPLE_SIZE)
+            digest.update(data)
+            read += len(data)
+    return digest.hexdigest(), read, False
+
+
+def _full_hash(filepath: str) -> tuple:
+    """Hash the whole file. Returns (digest, bytes read)."""
+    digest = hashlib.blake2b(digest_size=16)
+    read = 0
+    with open(filepath, "rb") as f:
+        while True:
+            data = f.read(FULL_HASH_CHUNK)
+            if not data:
+                break
+            digest.update(data)
+            read += len(data)
+    return digest.hexdigest(), read
+
+
+class FingerprintIndex:
+    """SQLite-backed store of per-file content fingerprints."""
+
+    def __init__(self, path: str = FINGERPRINT_INDEX_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._lock, closing(self._connect()) as conn:
+            for statement in _SCHEMA:
+                conn.execute(statement)
+            conn.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def scan(self, base_dir: str) -> dict:
+        """Bring the index in line with the files under the type folders and sample size collisions.
+
+        Returns counts of files seen, files sampled and bytes read.
+        """
+        start = time.perf_counter()
+        seen = {}
+        for media_type in MEDIA_TYPES:
+            type_dir = os.path.join(base_dir, get_torrent_subfolder(media_type))
+            for root, _, names in os.walk(type_dir):
+                for name in names:
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    if st.st_size >= MIN_FILE_SIZE:
+                        seen[path] = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+        with self._lock, closing(self._connect()) as conn:
+            known = {
+                row["path"]: (row["dev"], row["ino"], row["size"], row["mtime_ns"])
+                for row in conn.execute("SELECT path, dev, ino, size, mtime_ns FROM files")
+            }
+            conn.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in known if path not in seen])
+            # New and changed files lose their hashes
+            conn.executemany(
+                "INSERT OR REPLACE INTO files (path, dev, ino, size, mtime_ns) VALUES (?, ?, ?, ?, ?)",
+                [(path,) + identity for path, identity in seen.items() if known.get(path) != identity],
+            )
+            conn.commit()
+            # Only sizes shared by more than one inode can hold duplicates
+            pending = conn.execute(
+                "SELECT path, size FROM files WHERE sample IS NULL AND size IN "
+                "(SELECT size FROM files GROUP BY size HAVING COUNT(DISTINCT dev || ':' || ino) > 1)"
+            ).fetchall()
+
+        sampled = 0
+        bytes_read = 0
+        for row in pending:
+            try:
+                sample, read, whole = _sample_hash(row["path"], row["size"])
+            except OSError as e:
+                print(f"Warning: Could not fingerprint {row['path']}: {e}")
+                continue
+            sampled += 1
+            bytes_read += read
+            with self._lock, closing(self._connect()) as conn:
+                # A file read whole needs no separate full hash
+                conn.execute(
+                    "UPDATE files SET sample = ?, full = ? WHERE path = ?",
+                    (sample, sample if whole else None, row["path"]),
+                )
+                conn.commit()
+
+        return {
+            "files": len(seen),
+            "sampled": sampled,
+            "bytes_read": bytes_read,
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+
+    def duplicates(self, verify: bool = False) -> dict:
+        """Group files with matching size and sample hash, largest reclaimable space first.
+
+        With verify, every candidate is fully hashed (once per file version)
+        and groups are split by the full hash; groups are "confirmed" only
+        when every copy's full hash matched.
+        """
+        with self._lock, closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT path, dev, ino, size, sample, full FROM files WHERE sample IS NOT NULL "
+                "AND (size, sample) IN (SELECT size, sample FROM files WHERE sample IS NOT NULL "
+                "GROUP BY size, sample HAVING COUNT(DISTINCT dev || ':' || ino) > 1) ORDER BY path"
+            ).fetchall()
+
+        bytes_read = 0
+        full_hashes = {row["path"]: row["full"] for row in rows}
+        if verify:
+            for row in rows:
+                if full_hashes[row["path"]] is not None:
+                    continue
+                try:
+                    full, read = _full_hash(row["path"])
+                except OSError as e:
+                    print(f"Warning: Could not hash {row['path']}: {e}")
+                    continue
+                bytes_read += read
+                full_hashes[row["path"]] = full
+                with self._lock, closing(self._connect()) as conn:
+                    conn.execute("UPDATE files SET full = ? WHERE path = ?", (full, row["path"]))
+                    conn.commit()
+
+        groups = {}
+        for row in rows:
+            full = full_hashes[row["path"]]
+            # Once verified, files are split by full hash; otherwise the sample decides
+            key = (row["size"], row["sample"], full if verify else None)
+            groups.setdefault(key, []).append((row, full))
+
+        report = []
+        for (size, _, _), members in groups.items():
+            copies = len({(row["dev"], row["ino"]) for row, _ in members})
+            if copies < 2:
+                continue
+            fulls = {full for _, full in members}
+            report.append({
+                "size": size,
+                "copies": copies,
+                "reclaimable": size * (copies - 1),
+                "confirmed": None not in fulls and len(fulls) == 1,
+                "files": [row["path"] for row, _ in members],
+            })
+        report.sort(key=lambda group: (-group["reclaimable"], group["files"][0]))
+
+        return {
+            "groups": report,
+            "reclaimable": sum(group["reclaimable"] for group in report),
+            "bytes_read": bytes_read,
+        }
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_fingerprint_index() -> FingerprintIndex:
+    """Get the shared FingerprintIndex."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = FingerprintIndex(FINGERPRINT_INDEX_PATH)
+        return _index
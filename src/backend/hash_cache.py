@@ -0,0 +1,134 @@
+"""Persistent cache of piece digests keyed by file identity.
+
+Re-creating a torrent after fixing a typo renames the video file and rewrites
+the NFO, but the video's bytes are unchanged.  The cache stores the SHA-1
+digests of every piece that lies entirely inside one file, keyed by the file's
+(device, inode, size, mtime_ns) plus the piece size and the file's offset
+alignment within the piece stream, so those pieces can be reused instead of
+re-read.  v2 torrents additionally store each file's SHA-256 pieces root and
+piece layer under kind "sha256".  Entries are evicted least-recently-used once
+the cache grows past its size cap.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+from .config import CONFIG_DIR
+
+HASH_CACHE_PATH = os.path.join(CONFIG_DIR, "hash-cache.db")
+DEFAULT_MAX_MB = 256
+
+# Bump when the table layout changes; older caches are discarded
+SCHEMA_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS piece_hashes (
+    kind TEXT NOT NULL,
+    dev INTEGER NOT NULL,
+    ino INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    piece_size INTEGER NOT NULL,
+    alignment INTEGER NOT NULL,
+    digests BLOB NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (kind, dev, ino, size, mtime_ns, piece_size, alignment)
+)
+"""
+
+
+def file_key(filepath: str, piece_size: int, alignment: int, kind: str = "sha1") -> tuple:
+    """Build the cache key for a file at the given piece size and alignment.
+
+    alignment is the file's offset in the piece stream modulo piece_size.
+    kind is "sha1" for v1 piece digests or "sha256" for v2 Merkle hashes.
+    """
+    st = os.stat(filepath)
+    return (kind, st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, piece_size, alignment)
+
+
+class HashCache:
+    """SQLite-backed store of per-file piece digests with LRU eviction."""
+
+    def __init__(self, path: str = HASH_CACHE_PATH, max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._lock, closing(self._connect()) as conn:
+            if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                conn.execute("DROP TABLE IF EXISTS piece_hashes")
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            conn.execute(_SCHEMA)
+            conn.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def lookup(self, key: tuple):
+        """Return the stored digests for key, or None if not cached."""
+        with self._lock, closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT digests FROM piece_hashes WHERE kind = ? AND dev = ? AND ino = ? "
+                "AND size = ? AND mtime_ns = ? AND piece_size = ? AND alignment = ?",
+                key,
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE piece_hashes SET last_used = ? WHERE kind = ? AND dev = ? AND ino = ? "
+                "AND size = ? AND mtime_ns = ? AND piece_size = ? AND alignment = ?",
+                (time.time(), *key),
+            )
+            conn.commit()
+            return bytes(row[0])
+
+    def store(self, key: tuple, digests: bytes):
+        """Store digests for key, evicting the least recently used entries if over the cap."""
+        if len(digests) > self.max_bytes:
+            return
+        with self._lock, closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO piece_hashes "
+                "(kind, dev, ino, size, mtime_ns, piece_size, alignment, digests, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (*key, digests, time.time()),
+            )
+            self._evict(conn)
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection):
+        total = conn.execute("SELECT COALESCE(SUM(LENGTH(digests)), 0) FROM piece_hashes").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        victims = []
+        for rowid, size in conn.execute("SELECT rowid, LENGTH(digests) FROM piece_hashes ORDER BY last_used"):
+            victims.append((rowid,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+        conn.executemany("DELETE FROM piece_hashes WHERE rowid = ?", victims)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_hash_cache(config: dict):
+    """Get the shared HashCache, or None if caching is disabled in config."""
+    global _cache
+    cache_config = config.get("hash_cache", {})
+    if not cache_config.get("enabled", True):
+        return None
+    try:
+        max_bytes = int(cache_config.get("max_mb", DEFAULT_MAX_MB)) * 1024 * 1024
+    except (TypeError, ValueError):
+        max_bytes = DEFAULT_MAX_MB * 1024 * 1024
+    with _cache_lock:
+        if _cache is None:
+            _cache = HashCache(HASH_CACHE_PATH, max_bytes)
+        _cache.max_bytes = max_bytes
+        return _cache
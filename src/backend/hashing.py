@@ -0,0 +1,207 @@
+"""Parallel piece hashing for torrent creation.
+
+torf's Torrent.generate() is replaced by this engine so that large video files
+are hashed on every available core.  The file stream is read once, in order,
+by the calling thread; each piece buffer is handed to a thread pool (hashlib
+releases the GIL while digesting) and the SHA-1 digests are collected back in
+piece order before being written into the torrent's metainfo.
+
+When a HashCache is supplied, pieces that lie entirely inside a file whose
+digests are already cached are skipped instead of read.
+
+Progress is reported through an optional callback (same convention as torf):
+callback(pieces_done, piece_count, bytes_done, total_bytes) is called after
+each piece and hashing stops with HashingCancelled if it returns anything
+other than None.
+"""
+
+import bisect
+import hashlib
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from torf import Torrent
+
+from .hash_cache import file_key
+
+# How many pieces may be queued per worker before the reader waits.  Keeps
+# memory bounded (workers * PIECES_PER_WORKER * piece_size) while giving every
+# worker something to do when the disk is fast.
+PIECES_PER_WORKER = 4
+
+
+class HashingCancelled(Exception):
+    """Raised when a progress callback asks hashing to stop."""
+
+
+def get_hash_workers(config: dict) -> int:
+    """Get the number of hashing workers from config.
+
+    A value of 0 (the default) or anything invalid means one worker per CPU core.
+    """
+    workers = config.get("hashing", {}).get("workers", 0)
+    try:
+        workers = int(workers)
+    except (TypeError, ValueError):
+        workers = 0
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    return workers
+
+
+def _sha1(data) -> bytes:
+    return hashlib.sha1(data).digest()
+
+
+class PieceStream:
+    """Random access to the concatenated contents of a list of files."""
+
+    def __init__(self, filepaths: list):
+        self.files = []
+        self.starts = []
+        offset = 0
+        for filepath in filepaths:
+            size = os.path.getsize(filepath)
+            self.files.append((filepath, offset, size))
+            self.starts.append(offset)
+            offset += size
+        self.total_size = offset
+        self._index = None
+        self._fh = None
+
+    def close(self):
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+            self._index = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def read_into(self, offset: int, view: memoryview):
+        """Fill view with the stream bytes starting at offset."""
+        filled = 0
+        index = bisect.bisect_right(self.starts, offset) - 1
+        while filled < len(view):
+            filepath, start, size = self.files[index]
+            position = offset + filled - start
+            if position >= size:
+                index += 1
+                continue
+            if index != self._index:
+                self.close()
+                self._fh = open(filepath, "rb", buffering=0)
+                self._index = index
+            if self._fh.tell() != position:
+                self._fh.seek(position)
+            want = min(len(view) - filled, size - position)
+            read = self._fh.readinto(view[filled:filled + want])
+            if not read:
+                raise IOError(f"Unexpected end of file: {filepath}")
+            filled += read
+
+
+def _cached_spans(stream: PieceStream, piece_size: int, cache):
+    """Look up cached digests for every file in stream.
+
+    Returns (known, misses, stats) where known maps piece index to digest and
+    misses lists (key, first_piece, count) spans to store after hashing.
+    """
+    known = {}
+    misses = []
+    stats = {"hits": 0, "misses": 0}
+    for filepath, start, size in stream.files:
+        first = -(-start // piece_size)
+        count = (start + size) // piece_size - first
+        if count <= 0:
+            continue
+        key = file_key(filepath, piece_size, start % piece_size)
+        digests = cache.lookup(key)
+        if digests is not None and len(digests) == count * 20:
+            stats["hits"] += 1
+            for i in range(count):
+                known[first + i] = digests[i * 20:(i + 1) * 20]
+        else:
+            stats["misses"] += 1
+            misses.append((key, first, count))
+    return known, misses, stats
+
+
+def hash_pieces(filepaths: list, piece_size: int, workers: int, cache=None, callback=None) -> tuple:
+    """Hash the v1 piece stream of filepaths.
+
+    Returns (pieces, stats) where pieces is the concatenated SHA-1 digests and
+    stats counts cache hits/misses and reused/hashed pieces.
+
+    Raises HashingCancelled if callback returns anything other than None.
+    """
+    with PieceStream(filepaths) as stream:
+        total_size = stream.total_size
+        piece_count = -(-total_size // piece_size)
+        if cache is not None:
+            known, misses, stats = _cached_spans(stream, piece_size, cache)
+        else:
+            known, misses, stats = {}, [], {"hits": 0, "misses": 0}
+
+        digests = [None] * piece_count
+        pending = deque()
+        max_pending = max(1, workers) * PIECES_PER_WORKER
+        done = 0
+
+        def finish(index, digest):
+            nonlocal done
+            digests[index] = digest
+            done += 1
+            if callback is not None:
+                bytes_done = min(done * piece_size, total_size)
+                if callback(done, piece_count, bytes_done, total_size) is not None:
+                    raise HashingCancelled()
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            try:
+                for index in range(piece_count):
+                    if index in known:
+                        finish(index, known[index])
+                        continue
+                    offset = index * piece_size
+                    piece = bytearray(min(piece_size, total_size - offset))
+                    stream.read_into(offset, memoryview(piece))
+                    pending.append((index, pool.submit(_sha1, piece)))
+                    if len(pending) >= max_pending:
+                        done_index, future = pending.popleft()
+                        finish(done_index, future.result())
+                while pending:
+                    done_index, future = pending.popleft()
+                    finish(done_index, future.result())
+            except HashingCancelled:
+                for _, future in pending:
+                    future.cancel()
+                raise
+
+    for key, first, count in misses:
+        cache.store(key, b"".join(digests[first:first + count]))
+
+    stats["pieces_reused"] = len(known)
+    stats["pieces_hashed"] = piece_count - len(known)
+    return b"".join(digests), stats
+
+
+def generate_torrent(torrent: Torrent, workers: int, cache=None, callback=None) -> dict:
+    """Hash all pieces of torrent and store them in its metainfo.
+
+    Drop-in replacement for torrent.generate() that uses hash_pieces().
+    Returns the hashing stats.
+    """
+    filepaths = [str(fp) for fp in torrent.filepaths]
+    pieces, stats = hash_pieces(filepaths, torrent.piece_size, workers, cache, callback)
+
+    if len(pieces) // 20 != torrent.pieces:
+        raise RuntimeError(
+            f"Unexpected number of hashes generated: {len(pieces) // 20} instead of {torrent.pieces}"
+        )
+    torrent.metainfo["info"]["pieces"] = pieces
+    return stats
@@ -1,7 +1,8 @@
 """Utility functions for file handling, naming templates, and serialization."""
 
 import os
-import re
+
+from .naming import render_template
 
 VIDEO_EXTENSIONS = [".mp4", ".mkv", ".avi", ".mov", ".wmv", ".flv", ".webm", ".m4v"]
 
@@ -103,38 +104,24 @@ def serialize_parsed(parsed: dict) -> dict:
     return parsed_dict
 
 
+def infer_media_type(parsed: dict) -> str:
+    """Infer movie, season, episode or unknown from guessit parsed data."""
+    if parsed.get("type", "") == "movie":
+        return "movie"
+    elif "season" in parsed and "episode" not in parsed:
+        return "season"
+    elif "episode" in parsed:
+        return "episode"
+    return "unknown"
+
+
 def apply_movie_template(template: str, details: dict) -> str:
     """Apply the movie naming template with the given details.
 
     Replaces placeholders like {title}, {year}, etc. with actual values.
     Dots in the title are preserved (spaces are converted to dots).
     """
-    title = details.get("name", "Unknown").replace(" ", ".")
-    year = details.get("year", "")
-    quality = details.get("resolution", "")
-    source = details.get("source", "")
-    # Map display codec names to template-friendly names
-    codec = details.get("video_codec", "")
-    group = details.get("release_group", "")
-
-    result = template
-    result = result.replace("{title}", title)
-    result = result.replace("{year}", year)
-    result = result.replace("{quality}", quality)
-    result = result.replace("{source}", source)
-    result = result.replace("{codec}", codec)
-    result = result.replace("{group}", group)
-
-    # Remove any unreplaced template variables (from empty fields)
-    # e.g. ".." from empty year -> single dot
-    while ".." in result:
-        result = result.replace("..", ".")
-    # Remove trailing dots before the group separator
-    result = result.replace(".-", "-")
-    # Remove leading/trailing dots
-    result = result.strip(".")
-
-    return result
+    return render_template(template, "movie", details)
 
 
 def apply_episode_template(template: str, details: dict) -> str:
@@ -142,53 +129,7 @@ def apply_episode_template(template: str, details: dict) -> str:
 
     Handles format specifiers like {season:02} and {episode:02} for zero-padding.
     """
-    show_name = details.get("show_name", details.get("name", "Unknown")).replace(" ", ".")
-    episode_title = details.get("episode_title", "").replace(" ", ".")
-    year = details.get("year", "")
-    quality = details.get("resolution", "")
-    source = details.get("source", "")
-    codec = details.get("video_codec", "")
-    group = details.get("release_group", "")
-    season = details.get("season", 0)
-    episode = details.get("episode", 0)
-
-    result = template
-    result = result.replace("{title}", show_name)
-    result = result.replace("{year}", year)
-    result = result.replace("{quality}", quality)
-    result = result.replace("{source}", source)
-    result = result.replace("{codec}", codec)
-    result = result.replace("{group}", group)
-    result = result.replace("{episode_title}", episode_title)
-
-    # Handle {season:02} and {episode:02} format specifiers
-    def replace_formatted(match):
-        field = match.group(1)
-        fmt = match.group(2)
-        if field == "season":
-            val = int(season)
-        elif field == "episode":
-            val = int(episode)
-        else:
-            return match.group(0)
-        try:
-            return format(val, fmt)
-        except (ValueError, TypeError):
-            return str(val)
-
-    result = re.sub(r"\{(season|episode):([^}]+)\}", replace_formatted, result)
-
-    # Plain {season} and {episode} without format specifier
-    result = result.replace("{season}", str(season))
-    result = result.replace("{episode}", str(episode))
-
-    # Clean up double dots and trailing dots
-    while ".." in result:
-        result = result.replace("..", ".")
-    result = result.replace(".-", "-")
-    result = result.strip(".")
-
-    return result
+    return render_template(template, "episode", details)
 
 
 def apply_season_template(template: str, details: dict) -> str:
@@ -196,44 +137,4 @@ def apply_season_template(template: str, details: dict) -> str:
 
     Handles format specifiers like {season:02} for zero-padding.
     """
-    show_name = details.get("show_name", "Unknown").replace(" ", ".")
-    year = details.get("year", "")
-    quality = details.get("resolution", "")
-    source = details.get("source", "")
-    codec = details.get("video_codec", "")
-    group = details.get("release_group", "")
-    season = details.get("season", 0)
-
-    result = template
-    result = result.replace("{title}", show_name)
-    result = result.replace("{year}", year)
-    result = result.replace("{quality}", quality)
-    result = result.replace("{source}", source)
-    result = result.replace("{codec}", codec)
-    result = result.replace("{group}", group)
-
-    # Handle {season:02} format specifier
-    def replace_formatted(match):
-        field = match.group(1)
-        fmt = match.group(2)
-        if field == "season":
-            val = int(season)
-        else:
-            return match.group(0)
-        try:
-            return format(val, fmt)
-        except (ValueError, TypeError):
-            return str(val)
-
-    result = re.sub(r"\{(season):([^}]+)\}", replace_formatted, result)
-
-    # Plain {season} without format specifier
-    result = result.replace("{season}", str(season))
-
-    # Clean up double dots and trailing dots
-    while ".." in result:
-        result = result.replace("..", ".")
-    result = result.replace(".-", "-")
-    result = result.strip(".")
-
-    return result
+    return render_template(template, "season", details)
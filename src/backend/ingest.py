@@ -0,0 +1,248 @@
+"""Placing source videos into the output directory without copying bytes.
+
+/parse and /parse-season used to shutil.copy2 every source video, which for a
+4K season pack means hundreds of gigabytes of writes.  ingest_file() tries the
+cheapest strategy the filesystem supports and falls back in order:
+
+- reflink: copy-on-write clone (Btrfs, XFS, APFS, ...) - no data written
+- hardlink: a second directory entry for the same inode - no data written
+- copy_file_range: in-kernel copy, no round trip through user space
+- copy: plain shutil.copy2
+
+When a real copy is needed and ingest.hash_on_copy is enabled, the copy is
+done in user space instead and every piece is hashed from the same buffer it
+is written from.  The digests are stored in the piece-hash cache under the
+destination file's identity, so creating the torrent later only has to hash
+the pieces that touch the NFO rather than re-reading the whole video.
+"""
+
+import ctypes
+import hashlib
+import os
+import shutil
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from torf import Torrent
+
+from .hash_cache import file_key, get_hash_cache
+from .hashing import PIECES_PER_WORKER, get_hash_workers
+from .torrent_v2 import FileHashes, hash_chunk
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+INGEST_STRATEGIES = ("reflink", "hardlink", "copy_file_range", "copy")
+
+# ioctl request number for FICLONE on Linux (_IOW(0x94, 9, int))
+FICLONE = 0x40049409
+
+
+def get_ingest_strategy(config: dict) -> str:
+    """Get the preferred ingest strategy from config, defaulting to reflink."""
+    strategy = config.get("ingest", {}).get("strategy", "reflink")
+    if strategy not in INGEST_STRATEGIES:
+        print(f"Warning: Unknown ingest strategy '{strategy}', using reflink")
+        strategy = "reflink"
+    return strategy
+
+
+def _reflink(src: str, dst: str) -> int:
+    if sys.platform.startswith("linux") and fcntl is not None:
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        shutil.copystat(src, dst)
+        return 0
+    if sys.platform == "darwin":
+        libc = ctypes.CDLL(None, use_errno=True)
+        if libc.clonefile(os.fsencode(src), os.fsencode(dst), 0) != 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), dst)
+        return 0
+    raise NotImplementedError("reflink is not supported on this platform")
+
+
+def _hardlink(src: str, dst: str) -> int:
+    os.link(src, dst)
+    return 0
+
+
+def _copy_file_range(src: str, dst: str) -> int:
+    if not hasattr(os, "copy_file_range"):
+        raise NotImplementedError("copy_file_range is not supported on this platform")
+    size = os.path.getsize(src)
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        copied = 0
+        while copied < size:
+            sent = os.copy_file_range(fsrc.fileno(), fdst.fileno(), size - copied)
+            if sent == 0:
+                break
+            copied += sent
+    if copied != size:
+        raise OSError(f"copy_file_range copied {copied} of {size} bytes")
+    shutil.copystat(src, dst)
+    return size
+
+
+def _copy(src: str, dst: str) -> int:
+    shutil.copy2(src, dst)
+    return os.path.getsize(dst)
+
+
+def get_hash_options(config: dict, total_size: int):
+    """Get the copy-and-hash settings for an ingest of total_size bytes.
+
+    The piece size is predicted the way torf will pick it for the finished
+    torrent.  Returns None if hash_on_copy or the hash cache is disabled.
+    """
+    if not config.get("ingest", {}).get("hash_on_copy", True):
+        return None
+    cache = get_hash_cache(config)
+    if cache is None or total_size <= 0:
+        return None
+    return {
+        "piece_size": Torrent.calculate_piece_size(total_size),
+        "workers": get_hash_workers(config),
+        "with_v2": config.get("torrent_format", "v1") in ("v2", "hybrid"),
+        "cache": cache,
+    }
+
+
+def _hash_copied_piece(chunk: bytearray, piece_size: int, leaf_width: int) -> tuple:
+    """SHA-1 digest of a full piece plus, if leaf_width is set, its v2 piece-layer node."""
+    sha1 = hashlib.sha1(chunk).digest() if len(chunk) == piece_size else None
+    node = hash_chunk(chunk, leaf_width, 0)[0] if leaf_width else None
+    return sha1, node
+
+
+def copy_and_hash(src: str, dst: str, piece_size: int, workers: int, with_v2: bool, cache,
+                  offset: int = 0) -> dict:
+    """Copy src to dst, hashing each piece from the buffer being written.
+
+    offset is where the file will sit in the v1 piece stream of the finished
+    torrent; v1 digests are computed for every piece that lies entirely inside
+    the file at that position.  v2 and hybrid torrents align every file to a
+    piece boundary, so offset is ignored when with_v2 is set and the v2 pieces
+    root and piece layer are stored as well.  Everything is cached under dst.
+    """
+    size = os.path.getsize(src)
+    alignment = 0 if with_v2 else offset % piece_size
+    v2 = FileHashes(dst, size, piece_size, hybrid=False, last=True) if with_v2 and size else None
+    leaf_width = v2.leaf_width if v2 else 0
+    v1_digests = []
+    pending = deque()
+    max_pending = max(1, workers) * PIECES_PER_WORKER
+
+    def finish(index, future):
+        sha1, node = future.result()
+        if sha1 is not None:
+            v1_digests.append(sha1)
+        if v2 is not None:
+            v2.layer[index] = node
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool, \
+            open(src, "rb", buffering=0) as fsrc, open(dst, "wb") as fdst:
+        # Bytes before the first piece boundary belong to a piece shared with
+        # the previous file; copy them without hashing
+        head = min(-alignment % piece_size, size)
+        if head:
+            fdst.write(fsrc.read(head))
+
+        index = 0
+        while True:
+            chunk = bytearray(piece_size)
+            view = memoryview(chunk)
+            filled = 0
+            while filled < piece_size:
+                read = fsrc.readinto(view[filled:])
+                if not read:
+                    break
+                filled += read
+            if not filled:
+                break
+            if filled < piece_size:
+                chunk = chunk[:filled]
+            fdst.write(chunk)
+            pending.append((index, pool.submit(_hash_copied_piece, chunk, piece_size, leaf_width)))
+            index += 1
+            if len(pending) >= max_pending:
+                finish(*pending.popleft())
+            if filled < piece_size:
+                break
+        while pending:
+            finish(*pending.popleft())
+
+    shutil.copystat(src, dst)
+
+    # Key by the destination after copystat so mtime matches what create sees
+    if v1_digests:
+        cache.store(file_key(dst, piece_size, alignment, "sha1"), b"".join(v1_digests))
+    if v2 is not None:
+        v2.finish()
+        cache.store(file_key(dst, piece_size, 0, "sha256"), v2.root + b"".join(v2.layer))
+
+    return {
+        "strategy": "copy",
+        "bytes_written": size,
+        "precomputed_pieces": len(v1_digests),
+        "piece_size": piece_size,
+    }
+
+
+_STRATEGY_FUNCTIONS = {
+    "reflink": _reflink,
+    "hardlink": _hardlink,
+    "copy_file_range": _copy_file_range,
+    "copy": _copy,
+}
+
+
+# (strategy, source device, destination device) combinations that already
+# failed, so a season pack does not retry an unsupported clone per episode
+_unsupported = set()
+
+
+def ingest_file(src: str, dst: str, strategy: str = "reflink", hash_options=None, offset: int = 0) -> dict:
+    """Place src at dst, starting with strategy and falling back down INGEST_STRATEGIES.
+
+    If hash_options (from get_hash_options) is given and the fallback reaches
+    a real copy, the copy is replaced by copy_and_hash() with the file's
+    offset in the piece stream.
+
+    dst must not exist.  Returns {"strategy": used, "bytes_written": n}.
+    """
+    devices = (os.stat(src).st_dev, os.stat(os.path.dirname(dst)).st_dev)
+    candidates = INGEST_STRATEGIES[INGEST_STRATEGIES.index(strategy):]
+    for candidate in candidates:
+        if (candidate, *devices) in _unsupported:
+            continue
+        if hash_options is not None and candidate in ("copy_file_range", "copy"):
+            try:
+                return copy_and_hash(src, dst, offset=offset, **hash_options)
+            except OSError:
+                if os.path.lexists(dst):
+                    os.remove(dst)
+                raise
+        try:
+            written = _STRATEGY_FUNCTIONS[candidate](src, dst)
+            return {"strategy": candidate, "bytes_written": written}
+        except (OSError, NotImplementedError) as e:
+            if candidate == "copy":
+                raise
+            print(f"Ingest strategy {candidate} unavailable ({e}), falling back")
+            _unsupported.add((candidate, *devices))
+            if os.path.lexists(dst):
+                os.remove(dst)
+
+
+def summarize_ingest(results: list) -> dict:
+    """Combine per-file ingest results into one summary for a response."""
+    strategies = {r["strategy"] for r in results}
+    return {
+        "strategy": strategies.pop() if len(strategies) == 1 else "mixed",
+        "bytes_written": sum(r["bytes_written"] for r in results),
+        "files": results,
+    }
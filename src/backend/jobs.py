@@ -0,0 +1,176 @@
+"""Background job queue for torrent creation.
+
+The create pipelines in routes/create.py hash every byte of the torrent and
+can run for minutes on large files.  Jobs run them on a bounded worker pool
+so the HTTP request returns immediately with a job id; progress is recorded
+from the hashing callback and cancellation is honoured between pieces.
+"""
+
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+
+from .hashing import HashingCancelled
+
+FINAL_STATUSES = ("done", "failed", "cancelled")
+
+# Finished jobs kept around for late status/event requests
+MAX_FINISHED_JOBS = 100
+
+
+class Job:
+    """State of one queued or running torrent creation."""
+
+    def __init__(self, kind: str):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = "queued"
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.pieces_done = 0
+        self.piece_count = 0
+        self.bytes_done = 0
+        self.total_bytes = 0
+        self.result = None
+        self.error = None
+        self.status_code = None
+        # Bumped on every change so event streams only send new state
+        self.version = 0
+        self._hash_started = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+        if self.status == "queued":
+            self.set_status("cancelled")
+
+    def progress(self, pieces_done: int, piece_count: int, bytes_done: int, total_bytes: int):
+        """Hashing callback; returns True to stop hashing once cancelled."""
+        with self._lock:
+            if self._hash_started is None:
+                self._hash_started = time.monotonic()
+            self.pieces_done = pieces_done
+            self.piece_count = piece_count
+            self.bytes_done = bytes_done
+            self.total_bytes = total_bytes
+            self.version += 1
+        if self._cancel.is_set():
+            return True
+        return None
+
+    def set_status(self, status: str, result=None, error=None, status_code=None):
+        with self._lock:
+            self.status = status
+            if status == "running":
+                self.started = time.time()
+            elif status in FINAL_STATUSES:
+                self.finished = time.time()
+            self.result = result
+            self.error = error
+            self.status_code = status_code
+            self.version += 1
+
+    def snapshot(self) -> dict:
+        """JSON-serializable view of the job including throughput and ETA."""
+        with self._lock:
+            mb_per_s = 0.0
+            eta_seconds = None
+            if self._hash_started is not None and self.bytes_done:
+                elapsed = time.monotonic() - self._hash_started
+                if elapsed > 0:
+                    rate = self.bytes_done / elapsed
+                    mb_per_s = round(rate / (1024 ** 2), 1)
+                    if self.status == "running":
+                        eta_seconds = round((self.total_bytes - self.bytes_done) / rate, 1)
+            return {
+                "job_id": self.id,
+                "kind": self.kind,
+                "status": self.status,
+                "version": self.version,
+                "created": self.created,
+                "started": self.started,
+                "finished": self.finished,
+                "bytes_hashed": self.bytes_done,
+                "total_bytes": self.total_bytes,
+                "pieces_done": self.pieces_done,
+                "piece_count": self.piece_count,
+                "mb_per_s": mb_per_s,
+                "eta_seconds": eta_seconds,
+                "result": self.result,
+                "error": self.error,
+                "status_code": self.status_code,
+            }
+
+
+class JobManager:
+    """Runs pipeline functions on a bounded thread pool and tracks their jobs."""
+
+    def __init__(self, workers: int = 1):
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, pipeline, req) -> Job:
+        """Queue pipeline(req, callback=...) and return its Job."""
+        job = Job(kind)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._pool.submit(self._run, job, pipeline, req)
+        return job
+
+    def get(self, job_id: str):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> list:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def _prune(self):
+        finished = [j for j in self._jobs.values() if j.status in FINAL_STATUSES]
+        finished.sort(key=lambda j: j.finished or 0)
+        for job in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job.id]
+
+    def _run(self, job: Job, pipeline, req):
+        if job.cancel_requested:
+            job.set_status("cancelled")
+            return
+        job.set_status("running")
+        try:
+            result = pipeline(req, callback=job.progress)
+        except HashingCancelled:
+            job.set_status("cancelled")
+        except HTTPException as e:
+            job.set_status("failed", error=e.detail, status_code=e.status_code)
+        except Exception as e:
+            job.set_status("failed", error=str(e), status_code=500)
+        else:
+            job.set_status("done", result=result)
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager(config: dict) -> JobManager:
+    """Get the shared JobManager, sized from config["jobs"]["workers"] on first use."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            try:
+                workers = int(config.get("jobs", {}).get("workers", 1))
+            except (TypeError, ValueError):
+                workers = 1
+            _manager = JobManager(workers)
+        return _manager
@@ -0,0 +1,771 @@
+"""Persistent index of the torrent library in the output directory.
+
+Listing the library used to walk every type folder and list every torrent
+folder on each request.  The index keeps one SQLite row per torrent folder
+with its file count, total size, creation time, info hashes and parsed
+name, so /torrents is a single query with paging, sorting and filters.
+
+Rows are kept current three ways:
+- the create, parse and delete endpoints refresh the folders they touch
+- a background watcher re-stats the output directory every watch_interval
+  seconds and rescans only folders whose mtime (or .torrent) changed
+- a full reconcile runs when the backend starts and whenever the output
+  directory changes
+
+Parsing names is the slow part of a scan, so new rows are listed straight
+away and their parsed fields are filled in afterwards in batches.
+
+Every change bumps a library version and stamps the rows it touched with
+it; removed folders leave a tombstone.  Clients that remember the version
+they last saw can ask for just the rows added, updated or removed since
+(changes()), or send it back as an ETag to get a 304 when nothing moved.
+
+search() runs over FTS5 indexes of each folder's name, parsed title,
+IMDb/TMDB ids, technical fields and NFO text.  The FTS tables take their
+content from the torrents table and triggers keep them in step, so every
+path that writes a row also updates the search indexes.  Whole words (and
+the start of the last word, as the user types) are looked up in a word
+index; only when nothing matches does a trigram index match parts of
+words, and then a typo-tolerant pass.  SQLite builds without the trigram
+tokenizer (before 3.34) get the word index only.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+from .config import CONFIG_DIR, load_config
+from .helpers import get_torrent_subfolder, get_torrents_base_dir
+from .parsing import get_parse_workers, parse_batch
+from .torrent_v2 import read_infohashes
+
+LIBRARY_INDEX_PATH = os.path.join(CONFIG_DIR, "library.db")
+DEFAULT_WATCH_INTERVAL = 10
+MEDIA_TYPES = ("movie", "episode", "season")
+
+# Names parsed per batch when filling in parsed fields
+PARSE_BATCH_SIZE = 500
+
+# Tombstones kept for changes(); clients further behind get a reset
+MAX_TOMBSTONES = 10000
+
+# Bump when the tables change; an index with another version is rebuilt
+SCHEMA_VERSION = 3
+
+# Only the start of an NFO is indexed for search
+NFO_MAX_BYTES = 64 * 1024
+
+IMDB_ID_PATTERN = re.compile(r"\b(tt\d{5,})\b")
+TMDB_ID_PATTERN = re.compile(r"themoviedb\.org/(?:movie|tv)/(\d+)")
+_WORD_SEPARATORS = re.compile(r"[\W_]+")
+
+# Parsed fields indexed as the "tech" search column
+TECH_FIELDS = (
+    "screen_size", "source", "video_codec", "video_profile", "color_depth", "audio_codec",
+    "audio_channels", "audio_profile", "other", "streaming_service", "edition",
+)
+
+# Score of a query word found in the name, title, ids, tech fields or only the NFO
+SEARCH_WEIGHTS = (10, 8, 5, 3, 1)
+
+# Newest matches ranked per search; older ones are only reached by narrowing the query
+SEARCH_CANDIDATES = 200
+
+# Fuzzy matches must share at least this fraction of the query's trigrams
+FUZZY_MIN_SIMILARITY = 0.4
+FUZZY_CANDIDATES = 100
+
+SORT_COLUMNS = {
+    "name": "name COLLATE NOCASE",
+    "created": "ctime",
+    "size": "total_size",
+    "files": "file_count",
+}
+
+# Filters on parsed fields: query parameter -> column
+PARSED_FILTERS = ("title", "year", "season", "resolution", "source", "video_codec")
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS torrents (
+        id INTEGER PRIMARY KEY,
+        path TEXT NOT NULL UNIQUE,
+        name TEXT NOT NULL,
+        media_type TEXT NOT NULL,
+        file_count INTEGER NOT NULL,
+        total_size INTEGER NOT NULL,
+        ctime REAL NOT NULL,
+        mtime_ns INTEGER NOT NULL,
+        torrent_mtime_ns INTEGER,
+        infohash TEXT,
+        infohash_v2 TEXT,
+        parsed TEXT,
+        title TEXT,
+        year INTEGER,
+        season INTEGER,
+        resolution TEXT,
+        source TEXT,
+        video_codec TEXT,
+        ids TEXT,
+        tech TEXT,
+        nfo TEXT,
+        added_version INTEGER NOT NULL,
+        version INTEGER NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS torrents_type_name ON torrents (media_type, name COLLATE NOCASE)",
+    "CREATE INDEX IF NOT EXISTS torrents_version ON torrents (version)",
+    "CREATE TABLE IF NOT EXISTS removed (path TEXT PRIMARY KEY, version INTEGER NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS removed_version ON removed (version)",
+)
+
+# Search indexes -> tokenizer
+_SEARCH_TABLES = {
+    "search_words": "unicode61 remove_diacritics 2",
+    "search_trigrams": "trigram",
+}
+
+_SEARCH_TABLE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5("
+    "name, title, ids, tech, nfo, content='torrents', content_rowid='id', tokenize='{tokenizer}'{options})"
+)
+
+# Keep an external-content FTS table in step with torrents
+_SEARCH_TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS {table}_insert AFTER INSERT ON torrents BEGIN
+        INSERT INTO {table} (rowid, name, title, ids, tech, nfo)
+        VALUES (new.id, new.name, new.title, new.ids, new.tech, new.nfo);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS {table}_delete AFTER DELETE ON torrents BEGIN
+        INSERT INTO {table} ({table}, rowid, name, title, ids, tech, nfo)
+        VALUES ('delete', old.id, old.name, old.title, old.ids, old.tech, old.nfo);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS {table}_update AFTER UPDATE OF name, title, ids, tech, nfo
+    ON torrents BEGIN
+        INSERT INTO {table} ({table}, rowid, name, title, ids, tech, nfo)
+        VALUES ('delete', old.id, old.name, old.title, old.ids, old.tech, old.nfo);
+        INSERT INTO {table} (rowid, name, title, ids, tech, nfo)
+        VALUES (new.id, new.name, new.title, new.ids, new.tech, new.nfo);
+    END
+    """,
+)
+
+_COLUMNS = (
+    "path", "name", "media_type", "file_count", "total_size", "ctime",
+    "infohash", "infohash_v2", "parsed",
+)
+
+# Search also needs the short columns it ranks by
+_SEARCH_COLUMNS = ", ".join(f"torrents.{column}" for column in _COLUMNS + ("title", "ids", "tech"))
+
+
+def _torrent_file_for(folder_path: str) -> str:
+    # The pipelines write <type_dir>/<name>.torrent next to the folder
+    return folder_path.rstrip(os.sep) + ".torrent"
+
+
+def _read_nfo(nfo_path: str):
+    try:
+        with open(nfo_path, "rb") as f:
+            return f.read(NFO_MAX_BYTES).decode("utf-8", errors="replace")
+    except OSError as e:
+        print(f"Warning: Could not read {nfo_path}: {e}")
+        return None
+
+
+def _nfo_ids(nfo: str):
+    """IMDb and TMDB ids linked from an NFO, space separated."""
+    if not nfo:
+        return None
+    ids = IMDB_ID_PATTERN.findall(nfo) + TMDB_ID_PATTERN.findall(nfo)
+    return " ".join(dict.fromkeys(ids)) or None
+
+
+def _scan_folder(folder_path: str, media_type: str, folder_stat, torrent_mtime_ns, known_row):
+    """Build the column values for one torrent folder."""
+    file_count = 0
+    total_size = 0
+    nfo_path = None
+    with os.scandir(folder_path) as entries:
+        for entry in entries:
+            if entry.is_file():
+                file_count += 1
+                total_size += entry.stat().st_size
+                if nfo_path is None and entry.name.lower().endswith(".nfo"):
+                    nfo_path = entry.path
+    nfo = _read_nfo(nfo_path) if nfo_path else None
+
+    # Only re-read the .torrent when it changed since the last scan
+    infohash = infohash_v2 = None
+    if torrent_mtime_ns is not None:
+        if known_row is not None and known_row["torrent_mtime_ns"] == torrent_mtime_ns:
+            infohash, infohash_v2 = known_row["infohash"], known_row["infohash_v2"]
+        else:
+            try:
+                hashes = read_infohashes(_torrent_file_for(folder_path))
+                infohash, infohash_v2 = hashes["v1"], hashes["v2"]
+            except (OSError, ValueError) as e:
+                print(f"Warning: Could not read {_torrent_file_for(folder_path)}: {e}")
+
+    return {
+        "path": folder_path,
+        "name": os.path.basename(folder_path),
+        "media_type": media_type,
+        "file_count": file_count,
+        "total_size": total_size,
+        "ctime": folder_stat.st_ctime,
+        "mtime_ns": folder_stat.st_mtime_ns,
+        "torrent_mtime_ns": torrent_mtime_ns,
+        "infohash": infohash,
+        "infohash_v2": infohash_v2,
+        "nfo": nfo,
+        "ids": _nfo_ids(nfo),
+    }
+
+
+def _parsed_columns(parsed: dict) -> dict:
+    def first(value):
+        return value[0] if isinstance(value, list) and value else value
+
+    def as_int(value):
+        try:
+            return int(first(value))
+        except (TypeError, ValueError):
+            return None
+
+    return {
+        "parsed": json.dumps(parsed),
+        "title": parsed.get("title"),
+        "year": as_int(parsed.get("year")),
+        "season": as_int(parsed.get("season")),
+        "resolution": parsed.get("screen_size"),
+        "source": first(parsed.get("source")),
+        "video_codec": first(parsed.get("video_codec")),
+        "tech": " ".join(
+            str(item)
+            for field in TECH_FIELDS
+            for item in (parsed[field] if isinstance(parsed.get(field), list) else [parsed.get(field)])
+            if item
+        ) or None,
+    }
+
+
+class LibraryIndex:
+    """SQLite-backed index of the torrent folders under the output directory."""
+
+    def __init__(self, path: str = LIBRARY_INDEX_PATH):
+        self.path = path
+        self.base_dir = None
+        self._lock = threading.RLock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.trigram = True
+        # One connection for the life of the index, used under the lock, so
+        # SQLite's page cache stays warm between searches
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._connection() as conn:
+            # The version lives apart from the rows so it keeps counting up
+            # across rebuilds and clients never see an old version again
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS meta (id INTEGER PRIMARY KEY CHECK (id = 0), "
+                "version INTEGER NOT NULL, floor INTEGER NOT NULL)"
+            )
+            conn.execute("INSERT OR IGNORE INTO meta (id, version, floor) VALUES (0, 0, 0)")
+            if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                for table in _SEARCH_TABLES:
+                    conn.execute(f"DROP TABLE IF EXISTS {table}")
+                conn.execute("DROP TABLE IF EXISTS torrents")
+                conn.execute("DROP TABLE IF EXISTS removed")
+                conn.execute("UPDATE meta SET floor = version")
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            for statement in _SCHEMA:
+                conn.execute(statement)
+
+            tables = []
+            for table, tokenizer in _SEARCH_TABLES.items():
+                # Prefix indexes speed up two and three letter prefixes of the last word
+                options = ", prefix='2 3'" if table == "search_words" else ""
+                try:
+                    conn.execute(_SEARCH_TABLE.format(table=table, tokenizer=tokenizer, options=options))
+                except sqlite3.OperationalError as e:
+                    # SQLite before 3.34 has no trigram tokenizer
+                    print(f"Warning: Library search can't use {table} ({e})")
+                    continue
+                for statement in _SEARCH_TRIGGERS:
+                    conn.execute(statement.format(table=table))
+                tables.append(table)
+            self.trigram = "search_trigrams" in tables
+            conn.commit()
+
+    @contextmanager
+    def _connection(self):
+        with self._lock:
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.rollback()
+                raise
+
+    def _type_for(self, folder_path: str):
+        """The media type of a folder directly inside one of the type dirs, else None."""
+        if self.base_dir is None:
+            return None
+        parent = os.path.dirname(os.path.abspath(folder_path))
+        for media_type in MEDIA_TYPES:
+            if parent == os.path.join(self.base_dir, get_torrent_subfolder(media_type)):
+                return media_type
+        return None
+
+    def _version(self, conn) -> int:
+        return conn.execute("SELECT version FROM meta").fetchone()[0]
+
+    def _set_version(self, conn, version: int):
+        conn.execute("UPDATE meta SET version = ?", (version,))
+
+    def _upsert(self, conn, row: dict, version: int):
+        conn.execute(
+            "INSERT INTO torrents (path, name, media_type, file_count, total_size, ctime, mtime_ns, "
+            "torrent_mtime_ns, infohash, infohash_v2, nfo, ids, added_version, version) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(path) DO UPDATE SET media_type = excluded.media_type, "
+            "file_count = excluded.file_count, total_size = excluded.total_size, ctime = excluded.ctime, "
+            "mtime_ns = excluded.mtime_ns, torrent_mtime_ns = excluded.torrent_mtime_ns, "
+            "infohash = excluded.infohash, infohash_v2 = excluded.infohash_v2, nfo = excluded.nfo, "
+            "ids = excluded.ids, version = excluded.version",
+            (row["path"], row["name"], row["media_type"], row["file_count"], row["total_size"],
+             row["ctime"], row["mtime_ns"], row["torrent_mtime_ns"], row["infohash"], row["infohash_v2"],
+             row["nfo"], row["ids"], version, version),
+        )
+        conn.execute("DELETE FROM removed WHERE path = ?", (row["path"],))
+
+    def _delete(self, conn, paths: list, version: int) -> int:
+        """Delete rows, leaving tombstones for changes(). Returns how many existed."""
+        deleted = 0
+        for path in paths:
+            if conn.execute("DELETE FROM torrents WHERE path = ?", (path,)).rowcount:
+                conn.execute("INSERT OR REPLACE INTO removed (path, version) VALUES (?, ?)", (path, version))
+                deleted += 1
+        if deleted:
+            excess = conn.execute("SELECT COUNT(*) FROM removed").fetchone()[0] - MAX_TOMBSTONES
+            if excess > 0:
+                oldest = conn.execute(
+                    "SELECT version FROM removed ORDER BY version LIMIT 1 OFFSET ?", (excess - 1,)
+                ).fetchone()[0]
+                conn.execute("DELETE FROM removed WHERE version <= ?", (oldest,))
+                conn.execute("UPDATE meta SET floor = MAX(floor, ?)", (oldest,))
+        return deleted
+
+    def reconcile(self, base_dir: str) -> dict:
+        """Bring the index in line with base_dir. Returns counts of added, updated and removed rows."""
+        base_dir = os.path.abspath(base_dir)
+        counts = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+        with self._connection() as conn:
+            self.base_dir = base_dir
+            version = self._version(conn) + 1
+            known = {
+                row["path"]: row
+                for row in conn.execute(
+                    "SELECT path, media_type, mtime_ns, torrent_mtime_ns, infohash, infohash_v2 FROM torrents"
+                )
+            }
+            seen = set()
+            for media_type in MEDIA_TYPES:
+                type_dir = os.path.join(base_dir, get_torrent_subfolder(media_type))
+                try:
+                    entries = list(os.scandir(type_dir))
+                except OSError:
+                    continue
+                torrent_mtimes = {
+                    entry.name[:-len(".torrent")]: entry.stat().st_mtime_ns
+                    for entry in entries
+                    if entry.name.endswith(".torrent") and entry.is_file()
+                }
+                for entry in entries:
+                    if not entry.is_dir():
+                        continue
+                    path = entry.path
+                    seen.add(path)
+                    folder_stat = entry.stat()
+                    torrent_mtime_ns = torrent_mtimes.get(entry.name)
+                    row = known.get(path)
+                    if (row is not None and row["media_type"] == media_type
+                            and row["mtime_ns"] == folder_stat.st_mtime_ns
+                            and row["torrent_mtime_ns"] == torrent_mtime_ns):
+                        counts["unchanged"] += 1
+                        continue
+                    try:
+                        scanned = _scan_folder(path, media_type, folder_stat, torrent_mtime_ns, row)
+                    except OSError:
+                        continue
+                    self._upsert(conn, scanned, version)
+                    counts["added" if row is None else "updated"] += 1
+
+            counts["removed"] = self._delete(conn, [path for path in known if path not in seen], version)
+            if counts["added"] or counts["updated"] or counts["removed"]:
+                self._set_version(conn, version)
+            conn.commit()
+        return counts
+
+    def ensure_current(self, base_dir: str):
+        """Reconcile if the index has not been built for base_dir yet."""
+        with self._lock:
+            if self.base_dir != os.path.abspath(base_dir):
+                self.reconcile(base_dir)
+
+    def refresh(self, *folder_paths):
+        """Rescan the given torrent folders now, dropping any that no longer exist."""
+        with self._connection() as conn:
+            version = self._version(conn) + 1
+            changed = False
+            for folder_path in folder_paths:
+                folder_path = os.path.abspath(folder_path)
+                media_type = self._type_for(folder_path)
+                if media_type is None or not os.path.isdir(folder_path):
+                    changed = self._delete(conn, [folder_path], version) or changed
+                    continue
+                torrent_path = _torrent_file_for(folder_path)
+                torrent_mtime_ns = os.stat(torrent_path).st_mtime_ns if os.path.isfile(torrent_path) else None
+                scanned = _scan_folder(folder_path, media_type, os.stat(folder_path), torrent_mtime_ns, None)
+                self._upsert(conn, scanned, version)
+                # The name may have changed with the contents; parse it again
+                conn.execute("UPDATE torrents SET parsed = NULL WHERE path = ?", (folder_path,))
+                changed = True
+            if changed:
+                self._set_version(conn, version)
+            conn.commit()
+        self.fill_parsed(paths=[os.path.abspath(path) for path in folder_paths])
+
+    def remove(self, folder_path: str):
+        with self._connection() as conn:
+            version = self._version(conn) + 1
+            if self._delete(conn, [os.path.abspath(folder_path)], version):
+                self._set_version(conn, version)
+            conn.commit()
+
+    def fill_parsed(self, workers: int = 1, paths=None) -> int:
+        """Parse the names of rows that have not been parsed yet. Returns how many were parsed.
+
+        With paths, only those rows are parsed.
+        """
+        total = 0
+        while True:
+            with self._connection() as conn:
+                if paths is None:
+                    rows = conn.execute(
+                        "SELECT path, name FROM torrents WHERE parsed IS NULL LIMIT ?", (PARSE_BATCH_SIZE,)
+                    ).fetchall()
+                else:
+                    rows = conn.execute(
+                        f"SELECT path, name FROM torrents WHERE parsed IS NULL "
+                        f"AND path IN ({', '.join('?' * len(paths))})",
+                        paths,
+                    ).fetchall()
+            if not rows:
+                return total
+            # Parse outside the lock so listing isn't held up by guessit
+            results = parse_batch([row["name"] for row in rows], workers)
+            with self._connection() as conn:
+                version = self._version(conn) + 1
+                for row, result in zip(rows, results):
+                    columns = _parsed_columns(result["parsed"])
+                    conn.execute(
+                        "UPDATE torrents SET parsed = ?, title = ?, year = ?, season = ?, resolution = ?, "
+                        "source = ?, video_codec = ?, tech = ?, version = ? WHERE path = ?",
+                        (columns["parsed"], columns["title"], columns["year"], columns["season"],
+                         columns["resolution"], columns["source"], columns["video_codec"], columns["tech"],
+                         version, row["path"]),
+                    )
+                self._set_version(conn, version)
+                conn.commit()
+            total += len(rows)
+
+    def query(self, media_type=None, q=None, filters=None, sort="name", order="asc",
+              limit=None, offset=0) -> tuple:
+        """Return (total matching rows, page of rows as dicts)."""
+        where, params = [], []
+        if media_type:
+            where.append("media_type = ?")
+            params.append(media_type)
+        if q:
+            where.append("name LIKE ? ESCAPE '\\'")
+            params.append(_like_pattern(q))
+        for column, value in (filters or {}).items():
+            if column not in PARSED_FILTERS or value is None:
+                continue
+            if column == "title":
+                where.append("title LIKE ?")
+                params.append(value)
+            else:
+                where.append(f"{column} = ?")
+                params.append(value)
+        clause = (" WHERE " + " AND ".join(where)) if where else ""
+        direction = "DESC" if order == "desc" else "ASC"
+        order_by = f"{SORT_COLUMNS.get(sort, SORT_COLUMNS['name'])} {direction}, path"
+
+        with self._connection() as conn:
+            total = conn.execute(f"SELECT COUNT(*) FROM torrents{clause}", params).fetchone()[0]
+            sql = f"SELECT {', '.join(_COLUMNS)} FROM torrents{clause} ORDER BY {order_by}"
+            page_params = list(params)
+            if limit is not None:
+                sql += " LIMIT ? OFFSET ?"
+                page_params += [limit, offset]
+            rows = conn.execute(sql, page_params).fetchall()
+        return total, [_row_to_entry(row) for row in rows]
+
+    def search(self, q: str, media_type=None, limit: int = 50) -> dict:
+        """Search names, titles, ids, technical fields and NFOs, best matches first.
+
+        Every word of q has to match a whole word, except the last which may
+        be the start of one.  Failing that, words may match inside words,
+        and failing that names and titles are searched allowing for typos,
+        with "fuzzy" set.
+        """
+        words = q.split()
+        if not words:
+            return {"results": [], "fuzzy": False}
+        with self._connection() as conn:
+            rows = self._search_words(conn, words, media_type, limit)
+            if not rows and self.trigram:
+                rows = self._search_substrings(conn, words, media_type, limit)
+            if rows or not self.trigram:
+                return {"results": [_row_to_entry(row) for row in rows], "fuzzy": False}
+            rows = self._search_fuzzy(conn, words, media_type, limit)
+        return {"results": [_row_to_entry(row) for row in rows], "fuzzy": True}
+
+    def _match(self, conn, table: str, match: str, where: list, params: list,
+               count: int = SEARCH_CANDIDATES) -> list:
+        """The newest count matches of an FTS query."""
+        clause = "".join(f" AND {condition}" for condition in where)
+        # Walking the index newest first stops after count rows however
+        # common the words are, where ORDER BY rank would score them all
+        return conn.execute(
+            f"SELECT {_SEARCH_COLUMNS} FROM {table} JOIN torrents ON torrents.id = {table}.rowid "
+            f"WHERE {table} MATCH ?{clause} ORDER BY {table}.rowid DESC LIMIT ?",
+            [match] + params + [count],
+        ).fetchall()
+
+    def _search_words(self, conn, words: list, media_type, limit: int) -> list:
+        match = " AND ".join(fts_string(word) for word in words)
+        where, params = ([], []) if not media_type else (["torrents.media_type = ?"], [media_type])
+        rows = self._match(conn, "search_words", match, where, params)
+        if len(rows) < limit:
+            # Only now treat the last word as a prefix: a prefix query reads
+            # every matching word's full list, which is slow for common words
+            rows = self._match(conn, "search_words", match + "*", where, params)
+        return _ranked(rows, words, limit)
+
+    def _search_substrings(self, conn, words: list, media_type, limit: int) -> list:
+        where, params = [], []
+        # Trigrams can't match words under three characters; check those with LIKE
+        terms = [word for word in words if len(word) >= 3]
+        for word in words:
+            if len(word) < 3:
+                where.append("(torrents.name LIKE ? ESCAPE '\\' OR torrents.title LIKE ? ESCAPE '\\')")
+                params += [_like_pattern(word)] * 2
+        if media_type:
+            where.append("torrents.media_type = ?")
+            params.append(media_type)
+
+        if not terms:
+            # Only short words: no index to use, so scan names newest first
+            return conn.execute(
+                f"SELECT {_SEARCH_COLUMNS} FROM torrents WHERE {' AND '.join(where)} "
+                f"ORDER BY torrents.id DESC LIMIT ?",
+                params + [limit],
+            ).fetchall()
+
+        match = " AND ".join(fts_string(term) for term in terms)
+        return _ranked(self._match(conn, "search_trigrams", match, where, params), words, limit)
+
+    def _search_fuzzy(self, conn, words: list, media_type, limit: int) -> list:
+        # Candidates are the newest rows holding each of the query's
+        # trigrams, most shared trigrams first; keep those whose name and
+        # title share enough padded trigrams with the query.  Each lookup
+        # stops after FUZZY_CANDIDATES rows, so common trigrams cost no more
+        # than rare ones (counting them with fts5vocab reads every row).
+        wanted = trigrams(" ".join(words))
+        shared = Counter()
+        for gram in wanted:
+            if " " not in gram:
+                shared.update(
+                    row[0] for row in conn.execute(
+                        "SELECT rowid FROM search_trigrams WHERE search_trigrams MATCH ? "
+                        "ORDER BY rowid DESC LIMIT ?",
+                        (fts_string(gram), FUZZY_CANDIDATES),
+                    )
+                )
+        ids = [rowid for rowid, _ in shared.most_common(FUZZY_CANDIDATES)]
+        if not ids:
+            return []
+
+        clause, params = "", []
+        if media_type:
+            clause, params = " AND torrents.media_type = ?", [media_type]
+        candidates = conn.execute(
+            f"SELECT {_SEARCH_COLUMNS} FROM torrents WHERE torrents.id IN ({', '.join('?' * len(ids))}){clause}",
+            ids + params,
+        ).fetchall()
+
+        scored = []
+        for row in candidates:
+            have = trigrams(f"{row['name']} {row['title'] or ''}")
+            similarity = len(wanted & have) / len(wanted)
+            if similarity >= FUZZY_MIN_SIMILARITY:
+                scored.append((similarity, row))
+        scored.sort(key=lambda item: -item[0])
+        return [row for _, row in scored[:limit]]
+
+    def version(self) -> int:
+        """The current library version; it goes up with every change."""
+        with self._connection() as conn:
+            return self._version(conn)
+
+    def changes(self, since: int) -> dict:
+        """Rows added or updated and paths removed after version since.
+
+        "reset" is true when since is too old (or from before a rebuild) to
+        answer; the client should fetch the whole list again.
+        """
+        with self._connection() as conn:
+            version, floor = conn.execute("SELECT version, floor FROM meta").fetchone()
+            if since < floor or since > version:
+                return {"version": version, "reset": True, "added": [], "updated": [], "removed": []}
+            rows = conn.execute(
+                f"SELECT {', '.join(_COLUMNS)}, added_version FROM torrents WHERE version > ? "
+                f"ORDER BY name COLLATE NOCASE, path",
+                (since,),
+            ).fetchall()
+            removed = [
+                row["path"] for row in conn.execute(
+                    "SELECT path FROM removed WHERE version > ? ORDER BY path", (since,)
+                )
+            ]
+        return {
+            "version": version,
+            "reset": False,
+            "added": [_row_to_entry(row) for row in rows if row["added_version"] > since],
+            "updated": [_row_to_entry(row) for row in rows if row["added_version"] <= since],
+            "removed": removed,
+        }
+
+    def stats(self) -> dict:
+        with self._connection() as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM torrents").fetchone()[0]
+            unparsed = conn.execute("SELECT COUNT(*) FROM torrents WHERE parsed IS NULL").fetchone()[0]
+        return {"entries": entries, "unparsed": unparsed, "base_dir": self.base_dir, "version": self.version()}
+
+
+def _like_pattern(text: str) -> str:
+    """A LIKE pattern matching text anywhere, for use with ESCAPE '\\'."""
+    return "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def fts_string(text: str) -> str:
+    return '"' + text.replace('"', '""') + '"'
+
+
+def trigrams(text: str) -> set:
+    """Trigrams of each word padded with spaces, as pg_trgm does, so a typo costs fewer of them."""
+    grams = set()
+    for word in _WORD_SEPARATORS.split(text.lower()):
+        if word:
+            padded = f"  {word} "
+            grams.update([padded[i:i + 3] for i in range(len(padded) - 2)])
+    return grams
+
+
+def _ranked(candidates: list, words: list, limit: int) -> list:
+    words = [word.lower() for word in words]
+    candidates.sort(key=lambda row: -_match_score(row, words))
+    return candidates[:limit]
+
+
+def _match_score(row, words: list) -> int:
+    """Rank a search match by where its words were found; NFO-only matches score lowest."""
+    name = row["name"].lower()
+    fields = (name, (row["title"] or "").lower(), (row["ids"] or "").lower(), (row["tech"] or "").lower())
+    score = 0
+    for word in words:
+        for field, weight in zip(fields, SEARCH_WEIGHTS):
+            if word in field:
+                score += weight
+                break
+        else:
+            score += SEARCH_WEIGHTS[-1]
+    return score
+
+
+def _row_to_entry(row) -> dict:
+    return {
+        "name": row["name"],
+        "path": row["path"],
+        "file_count": row["file_count"],
+        "type": row["media_type"],
+        "total_size": row["total_size"],
+        "created": datetime.fromtimestamp(row["ctime"]).strftime("%Y-%m-%d %H:%M"),
+        "infohash": row["infohash"],
+        "infohash_v2": row["infohash_v2"],
+        "parsed": json.loads(row["parsed"]) if row["parsed"] else None,
+    }
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_library_index() -> LibraryIndex:
+    """Get the shared LibraryIndex."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = LibraryIndex(LIBRARY_INDEX_PATH)
+        return _index
+
+
+def get_watch_interval(config: dict) -> float:
+    """Seconds between library rescans from config (0 turns the watcher off)."""
+    try:
+        return max(0.0, float(config.get("library", {}).get("watch_interval", DEFAULT_WATCH_INTERVAL)))
+    except (TypeError, ValueError):
+        return DEFAULT_WATCH_INTERVAL
+
+
+_watcher = None
+_watcher_stop = threading.Event()
+
+
+def _watch():
+    index = get_library_index()
+    while True:
+        config = load_config()
+        try:
+            index.reconcile(get_torrents_base_dir(config))
+            index.fill_parsed(get_parse_workers(config))
+        except Exception as e:
+            print(f"Warning: Library scan failed: {e}")
+        interval = get_watch_interval(config)
+        if not interval or _watcher_stop.wait(interval):
+            return
+
+
+def start_library_watcher():
+    """Reconcile the index in the background, then keep rescanning every watch_interval seconds."""
+    global _watcher
+    if _watcher is None or not _watcher.is_alive():
+        _watcher_stop.clear()
+        _watcher = threading.Thread(target=_watch, name="library-watcher", daemon=True)
+        _watcher.start()
+
+
+def stop_library_watcher():
+    _watcher_stop.set()
@@ -6,6 +6,7 @@ provides the uvicorn entry point when run directly.
 
 import os
 import sys
+from contextlib import asynccontextmanager
 
 # When this file is executed directly (python src/backend/main.py), Python
 # does not recognise it as part of the 'backend' package, so relative imports
@@ -19,7 +20,11 @@ if _SRC_DIR not in sys.path:
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from backend.config import init_config
+from backend.config import init_config, load_config
+from backend.library import start_library_watcher, stop_library_watcher
+from backend.parsing import configure_fast_path, prewarm, shutdown_parse_pool, start_parse_pool
+from backend.renames import recover_journals
+from backend.tmdb_client import close_tmdb_client, start_tmdb_client
 from backend.routes.health import router as health_router
 from backend.routes.config_routes import router as config_router
 from backend.routes.files import router as files_router
@@ -27,11 +32,32 @@ from backend.routes.seasons import router as seasons_router
 from backend.routes.torrents import router as torrents_router
 from backend.routes.tmdb import router as tmdb_router
 from backend.routes.create import router as create_router
+from backend.routes.jobs import router as jobs_router
+from backend.routes.metadata import router as metadata_router
+from backend.routes.library import router as library_router
 
 # Initialize config on module load
 init_config()
 
-app = FastAPI(title="Torrent Creator Backend")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Done here rather than at import time because the parse pool's spawned
+    # workers re-import this module
+    recover_journals()
+    config = load_config()
+    configure_fast_path(config)
+    prewarm()
+    start_parse_pool(config)
+    start_library_watcher()
+    start_tmdb_client()
+    yield
+    await close_tmdb_client()
+    stop_library_watcher()
+    shutdown_parse_pool()
+
+
+app = FastAPI(title="Torrent Creator Backend", lifespan=lifespan)
 
 # Allow Electron to connect (file:// origins send null, so allow all for local-only use)
 app.add_middleware(
@@ -50,6 +76,9 @@ app.include_router(seasons_router)
 app.include_router(torrents_router)
 app.include_router(tmdb_router)
 app.include_router(create_router)
+app.include_router(jobs_router)
+app.include_router(metadata_router)
+app.include_router(library_router)
 
 if __name__ == "__main__":
     import uvicorn
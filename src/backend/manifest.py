@@ -0,0 +1,188 @@
+"""Sidecar manifests caching the details of a torrent folder.
+
+Building /torrent-details for a folder means listing it, parsing the video
+and folder names and probing the video with ffprobe.  The create and parse
+pipelines write the result to <folder>.manifest.json next to the folder
+and its .torrent, together with the file sizes, the info hashes and the
+parameters the torrent was created with.
+
+Each manifest carries a stat fingerprint: the name, size and mtime of
+every entry in the folder plus the .torrent's mtime.  /torrent-details
+serves the manifest while the fingerprint still matches and rebuilds it
+only when something changed.
+"""
+
+import json
+import os
+
+from .config import atomic_write
+from .helpers import VIDEO_EXTENSIONS, serialize_parsed
+from .metadata import get_file_metadata
+from .parsing import parse_name
+from .torrent_v2 import read_infohashes
+
+MANIFEST_SUFFIX = ".manifest.json"
+
+# Bump when the manifest layout changes; older manifests are rebuilt
+MANIFEST_VERSION = 1
+
+
+def manifest_path(folder_path: str) -> str:
+    return os.path.normpath(folder_path) + MANIFEST_SUFFIX
+
+
+def torrent_path(folder_path: str) -> str:
+    """The .torrent the create pipelines write next to a folder."""
+    return os.path.normpath(folder_path) + ".torrent"
+
+
+def _scan(folder_path: str) -> list:
+    """[name, size, mtime_ns] for each entry of the folder, in directory order."""
+    entries = []
+    with os.scandir(folder_path) as it:
+        for entry in it:
+            st = entry.stat()
+            entries.append([entry.name, st.st_size if entry.is_file() else None, st.st_mtime_ns])
+    return entries
+
+
+def _fingerprint(folder_path: str, entries: list) -> dict:
+    try:
+        torrent_mtime_ns = os.stat(torrent_path(folder_path)).st_mtime_ns
+    except OSError:
+        torrent_mtime_ns = None
+    return {"entries": sorted(entries), "torrent_mtime_ns": torrent_mtime_ns}
+
+
+def _media_type(video_count: int, parsed: dict, folder_parsed: dict) -> str:
+    # If multiple video files exist, it's definitely a season pack
+    if video_count > 1:
+        return "season"
+    # If folder name indicates season without specific episode, it's a season pack
+    # (e.g., "Show.S01.1080p.WEB-DL" or "Show.Season.1.Complete")
+    if "season" in folder_parsed and "episode" not in folder_parsed:
+        return "season"
+    # Fall back to parsing the video file or folder
+    if parsed.get("type", "") == "movie":
+        return "movie"
+    if "episode" in parsed:
+        return "episode"
+    return "unknown"
+
+
+def _known_metadata(previous, video_entry):
+    """The previous manifest's metadata, if its video is the same file (renames keep size and mtime)."""
+    if not previous or not previous.get("filename") or video_entry is None:
+        return None
+    for name, size, mtime_ns in previous["fingerprint"]["entries"]:
+        if name == previous["filename"]:
+            if [size, mtime_ns] == video_entry[1:]:
+                return previous["metadata"]
+            return None
+    return None
+
+
+def build_manifest(folder_path: str, creation=None, probed=None, previous=None) -> dict:
+    """Scan, parse and probe a torrent folder into a manifest.
+
+    probed ({video file name: metadata}) skips the ffprobe run when the
+    caller has just probed the folder's videos; otherwise previous (an
+    older manifest for the folder, possibly under its old name) supplies
+    the metadata if the video file hasn't changed.
+    """
+    entries = _scan(folder_path)
+    videos = [entry for entry in entries if os.path.splitext(entry[0])[1].lower() in VIDEO_EXTENSIONS]
+
+    # The first video in directory order, as find_video_file picks it
+    video_entry = videos[0] if videos else None
+    video_file = video_entry[0] if video_entry else os.path.basename(folder_path) + ".mp4"
+    parsed = parse_name(video_file)
+
+    # Extract metadata from the actual video file only if one was found
+    metadata = (probed or {}).get(video_file)
+    if video_entry is None:
+        metadata = {}
+    elif metadata is None:
+        metadata = _known_metadata(previous, video_entry)
+        if metadata is None:
+            metadata = get_file_metadata(os.path.join(folder_path, video_file))
+
+    # Parse the folder name itself to get better context (not just the video file)
+    folder_parsed = parse_name(os.path.basename(folder_path))
+
+    infohashes = {"v1": None, "v2": None}
+    if os.path.isfile(torrent_path(folder_path)):
+        try:
+            infohashes = read_infohashes(torrent_path(folder_path))
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not read info hash of {torrent_path(folder_path)}: {e}")
+
+    return {
+        "manifest_version": MANIFEST_VERSION,
+        "fingerprint": _fingerprint(folder_path, entries),
+        "filename": video_file,
+        "parsed": serialize_parsed(parsed),
+        "metadata": metadata,
+        "media_type": _media_type(len(videos), parsed, folder_parsed),
+        "files": [{"name": name, "size": size} for name, size, _ in entries],
+        "infohash": infohashes["v1"],
+        "infohash_v2": infohashes["v2"],
+        "creation": creation,
+    }
+
+
+def read_manifest(folder_path: str):
+    """The folder's manifest as written, or None if missing or unreadable."""
+    try:
+        with open(manifest_path(folder_path), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Warning: Could not read manifest for {folder_path}: {e}")
+        return None
+    if not isinstance(manifest, dict) or manifest.get("manifest_version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def write_manifest(folder_path: str, creation=None, probed=None, previous_folder=None) -> dict:
+    """Build and write the folder's manifest; returns it.
+
+    previous_folder is where the folder was before a rename: its manifest
+    is reused for the probe results and removed.  creation carries over
+    from the old manifest when not given.
+    """
+    previous = read_manifest(previous_folder or folder_path)
+    if creation is None and previous:
+        creation = previous.get("creation")
+    manifest = build_manifest(folder_path, creation, probed, previous)
+    try:
+        atomic_write(manifest_path(folder_path), json.dumps(manifest, indent=2))
+    except OSError as e:
+        print(f"Warning: Could not write manifest for {folder_path}: {e}")
+    if previous_folder and os.path.normpath(previous_folder) != os.path.normpath(folder_path):
+        remove_manifest(previous_folder)
+    return manifest
+
+
+def load_manifest(folder_path: str) -> dict:
+    """The folder's manifest, rebuilt first if the folder or its .torrent changed since it was written."""
+    manifest = read_manifest(folder_path)
+    if manifest is not None:
+        try:
+            fingerprint = _fingerprint(folder_path, _scan(folder_path))
+        except OSError:
+            fingerprint = None
+        if manifest["fingerprint"] == fingerprint:
+            return manifest
+    return write_manifest(folder_path)
+
+
+def remove_manifest(folder_path: str):
+    try:
+        os.remove(manifest_path(folder_path))
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"Warning: Could not remove manifest for {folder_path}: {e}")
@@ -1,12 +1,47 @@
-"""Video file metadata extraction using ffprobe."""
+"""Video file metadata extraction.
 
+Matroska and MP4 headers are read directly (see container.py); ffprobe is only
+spawned for other containers or when the headers cannot answer every field.
+"""
+
+import asyncio
 import os
 import json
 import subprocess
 
+from .config import load_config
+from .container import read_container_info
+from .metadata_cache import get_metadata_cache
+
+FFPROBE_TIMEOUT = 10
+DEFAULT_PROBE_WORKERS = 8
+
+# Fields compared across the episodes of a season pack
+CONSISTENCY_FIELDS = ("resolution", "video_codec", "bit_depth", "hdr_format", "audio_codec", "audio_channels")
+
+
+def _ffprobe_command(filepath: str) -> list:
+    return ["ffprobe", "-v", "quiet", "-print_format", "json", "-show_format", "-show_streams", filepath]
+
 
 def get_file_metadata(filepath: str) -> dict:
-    """Extract metadata from video file using ffprobe."""
+    """Extract metadata from video file, reusing cached results for unchanged files."""
+    config = load_config()
+    cache = get_metadata_cache(config)
+    if cache is not None:
+        cached = cache.get(filepath)
+        if cached is not None:
+            return cached
+
+    metadata, probed = probe_file_metadata(filepath, use_native_probe(config))
+    # Only cache real probe results so installing ffprobe later takes effect
+    if cache is not None and probed:
+        cache.put(filepath, metadata)
+    return metadata
+
+
+def _empty_metadata(filepath: str) -> dict:
+    """Metadata dict with only the human-readable file size filled in."""
     metadata = {
         "resolution": "",
         "video_codec": "",
@@ -31,142 +66,41 @@ def get_file_metadata(filepath: str) -> dict:
     except Exception as e:
         print(f"Error getting file size: {e}")
 
+    return metadata
+
+
+def use_native_probe(config: dict) -> bool:
+    """Whether container headers are read before falling back to ffprobe."""
+    return config.get("metadata", {}).get("native_probe", True)
+
+
+def probe_file_metadata(filepath: str, native: bool = True) -> tuple:
+    """Extract metadata from video file headers, or using ffprobe.
+
+    Returns (metadata, probed) where probed is False if neither the headers
+    nor ffprobe could be read.
+    """
+    probed = False
+    metadata = _empty_metadata(filepath)
+
+    if native:
+        data = read_container_info(filepath)
+        if data is not None:
+            _apply_ffprobe_data(metadata, data)
+            return metadata, True
+
     # Try to use ffprobe
     try:
-        # Check if ffprobe is available
         result = subprocess.run(
-            ["ffprobe", "-v", "quiet", "-print_format", "json", "-show_format", "-show_streams", filepath],
+            _ffprobe_command(filepath),
             capture_output=True,
             text=True,
-            timeout=10
+            timeout=FFPROBE_TIMEOUT
         )
 
         if result.returncode == 0:
-            data = json.loads(result.stdout)
-
-            # Extract video stream info
-            video_stream = None
-            audio_stream = None
-
-            for stream in data.get("streams", []):
-                if stream.get("codec_type") == "video" and not video_stream:
-                    video_stream = stream
-                elif stream.get("codec_type") == "audio" and not audio_stream:
-                    audio_stream = stream
-
-            if video_stream:
-                # Resolution — use coded dimensions as fallback since some
-                # containers report cropped height (e.g. letterboxed 1080p
-                # content with height < 1080).  Checking width disambiguates
-                # these cases: a true 1080p encode has width >= 1920 even when
-                # the stored height is reduced by letterboxing.
-                width = video_stream.get("coded_width") or video_stream.get("width")
-                height = video_stream.get("coded_height") or video_stream.get("height")
-                if width and height:
-                    # Use the larger of width- and height-derived resolution so
-                    # that letterboxed or pillarboxed content is classified by
-                    # its actual encode tier rather than the visible rectangle.
-                    res_by_height = height
-                    res_by_width = round(width * 9 / 16)  # assume 16:9 reference
-
-                    effective = max(res_by_height, res_by_width)
-
-                    if effective >= 2160:
-                        metadata["resolution"] = "2160p"
-                    elif effective >= 1440:
-                        metadata["resolution"] = "1440p"
-                    elif effective >= 1080:
-                        metadata["resolution"] = "1080p"
-                    elif effective >= 720:
-                        metadata["resolution"] = "720p"
-                    elif effective >= 576:
-                        metadata["resolution"] = "576p"
-                    elif effective >= 480:
-                        metadata["resolution"] = "480p"
-                    else:
-                        metadata["resolution"] = f"{effective}p"
-
-                # Video codec
-                codec_name = video_stream.get("codec_name", "")
-                if codec_name == "h264":
-                    metadata["video_codec"] = "x264"
-                elif codec_name == "hevc":
-                    metadata["video_codec"] = "x265"
-                elif codec_name == "av1":
-                    metadata["video_codec"] = "AV1"
-                elif codec_name == "vp9":
-                    metadata["video_codec"] = "VP9"
-                else:
-                    metadata["video_codec"] = codec_name.upper()
-
-                # Bit depth
-                pix_fmt = video_stream.get("pix_fmt", "")
-                if "10le" in pix_fmt or "10be" in pix_fmt:
-                    metadata["bit_depth"] = "10-bit"
-                elif "12le" in pix_fmt or "12be" in pix_fmt:
-                    metadata["bit_depth"] = "12-bit"
-                else:
-                    metadata["bit_depth"] = "8-bit"
-
-                # HDR format (check color transfer and color space)
-                color_transfer = video_stream.get("color_transfer", "")
-                color_space = video_stream.get("color_space", "")
-
-                if "smpte2084" in color_transfer.lower():
-                    metadata["hdr_format"] = "HDR10"
-                elif "arib-std-b67" in color_transfer.lower():
-                    metadata["hdr_format"] = "HLG"
-                elif "bt2020" in color_space.lower() and metadata["bit_depth"] == "10-bit":
-                    metadata["hdr_format"] = "HDR"
-
-            if audio_stream:
-                # Audio codec
-                codec_name = audio_stream.get("codec_name", "")
-                if codec_name == "aac":
-                    metadata["audio_codec"] = "AAC"
-                elif codec_name == "ac3":
-                    metadata["audio_codec"] = "AC3"
-                elif codec_name == "eac3":
-                    metadata["audio_codec"] = "EAC3"
-                elif codec_name == "dts":
-                    metadata["audio_codec"] = "DTS"
-                elif codec_name == "truehd":
-                    metadata["audio_codec"] = "TrueHD"
-                elif codec_name == "flac":
-                    metadata["audio_codec"] = "FLAC"
-                elif codec_name == "opus":
-                    metadata["audio_codec"] = "Opus"
-                elif codec_name == "vorbis":
-                    metadata["audio_codec"] = "Vorbis"
-                else:
-                    metadata["audio_codec"] = codec_name.upper()
-
-                # Audio channels
-                channels = audio_stream.get("channels")
-                if channels:
-                    if channels == 1:
-                        metadata["audio_channels"] = "1.0"
-                    elif channels == 2:
-                        metadata["audio_channels"] = "2.0"
-                    elif channels == 6:
-                        metadata["audio_channels"] = "5.1"
-                    elif channels == 8:
-                        metadata["audio_channels"] = "7.1"
-                    else:
-                        metadata["audio_channels"] = f"{channels}.0"
-
-            # Duration
-            format_data = data.get("format", {})
-            duration_seconds = format_data.get("duration")
-            if duration_seconds:
-                try:
-                    total_seconds = int(float(duration_seconds))
-                    hours = total_seconds // 3600
-                    minutes = (total_seconds % 3600) // 60
-                    seconds = total_seconds % 60
-                    metadata["duration"] = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
-                except (ValueError, TypeError):
-                    pass
+            _apply_ffprobe_data(metadata, json.loads(result.stdout))
+            probed = True
 
     except FileNotFoundError:
         print("ffprobe not found - metadata extraction unavailable")
@@ -175,4 +109,225 @@ def get_file_metadata(filepath: str) -> dict:
     except Exception as e:
         print(f"Error running ffprobe: {e}")
 
-    return metadata
+    return metadata, probed
+
+
+async def probe_file_metadata_async(filepath: str, native: bool = True) -> tuple:
+    """Asyncio version of probe_file_metadata() that does not block a thread per file."""
+    probed = False
+    metadata = _empty_metadata(filepath)
+
+    if native:
+        data = await asyncio.to_thread(read_container_info, filepath)
+        if data is not None:
+            _apply_ffprobe_data(metadata, data)
+            return metadata, True
+
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *_ffprobe_command(filepath),
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        try:
+            stdout, _ = await asyncio.wait_for(process.communicate(), FFPROBE_TIMEOUT)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            raise
+
+        if process.returncode == 0:
+            _apply_ffprobe_data(metadata, json.loads(stdout))
+            probed = True
+
+    except FileNotFoundError:
+        print("ffprobe not found - metadata extraction unavailable")
+    except asyncio.TimeoutError:
+        print(f"ffprobe timed out: {filepath}")
+    except Exception as e:
+        print(f"Error running ffprobe: {e}")
+
+    return metadata, probed
+
+
+def get_probe_workers(config: dict) -> int:
+    """Get how many ffprobe processes may run at once."""
+    try:
+        workers = int(config.get("metadata", {}).get("probe_workers", DEFAULT_PROBE_WORKERS))
+    except (TypeError, ValueError):
+        workers = DEFAULT_PROBE_WORKERS
+    return max(1, workers)
+
+
+async def _get_files_metadata(filepaths: list, workers: int, native: bool, cache) -> list:
+    semaphore = asyncio.Semaphore(workers)
+
+    async def probe(filepath):
+        if cache is not None:
+            cached = cache.get(filepath)
+            if cached is not None:
+                return cached
+        async with semaphore:
+            metadata, probed = await probe_file_metadata_async(filepath, native)
+        if cache is not None and probed:
+            cache.put(filepath, metadata)
+        return metadata
+
+    return await asyncio.gather(*(probe(f) for f in filepaths))
+
+
+def get_files_metadata(filepaths: list) -> list:
+    """Extract metadata for many files, probing up to metadata.probe_workers at once.
+
+    Must be called from a thread without a running event loop (FastAPI runs
+    sync endpoints in a worker thread).  Results are in the order of filepaths.
+    """
+    config = load_config()
+    return asyncio.run(_get_files_metadata(
+        filepaths, get_probe_workers(config), use_native_probe(config), get_metadata_cache(config)
+    ))
+
+
+def summarize_metadata(named_metadata: list) -> dict:
+    """Report which CONSISTENCY_FIELDS differ across (name, metadata) pairs.
+
+    differences maps each disagreeing field to {value: [file names]}.
+    """
+    differences = {}
+    for field in CONSISTENCY_FIELDS:
+        values = {}
+        for name, metadata in named_metadata:
+            values.setdefault(metadata.get(field, ""), []).append(name)
+        if len(values) > 1:
+            differences[field] = values
+    return {"consistent": not differences, "differences": differences}
+
+
+def _apply_ffprobe_data(metadata: dict, data: dict):
+    """Fill metadata from ffprobe's -show_format -show_streams JSON output.
+
+    container.read_container_info() returns the same shape.
+    """
+    # Extract video stream info
+    video_stream = None
+    audio_stream = None
+
+    for stream in data.get("streams", []):
+        if stream.get("codec_type") == "video" and not video_stream:
+            video_stream = stream
+        elif stream.get("codec_type") == "audio" and not audio_stream:
+            audio_stream = stream
+
+    if video_stream:
+        # Resolution — use coded dimensions as fallback since some
+        # containers report cropped height (e.g. letterboxed 1080p
+        # content with height < 1080).  Checking width disambiguates
+        # these cases: a true 1080p encode has width >= 1920 even when
+        # the stored height is reduced by letterboxing.
+        width = video_stream.get("coded_width") or video_stream.get("width")
+        height = video_stream.get("coded_height") or video_stream.get("height")
+        if width and height:
+            # Use the larger of width- and height-derived resolution so
+            # that letterboxed or pillarboxed content is classified by
+            # its actual encode tier rather than the visible rectangle.
+            res_by_height = height
+            res_by_width = round(width * 9 / 16)  # assume 16:9 reference
+
+            effective = max(res_by_height, res_by_width)
+
+            if effective >= 2160:
+                metadata["resolution"] = "2160p"
+            elif effective >= 1440:
+                metadata["resolution"] = "1440p"
+            elif effective >= 1080:
+                metadata["resolution"] = "1080p"
+            elif effective >= 720:
+                metadata["resolution"] = "720p"
+            elif effective >= 576:
+                metadata["resolution"] = "576p"
+            elif effective >= 480:
+                metadata["resolution"] = "480p"
+            else:
+                metadata["resolution"] = f"{effective}p"
+
+        # Video codec
+        codec_name = video_stream.get("codec_name", "")
+        if codec_name == "h264":
+            metadata["video_codec"] = "x264"
+        elif codec_name == "hevc":
+            metadata["video_codec"] = "x265"
+        elif codec_name == "av1":
+            metadata["video_codec"] = "AV1"
+        elif codec_name == "vp9":
+            metadata["video_codec"] = "VP9"
+        else:
+            metadata["video_codec"] = codec_name.upper()
+
+        # Bit depth
+        pix_fmt = video_stream.get("pix_fmt", "")
+        if "10le" in pix_fmt or "10be" in pix_fmt:
+            metadata["bit_depth"] = "10-bit"
+        elif "12le" in pix_fmt or "12be" in pix_fmt:
+            metadata["bit_depth"] = "12-bit"
+        else:
+            metadata["bit_depth"] = "8-bit"
+
+        # HDR format (check color transfer and color space)
+        color_transfer = video_stream.get("color_transfer", "")
+        color_space = video_stream.get("color_space", "")
+
+        if "smpte2084" in color_transfer.lower():
+            metadata["hdr_format"] = "HDR10"
+        elif "arib-std-b67" in color_transfer.lower():
+            metadata["hdr_format"] = "HLG"
+        elif "bt2020" in color_space.lower() and metadata["bit_depth"] == "10-bit":
+            metadata["hdr_format"] = "HDR"
+
+    if audio_stream:
+        # Audio codec
+        codec_name = audio_stream.get("codec_name", "")
+        if codec_name == "aac":
+            metadata["audio_codec"] = "AAC"
+        elif codec_name == "ac3":
+            metadata["audio_codec"] = "AC3"
+        elif codec_name == "eac3":
+            metadata["audio_codec"] = "EAC3"
+        elif codec_name == "dts":
+            metadata["audio_codec"] = "DTS"
+        elif codec_name == "truehd":
+            metadata["audio_codec"] = "TrueHD"
+        elif codec_name == "flac":
+            metadata["audio_codec"] = "FLAC"
+        elif codec_name == "opus":
+            metadata["audio_codec"] = "Opus"
+        elif codec_name == "vorbis":
+            metadata["audio_codec"] = "Vorbis"
+        else:
+            metadata["audio_codec"] = codec_name.upper()
+
+        # Audio channels
+        channels = audio_stream.get("channels")
+        if channels:
+            if channels == 1:
+                metadata["audio_channels"] = "1.0"
+            elif channels == 2:
+                metadata["audio_channels"] = "2.0"
+            elif channels == 6:
+                metadata["audio_channels"] = "5.1"
+            elif channels == 8:
+                metadata["audio_channels"] = "7.1"
+            else:
+                metadata["audio_channels"] = f"{channels}.0"
+
+    # Duration
+    format_data = data.get("format", {})
+    duration_seconds = format_data.get("duration")
+    if duration_seconds:
+        try:
+            total_seconds = int(float(duration_seconds))
+            hours = total_seconds // 3600
+            minutes = (total_seconds % 3600) // 60
+            seconds = total_seconds % 60
+            metadata["duration"] = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+        except (ValueError, TypeError):
+            pass
@@ -0,0 +1,149 @@
+"""Persistent cache of ffprobe metadata keyed by file identity.
+
+/parse, /parse-season and every click in the torrent list run ffprobe on the
+same unchanged files.  Parsed metadata dicts are stored in SQLite keyed by
+path and validated against (size, mtime_ns, inode), so an unchanged file is
+answered with a single stat instead of a subprocess.  The number of entries
+is capped with least-recently-used eviction.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+from .config import CONFIG_DIR
+
+METADATA_CACHE_PATH = os.path.join(CONFIG_DIR, "metadata-cache.db")
+DEFAULT_MAX_ENTRIES = 10000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS metadata (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    metadata TEXT NOT NULL,
+    last_used REAL NOT NULL
+)
+"""
+
+
+class MetadataCache:
+    """SQLite-backed store of parsed metadata with hit/miss counters."""
+
+    def __init__(self, path: str = METADATA_CACHE_PATH, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._lock, closing(self._connect()) as conn:
+            conn.execute(_SCHEMA)
+            conn.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def _identity(filepath: str) -> tuple:
+        st = os.stat(filepath)
+        return (os.path.abspath(filepath), st.st_size, st.st_mtime_ns, st.st_ino)
+
+    def get(self, filepath: str):
+        """Return cached metadata for filepath, or None if missing or stale."""
+        try:
+            path, size, mtime_ns, inode = self._identity(filepath)
+        except OSError:
+            return None
+        with self._lock, closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT metadata FROM metadata WHERE path = ? AND size = ? AND mtime_ns = ? AND inode = ?",
+                (path, size, mtime_ns, inode),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE metadata SET last_used = ? WHERE path = ?", (time.time(), path))
+            conn.commit()
+            self.hits += 1
+            return json.loads(row[0])
+
+    def put(self, filepath: str, metadata: dict):
+        """Store metadata for filepath, evicting the least recently used entries over the cap."""
+        try:
+            path, size, mtime_ns, inode = self._identity(filepath)
+        except OSError:
+            return
+        with self._lock, closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO metadata (path, size, mtime_ns, inode, metadata, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (path, size, mtime_ns, inode, json.dumps(metadata), time.time()),
+            )
+            count = conn.execute("SELECT COUNT(*) FROM metadata").fetchone()[0]
+            if count > self.max_entries:
+                conn.execute(
+                    "DELETE FROM metadata WHERE path IN "
+                    "(SELECT path FROM metadata ORDER BY last_used LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+            conn.commit()
+
+    def invalidate(self, filepath=None) -> int:
+        """Drop the entry for filepath (or every entry under it if it is a folder).
+
+        With no filepath the whole cache is cleared.  Returns the number of
+        entries removed.
+        """
+        with self._lock, closing(self._connect()) as conn:
+            if filepath is None:
+                removed = conn.execute("DELETE FROM metadata").rowcount
+            else:
+                path = os.path.abspath(os.path.expanduser(filepath))
+                prefix = path.rstrip(os.sep) + os.sep
+                removed = conn.execute(
+                    "DELETE FROM metadata WHERE path = ? OR substr(path, 1, ?) = ?",
+                    (path, len(prefix), prefix),
+                ).rowcount
+            conn.commit()
+            self.invalidations += removed
+            return removed
+
+    def stats(self) -> dict:
+        with self._lock, closing(self._connect()) as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM metadata").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_metadata_cache(config: dict):
+    """Get the shared MetadataCache, or None if disabled in config."""
+    global _cache
+    cache_config = config.get("metadata_cache", {})
+    if not cache_config.get("enabled", True):
+        return None
+    try:
+        max_entries = int(cache_config.get("max_entries", DEFAULT_MAX_ENTRIES))
+    except (TypeError, ValueError):
+        max_entries = DEFAULT_MAX_ENTRIES
+    with _cache_lock:
+        if _cache is None:
+            _cache = MetadataCache(METADATA_CACHE_PATH, max_entries)
+        _cache.max_entries = max_entries
+        return _cache
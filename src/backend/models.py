@@ -1,7 +1,7 @@
 """Pydantic request/response models for the API."""
 
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
 
 class FileRequest(BaseModel):
@@ -25,6 +25,11 @@ class TMDBSearchRequest(BaseModel):
     year: Optional[int] = None
 
 
+class TMDBCatalogImportRequest(BaseModel):
+    filepath: str
+    kind: Optional[str] = None  # "movie" or "tv"; taken from the file name if not given
+
+
 class TorrentRequest(BaseModel):
     folder_path: str
     name: str
@@ -44,6 +49,7 @@ class TorrentRequest(BaseModel):
     bit_depth: str
     hdr_format: str
     audio_channels: str
+    torrent_format: Optional[str] = None
 
 
 class EpisodeTorrentRequest(TorrentRequest):
@@ -73,3 +79,12 @@ class SeasonTorrentRequest(BaseModel):
     audio_channels: str
     total_size: str
     episode_count: int
+    torrent_format: Optional[str] = None
+
+
+class MetadataInvalidateRequest(BaseModel):
+    filepath: Optional[str] = None
+
+
+class ParseBatchRequest(BaseModel):
+    filenames: List[str]
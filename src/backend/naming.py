@@ -0,0 +1,183 @@
+"""Compiled naming templates.
+
+A template such as "{title}.S{season:02}.{quality}-{group}" is parsed once
+into a render program: literal strings and field slots, each slot knowing
+which request field it reads and its format spec, joined and passed through
+the separator cleanup the template functions have always done (collapse
+"..", drop "." before "-", strip leading/trailing dots).  Programs are
+cached per (template, kind).
+
+A placeholder written with a separator in front, such as {-group}, puts
+the separator before the value only when the value is not empty, so
+"{codec}{-group}" gives "x264-GRP", or "x264" rather than "x264-" when there
+is no group.
+
+Each kind recognises its own placeholders; anything else is left in the
+output as written, as before.
+"""
+
+import re
+from functools import lru_cache
+
+DEFAULT_TEMPLATES = {
+    "movie": "{title}.{year}.{quality}.{source}.{codec}-{group}",
+    "episode": "{title}.S{season:02}E{episode:02}.{episode_title}.{quality}.{source}.{codec}-{group}",
+    "season": "{title}.S{season:02}.{quality}.{source}.{codec}-{group}",
+    "episode_file": "{title}.S{season:02}E{episode:02}.{quality}.{source}.{codec}{-group}",
+}
+
+# Defaults that have since changed; configs that saved them get the new one.
+# episode_file's "-{group}" left a trailing dash when there was no group.
+_REPLACED_DEFAULTS = {
+    "episode_file": "{title}.S{season:02}E{episode:02}.{quality}.{source}.{codec}-{group}",
+}
+
+# Placeholders shared by every kind and the request field each one reads
+_COMMON_FIELDS = {
+    "year": "year",
+    "quality": "resolution",
+    "source": "source",
+    "codec": "video_codec",
+    "group": "release_group",
+}
+
+# Per kind: text placeholders, numeric placeholders (which accept a format
+# spec such as {season:02}), and how the title is chosen
+KINDS = {
+    "movie": {
+        "text": {**_COMMON_FIELDS},
+        "numeric": (),
+        "title": ("name",),
+    },
+    "episode": {
+        "text": {**_COMMON_FIELDS, "episode_title": "episode_title"},
+        "numeric": ("season", "episode"),
+        "title": ("show_name", "name"),
+    },
+    "season": {
+        "text": {**_COMMON_FIELDS},
+        "numeric": ("season",),
+        "title": ("show_name",),
+    },
+    "episode_file": {
+        "text": {**_COMMON_FIELDS},
+        "numeric": ("season", "episode"),
+        "title": ("show_name",),
+    },
+}
+
+_PLACEHOLDER_RE = re.compile(r"\{([-._]?)(\w+)(?::([^}]+))?\}")
+_DOTS_RE = re.compile(r"\.{2,}")
+
+
+def _clean(name: str) -> str:
+    """Collapse "..", drop "." before "-" and strip leading/trailing dots."""
+    if ".." in name:
+        name = _DOTS_RE.sub(".", name)
+    return name.replace(".-", "-").strip(".")
+
+
+def _optional(separator: str, value: str) -> str:
+    return separator + value if value else ""
+
+
+def _format_number(value, fmt: str) -> str:
+    try:
+        return format(value, fmt)
+    except (ValueError, TypeError):
+        return str(value)
+
+
+class CompiledTemplate:
+    """A naming template compiled into a render function.
+
+    The template is split into literals and field slots once; the slots are
+    turned into a single Python expression so a render is one function call
+    with no per-slot dispatch.
+    """
+
+    def __init__(self, template: str, kind: str):
+        if kind not in KINDS:
+            raise ValueError(f"Unknown template kind: {kind}")
+        spec = KINDS[kind]
+        self.template = template
+        self.kind = kind
+
+        parts = []
+        pos = 0
+        for match in _PLACEHOLDER_RE.finditer(template):
+            separator, name, fmt = match.group(1), match.group(2), match.group(3)
+            if name == "title" and fmt is None:
+                expr = self._title_expr(spec["title"])
+            elif name in spec["text"] and fmt is None:
+                expr = f"str(d.get({spec['text'][name]!r}) or '')"
+                if name == "episode_title":
+                    expr += ".replace(' ', '.')"
+            elif name in spec["numeric"]:
+                value = f"int(d.get({name!r}, 0))"
+                if fmt is None:
+                    expr = f"str({value})"
+                elif self._valid_spec(fmt):
+                    expr = f"format({value}, {fmt!r})"
+                else:
+                    expr = f"_format_number({value}, {fmt!r})"
+            else:
+                # Not a placeholder for this kind; keep it as text
+                continue
+            if separator:
+                expr = f"_optional({separator!r}, {expr})"
+            if match.start() > pos:
+                parts.append(repr(template[pos:match.start()]))
+            parts.append(expr)
+            pos = match.end()
+        if pos < len(template) or not parts:
+            parts.append(repr(template[pos:]))
+
+        source = f"def render(d):\n    return _clean(''.join(({', '.join(parts)},)))\n"
+        namespace = {"_clean": _clean, "_format_number": _format_number, "_optional": _optional}
+        exec(compile(source, f"<naming template {template!r}>", "exec"), namespace)
+        self.render = namespace["render"]
+
+    @staticmethod
+    def _title_expr(fields: tuple) -> str:
+        expr = f"d.get({fields[-1]!r}, 'Unknown')"
+        for field in reversed(fields[:-1]):
+            expr = f"(d[{field!r}] if {field!r} in d else {expr})"
+        return f"str({expr}).replace(' ', '.')"
+
+    @staticmethod
+    def _valid_spec(fmt: str) -> bool:
+        try:
+            format(1, fmt)
+        except (ValueError, TypeError):
+            return False
+        return True
+
+    def render_many(self, details_list) -> list:
+        """Render the template once per details dict."""
+        render = self.render
+        return [render(details) for details in details_list]
+
+
+@lru_cache(maxsize=256)
+def compile_template(template: str, kind: str) -> CompiledTemplate:
+    """Get the cached render program for a template."""
+    return CompiledTemplate(template, kind)
+
+
+def get_template(config: dict, kind: str) -> str:
+    """Get the naming template for kind from config, falling back to the default."""
+    template = config.get("naming_templates", {}).get(kind, DEFAULT_TEMPLATES[kind])
+    if template == _REPLACED_DEFAULTS.get(kind):
+        return DEFAULT_TEMPLATES[kind]
+    return template
+
+
+def render_template(template: str, kind: str, details: dict) -> str:
+    """Render one name from a template."""
+    return compile_template(template, kind).render(details)
+
+
+def render_many(template: str, kind: str, details_list) -> list:
+    """Render one name per details dict from the same template."""
+    return compile_template(template, kind).render_many(details_list)
@@ -0,0 +1,319 @@
+"""Memoized filename parsing with guessit.
+
+The same filenames are parsed over and over: /check-conflict and /parse for
+one upload, every click in the torrent list, and every episode of a season in
+both the preview and the create step.  parse_name() keeps recent results in a
+bounded LRU keyed by (name, options).  guessit builds its rebulk rules on the
+first call, which takes a noticeable fraction of a second, so prewarm()
+pays that cost in a background thread when the backend starts.
+
+guessit is pure Python, so threads do not parse in parallel.  parse_batch()
+sends uncached names to a pool of worker processes that start_parse_pool()
+spawns and warms up when the app starts.
+
+Before either, names in the usual scene layouts go through the compiled
+fast path in scene_parser, which gives guessit's answer in microseconds and
+leaves anything unusual to guessit.
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from guessit import guessit
+
+from .helpers import infer_media_type, serialize_parsed
+from .scene_parser import ScenePatterns
+
+CACHE_SIZE = 4096
+
+# Batches with fewer uncached names than this are parsed in-process, where
+# they finish before the pool round trip would
+MIN_POOL_BATCH = 32
+
+# Recent guessit latencies kept for the stats percentiles
+LATENCY_SAMPLES = 1000
+
+WARMUP_NAME = "Show.Name.S01E02.Episode.Title.1080p.WEB-DL.DDP5.1.x265-GROUP.mkv"
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+# guessit shares one rule set between calls; serialize access so the first
+# call's rule building is not raced by requests arriving during the prewarm
+_guessit_lock = threading.Lock()
+
+_stats = {"hits": 0, "misses": 0, "fast": 0, "warm_ms": None}
+_hit_latencies = deque(maxlen=LATENCY_SAMPLES)
+_fast_latencies = deque(maxlen=LATENCY_SAMPLES)
+_miss_latencies = deque(maxlen=LATENCY_SAMPLES)
+
+# Compiled scene layouts; None until configure_fast_path() runs or when
+# parsing.fast_path is off
+_scene = None
+
+
+def configure_fast_path(config: dict):
+    """Compile the fast path from the naming templates in config."""
+    global _scene
+    if config.get("parsing", {}).get("fast_path", True):
+        _scene = ScenePatterns(config.get("naming_templates", {}))
+    else:
+        _scene = None
+
+
+def _cache_key(name: str, options) -> tuple:
+    return (name, tuple(sorted(options.items())) if options else ())
+
+
+def parse_name(name: str, options=None) -> dict:
+    """Parse a file or folder name with guessit, reusing recent results.
+
+    Returns a new dict on every call, so callers may modify it.
+    """
+    start = time.perf_counter()
+    key = _cache_key(name, options)
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+            _stats["hits"] += 1
+            _hit_latencies.append(time.perf_counter() - start)
+            return _copy(cached)
+
+    scene = _scene
+    parsed = scene.parse(name) if scene is not None and not options else None
+    if parsed is not None:
+        with _cache_lock:
+            _store(key, parsed)
+            _stats["misses"] += 1
+            _stats["fast"] += 1
+            _fast_latencies.append(time.perf_counter() - start)
+        return _copy(parsed)
+
+    with _guessit_lock:
+        parsed = dict(guessit(name, options))
+
+    with _cache_lock:
+        _store(key, parsed)
+        _stats["misses"] += 1
+        _miss_latencies.append(time.perf_counter() - start)
+    return _copy(parsed)
+
+
+def episode_sort_key(filename: str) -> tuple:
+    """Sort key putting a season's video files in season and episode order.
+
+    Season pack videos are ingested under their source names and renamed
+    before the torrent is built, so their order in the piece stream has to
+    come from something both names share rather than from either name.
+    Files without an episode number follow, by name.
+    """
+    parsed = parse_name(filename)
+    season, episode = parsed.get("season"), parsed.get("episode")
+    if isinstance(season, list):
+        season = min(season)
+    if isinstance(episode, list):
+        episode = min(episode)
+    if not isinstance(episode, int):
+        return (1, 0, 0, filename)
+    return (0, season if isinstance(season, int) else 0, episode, filename)
+
+
+def _copy(parsed: dict) -> dict:
+    """A copy of a cached result that callers may modify.
+
+    guessit gives lists for repeated properties (other, language, episode);
+    they are copied too so changing them can't alter later cache hits.  The
+    other values are strings, numbers and babelfish objects, which are
+    immutable.
+    """
+    return {key: list(value) if isinstance(value, list) else value for key, value in parsed.items()}
+
+
+def _store(key: tuple, parsed: dict):
+    """Insert into the LRU. Caller holds _cache_lock."""
+    _cache[key] = parsed
+    _cache.move_to_end(key)
+    while len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+
+
+def _warm():
+    start = time.perf_counter()
+    with _guessit_lock:
+        guessit(WARMUP_NAME)
+    _stats["warm_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+
+def prewarm():
+    """Build guessit's rules in a background thread."""
+    threading.Thread(target=_warm, name="guessit-prewarm", daemon=True).start()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _pool_worker_init():
+    guessit(WARMUP_NAME)
+
+
+def _pool_worker_ready() -> int:
+    return os.getpid()
+
+
+def _parse_chunk(names: list, options) -> list:
+    """Runs in a pool worker."""
+    return [dict(guessit(name, options)) for name in names]
+
+
+def get_parse_workers(config: dict) -> int:
+    """Get the number of parse worker processes from config (0 means one per CPU)."""
+    try:
+        workers = int(config.get("parsing", {}).get("workers", 0))
+    except (TypeError, ValueError):
+        workers = 0
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    return workers
+
+
+def start_parse_pool(config: dict):
+    """Spawn the parse worker processes and have each build guessit's rules.
+
+    Call from the app's startup hook, not at import time: spawned workers
+    re-import the main module.
+    """
+    global _pool
+    workers = get_parse_workers(config)
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_pool_worker_init,
+            )
+            # The executor only spawns workers as tasks arrive
+            for _ in range(workers):
+                _pool.submit(_pool_worker_ready)
+    return _pool
+
+
+def shutdown_parse_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+def _parse_uncached(names: list, options, workers: int) -> list:
+    if len(names) < MIN_POOL_BATCH or _pool is None:
+        with _guessit_lock:
+            return [dict(guessit(name, options)) for name in names]
+
+    # A few chunks per worker keeps them all busy without per-name IPC
+    chunk_size = max(1, -(-len(names) // (workers * 4)))
+    chunks = [names[i:i + chunk_size] for i in range(0, len(names), chunk_size)]
+    try:
+        futures = [_pool.submit(_parse_chunk, chunk, options) for chunk in chunks]
+        return [parsed for future in futures for parsed in future.result()]
+    except BrokenProcessPool:
+        print("Warning: Parse worker pool died, parsing in-process")
+        shutdown_parse_pool()
+        with _guessit_lock:
+            return [dict(guessit(name, options)) for name in names]
+
+
+def parse_batch(names: list, workers: int, options=None) -> list:
+    """Parse many names, returning {"filename", "parsed", "media_type"} per name in order.
+
+    Cached names are answered from the LRU and scene-layout names by the
+    fast path; the rest are parsed across the worker pool.  All are added
+    to the LRU.
+    """
+    parsed_by_name = {}
+    with _cache_lock:
+        for name in names:
+            cached = _cache.get(_cache_key(name, options))
+            if cached is not None:
+                _cache.move_to_end(_cache_key(name, options))
+                parsed_by_name[name] = cached
+        _stats["hits"] += sum(1 for name in names if name in parsed_by_name)
+
+    uncached = list(dict.fromkeys(name for name in names if name not in parsed_by_name))
+    scene = _scene
+    if uncached and scene is not None and not options:
+        start = time.perf_counter()
+        fast = {}
+        for name in uncached:
+            parsed = scene.parse(name)
+            if parsed is not None:
+                fast[name] = parsed
+        if fast:
+            per_name = (time.perf_counter() - start) / len(uncached)
+            with _cache_lock:
+                for name, parsed in fast.items():
+                    _store(_cache_key(name, options), parsed)
+                    parsed_by_name[name] = parsed
+                    _fast_latencies.append(per_name)
+                _stats["misses"] += len(fast)
+                _stats["fast"] += len(fast)
+            uncached = [name for name in uncached if name not in fast]
+
+    if uncached:
+        start = time.perf_counter()
+        results = _parse_uncached(uncached, options, workers)
+        per_name = (time.perf_counter() - start) / len(uncached)
+        with _cache_lock:
+            for name, parsed in zip(uncached, results):
+                _store(_cache_key(name, options), parsed)
+                parsed_by_name[name] = parsed
+                _miss_latencies.append(per_name)
+            _stats["misses"] += len(uncached)
+
+    return [
+        {
+            "filename": name,
+            "parsed": serialize_parsed(parsed_by_name[name]),
+            "media_type": infer_media_type(parsed_by_name[name]),
+        }
+        for name in names
+    ]
+
+
+def _latency_summary(samples) -> dict:
+    if not samples:
+        return {"count": 0, "mean_ms": None, "p50_ms": None, "p95_ms": None}
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+        "p50_ms": round(ordered[len(ordered) // 2] * 1000, 3),
+        "p95_ms": round(ordered[int(len(ordered) * 0.95)] * 1000, 3),
+    }
+
+
+def parse_stats() -> dict:
+    """Cache hit rate and latency of cached, fast-path and guessit-parsed lookups."""
+    with _cache_lock:
+        hits, misses = _stats["hits"], _stats["misses"]
+        lookups = hits + misses
+        return {
+            "entries": len(_cache),
+            "max_entries": CACHE_SIZE,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "fast_path": _scene is not None,
+            "fast": _stats["fast"],
+            "warmed": _stats["warm_ms"] is not None,
+            "warm_ms": _stats["warm_ms"],
+            "hit_latency": _latency_summary(_hit_latencies),
+            "fast_latency": _latency_summary(_fast_latencies),
+            "guessit_latency": _latency_summary(_miss_latencies),
+        }
@@ -0,0 +1,153 @@
+"""Planned, journaled bulk renames within one folder.
+
+Renaming a season pack's episodes one at a time can fail halfway (a target
+name is taken, a file is locked) and leave the folder half renamed.
+plan_renames() works out every rename up front from a single directory
+listing: it rejects two files claiming the same name or a name held by a
+file that is not being renamed, and orders chains (A->B while B->C) and
+cycles (A->B, B->A, via a temporary name) so no rename ever lands on a
+file that has not moved yet.
+
+apply_renames() writes the plan to a journal in CONFIG_DIR before touching
+anything, runs it, and undoes the completed steps if one fails.  If the
+backend dies mid-way the journal is still there, and recover_journals()
+rolls the folder back when the backend next starts.
+"""
+
+import json
+import os
+import uuid
+
+from fastapi import HTTPException
+
+from .config import CONFIG_DIR, atomic_write
+
+JOURNAL_DIR = os.path.join(CONFIG_DIR, "rename-journals")
+
+
+def plan_renames(folder_path: str, renames: list) -> list:
+    """Order (old_name, new_name) pairs in folder_path into safe rename steps.
+
+    Pairs whose name does not change are dropped.  Raises HTTPException 409 if
+    two files would get the same name or a new name belongs to a file that
+    is not being renamed.
+    """
+    moves = {}
+    for old, new in renames:
+        if old != new:
+            moves[old] = new
+
+    targets = {}
+    for old, new in moves.items():
+        if new in targets:
+            raise HTTPException(
+                status_code=409,
+                detail=f"'{targets[new]}' and '{old}' would both be renamed to '{new}'."
+            )
+        targets[new] = old
+
+    # One listing instead of an exists() call per file.  Compare case-folded
+    # names too, so a case-insensitive filesystem can't overwrite a file.
+    existing = set(os.listdir(folder_path))
+    staying = {name.casefold(): name for name in existing if name not in moves}
+    for old, new in moves.items():
+        if old not in existing:
+            raise HTTPException(status_code=400, detail=f"File not found: {old}")
+        clash = staying.get(new.casefold())
+        if clash is not None and clash != old:
+            raise HTTPException(
+                status_code=409,
+                detail=f"A file named '{new}' already exists."
+            )
+
+    # A move can run once nothing is left at its target.  Start from moves
+    # whose target is free and walk back along each chain.
+    steps = []
+    pending = dict(moves)
+
+    def run_chain(old):
+        while old in pending:
+            new = pending.pop(old)
+            steps.append((old, new))
+            # Whatever was waiting for old's name can go now
+            old = targets.get(old)
+
+    for old, new in list(moves.items()):
+        if old in pending and new not in moves:
+            run_chain(old)
+
+    # Everything left is part of a cycle: park one member under a temporary
+    # name, run the rest of the cycle, then move it into place
+    for old in list(moves):
+        if old in pending:
+            new = pending.pop(old)
+            temp = f".rename-{uuid.uuid4().hex}{os.path.splitext(old)[1]}"
+            steps.append((old, temp))
+            run_chain(targets[old])
+            steps.append((temp, new))
+
+    return steps
+
+
+def _journal_path() -> str:
+    return os.path.join(JOURNAL_DIR, f"{uuid.uuid4().hex}.json")
+
+
+def _undo(folder_path: str, steps: list) -> list:
+    """Reverse completed steps, newest first. Returns the steps that could not be undone."""
+    failed = []
+    for old, new in reversed(steps):
+        old_path = os.path.join(folder_path, old)
+        new_path = os.path.join(folder_path, new)
+        # Only steps that actually happened: the new name exists, the old one doesn't
+        if os.path.exists(new_path) and not os.path.exists(old_path):
+            try:
+                os.rename(new_path, old_path)
+            except OSError as e:
+                print(f"Warning: Could not undo rename {new} -> {old} in {folder_path}: {e}")
+                failed.append((old, new))
+    return failed
+
+
+def apply_renames(folder_path: str, steps: list):
+    """Run planned rename steps, rolling back every completed step if one fails."""
+    if not steps:
+        return
+
+    journal_path = _journal_path()
+    atomic_write(journal_path, json.dumps({"folder_path": folder_path, "steps": steps}))
+
+    done = []
+    try:
+        for old, new in steps:
+            os.rename(os.path.join(folder_path, old), os.path.join(folder_path, new))
+            done.append((old, new))
+    except BaseException:
+        if not _undo(folder_path, done):
+            os.remove(journal_path)
+        raise
+    os.remove(journal_path)
+
+
+def recover_journals():
+    """Roll back renames left unfinished by a crash. Call at backend start."""
+    if not os.path.isdir(JOURNAL_DIR):
+        return
+    for name in os.listdir(JOURNAL_DIR):
+        if not name.endswith(".json"):
+            continue
+        journal_path = os.path.join(JOURNAL_DIR, name)
+        try:
+            with open(journal_path, "r") as f:
+                journal = json.load(f)
+            folder_path = journal["folder_path"]
+            steps = [tuple(step) for step in journal["steps"]]
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Warning: Ignoring unreadable rename journal {journal_path}: {e}")
+            continue
+
+        if os.path.isdir(folder_path):
+            print(f"Warning: Rolling back unfinished renames in {folder_path}")
+            if _undo(folder_path, steps):
+                continue
+        os.remove(journal_path)
@@ -4,6 +4,7 @@ from fastapi import APIRouter, HTTPException
 
 from ..config import load_config, save_config, load_ascii_art, save_ascii_art
 from ..models import ConfigUpdate, AsciiArtUpdate
+from ..parsing import configure_fast_path
 
 router = APIRouter()
 
@@ -25,6 +26,8 @@ def update_config(update: ConfigUpdate):
     """Update configuration."""
     try:
         save_config(update.config)
+        # Naming templates may have changed
+        configure_fast_path(update.config)
         return {"success": True}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
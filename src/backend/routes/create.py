@@ -1,14 +1,23 @@
 """Torrent creation and preview endpoints (movie, episode, season pack)."""
 
 import os
+from datetime import datetime
 
 from fastapi import APIRouter, HTTPException
-from guessit import guessit
 from torf import Torrent
 
 from ..config import load_config
+from ..hashing import generate_torrent, get_hash_workers
+from ..hash_cache import get_hash_cache
+from ..torrent_v2 import get_torrent_format, write_torrent as write_v2_torrent
+from ..parsing import episode_sort_key, parse_name
+from ..naming import DEFAULT_TEMPLATES, get_template, render_many
+from ..renames import apply_renames, plan_renames
+from ..library import get_library_index
+from ..manifest import write_manifest
 from ..models import TorrentRequest, EpisodeTorrentRequest, SeasonTorrentRequest
 from ..helpers import (
+    VIDEO_EXTENSIONS,
     find_video_file,
     find_all_video_files,
     format_file_size,
@@ -25,6 +34,96 @@ from ..nfo import (
 router = APIRouter()
 
 
+def _order_videos_first(torrent: Torrent, video_order=None):
+    """Move video files to the front of a multi-file torrent's file list.
+
+    torf sorts case-sensitively, so "Name.NFO" lands before "Name.mkv" and the
+    video's position in the piece stream would depend on the NFO's size.  With
+    videos first their offsets are known at ingest time, which lets the piece
+    hashes precomputed while copying (and cached hashes) line up.  Season
+    packs pass video_order, their videos' names in the order they were
+    ingested (see /parse-season), since torf's order of the renamed files
+    need not match it.
+    """
+    info = torrent.metainfo["info"]
+    if "files" in info:
+        position = {name: i for i, name in enumerate(video_order or [])}
+
+        def key(f):
+            name = "/".join(f["path"])
+            is_video = os.path.splitext(name)[1].lower() in VIDEO_EXTENSIONS
+            return (not is_video, position.get(name, len(position)))
+
+        info["files"] = sorted(info["files"], key=key)
+
+
+def _episode_file_names(video_files: list, details: dict, template: str) -> list:
+    """New name for each season video file, rendered from the episode_file template.
+
+    Files whose episode number can't be parsed keep their original name.
+    """
+    # Configs saved before episode_file existed may hold an empty template
+    template = template or DEFAULT_TEMPLATES["episode_file"]
+    episodes = [parse_name(vf).get("episode") for vf in video_files]
+    numbered = [i for i, episode in enumerate(episodes) if episode is not None]
+    rendered = render_many(
+        template, "episode_file", [{**details, "episode": episodes[i]} for i in numbered]
+    )
+
+    new_names = list(video_files)
+    for i, name in zip(numbered, rendered):
+        new_names[i] = name + os.path.splitext(video_files[i])[1]
+    return new_names
+
+
+def _write_torrent_file(folder_path: str, torrent_file_path: str, config: dict, callback=None,
+                        torrent_format: str = "v1", video_order=None) -> dict:
+    """Hash the contents of folder_path and write the .torrent file.
+
+    Pieces are hashed by the parallel engine in hashing.py rather than
+    torrent.generate(); the worker count comes from config["hashing"]["workers"]
+    and unchanged files are served from the piece-hash cache.  v2 and hybrid
+    torrents are built by torrent_v2.py.
+    Returns the hash cache hit/miss stats.
+    """
+    trackers = config.get("trackers", [])
+
+    if torrent_format != "v1":
+        return write_v2_torrent(
+            folder_path,
+            torrent_file_path,
+            torrent_format,
+            trackers,
+            "Created by Torrent Creator",
+            get_hash_workers(config),
+            get_hash_cache(config),
+            callback,
+        )
+
+    torrent = Torrent(
+        path=folder_path,
+        trackers=trackers if trackers else None,
+        comment="Created by Torrent Creator",
+    )
+    _order_videos_first(torrent, video_order)
+    stats = generate_torrent(torrent, get_hash_workers(config), get_hash_cache(config), callback)
+    torrent.write(torrent_file_path, overwrite=True)
+    return stats
+
+
+def _creation_params(kind: str, template: str, details: dict, torrent_format: str, config: dict) -> dict:
+    """What a torrent was created from, recorded in its folder manifest."""
+    return {
+        "kind": kind,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "torrent_format": torrent_format,
+        "trackers": config.get("trackers", []),
+        "comment": "Created by Torrent Creator",
+        "naming_template": template,
+        "fields": details,
+    }
+
+
 # ============================================
 # Movie Torrent Preview & Create
 # ============================================
@@ -104,9 +203,18 @@ def create_torrent(req: TorrentRequest):
     Returns the path to the created .torrent file.
 
     NOTE: This is a regular def (not async) so FastAPI runs it in a thread pool.
-    torrent.generate() hashes the entire video file and would block the event loop
+    hashing the entire video file would block the event loop
     if this were async, causing "Failed to fetch" timeouts on large files.
     """
+    return run_movie_pipeline(req)
+
+
+def run_movie_pipeline(req: TorrentRequest, callback=None) -> dict:
+    """Run the rename -> NFO -> hash pipeline for a movie torrent folder.
+
+    Shared by /create-torrent and the background job queue.  callback receives
+    hashing progress and may cancel it (see hashing.hash_pieces).
+    """
     folder_path = req.folder_path
     if folder_path.startswith("~"):
         folder_path = os.path.expanduser(folder_path)
@@ -122,6 +230,7 @@ def create_torrent(req: TorrentRequest):
 
     # Build the new base name
     config = load_config()
+    torrent_format = get_torrent_format(config, req.torrent_format)
     template = config.get("naming_templates", {}).get(
         "movie", "{title}.{year}.{quality}.{source}.{codec}-{group}"
     )
@@ -172,18 +281,17 @@ def create_torrent(req: TorrentRequest):
         os.rename(folder_path, new_folder_path)
 
     # --- Step 4: Create .torrent file ---
-    trackers = config.get("trackers", [])
-
-    torrent = Torrent(
-        path=new_folder_path,
-        trackers=trackers if trackers else None,
-        comment="Created by Torrent Creator",
-    )
-    torrent.generate()
-
     torrent_filename = new_base_name + ".torrent"
     torrent_file_path = os.path.join(parent_dir, torrent_filename)
-    torrent.write(torrent_file_path, overwrite=True)
+    hash_stats = _write_torrent_file(
+        new_folder_path, torrent_file_path, config, callback, torrent_format
+    )
+    get_library_index().refresh(folder_path, new_folder_path)
+    write_manifest(
+        new_folder_path,
+        _creation_params("movie", template, details, torrent_format, config),
+        previous_folder=folder_path,
+    )
 
     output_dir = config.get("output_directory", "~/Documents/torrents")
 
@@ -195,6 +303,8 @@ def create_torrent(req: TorrentRequest):
         "output_dir": output_dir,
         "torrent_file": torrent_file_path,
         "torrent_filename": torrent_filename,
+        "torrent_format": torrent_format,
+        "hash_cache": hash_stats,
     }
 
 
@@ -266,7 +376,16 @@ def create_episode_torrent(req: EpisodeTorrentRequest):
     Full episode torrent creation pipeline.
 
     NOTE: This is a regular def (not async) so FastAPI runs it in a thread pool.
-    torrent.generate() hashes the entire video file and would block the event loop.
+    hashing the entire video file would block the event loop.
+    """
+    return run_episode_pipeline(req)
+
+
+def run_episode_pipeline(req: EpisodeTorrentRequest, callback=None) -> dict:
+    """Run the rename -> NFO -> hash pipeline for an episode torrent folder.
+
+    Shared by /create-episode-torrent and the background job queue.  callback receives
+    hashing progress and may cancel it (see hashing.hash_pieces).
     """
     folder_path = req.folder_path
     if folder_path.startswith("~"):
@@ -280,6 +399,7 @@ def create_episode_torrent(req: EpisodeTorrentRequest):
         raise HTTPException(status_code=400, detail="No video file found in the torrent folder.")
 
     config = load_config()
+    torrent_format = get_torrent_format(config, req.torrent_format)
     template = config.get("naming_templates", {}).get(
         "episode",
         "{title}.S{season:02}E{episode:02}.{episode_title}.{quality}.{source}.{codec}-{group}"
@@ -331,18 +451,17 @@ def create_episode_torrent(req: EpisodeTorrentRequest):
         os.rename(folder_path, new_folder_path)
 
     # --- Step 4: Create .torrent file ---
-    trackers = config.get("trackers", [])
-
-    torrent = Torrent(
-        path=new_folder_path,
-        trackers=trackers if trackers else None,
-        comment="Created by Torrent Creator",
-    )
-    torrent.generate()
-
     torrent_filename = new_base_name + ".torrent"
     torrent_file_path = os.path.join(parent_dir, torrent_filename)
-    torrent.write(torrent_file_path, overwrite=True)
+    hash_stats = _write_torrent_file(
+        new_folder_path, torrent_file_path, config, callback, torrent_format
+    )
+    get_library_index().refresh(folder_path, new_folder_path)
+    write_manifest(
+        new_folder_path,
+        _creation_params("episode", template, details, torrent_format, config),
+        previous_folder=folder_path,
+    )
 
     output_dir = config.get("output_directory", "~/Documents/torrents")
 
@@ -354,6 +473,8 @@ def create_episode_torrent(req: EpisodeTorrentRequest):
         "output_dir": output_dir,
         "torrent_file": torrent_file_path,
         "torrent_filename": torrent_filename,
+        "torrent_format": torrent_format,
+        "hash_cache": hash_stats,
     }
 
 
@@ -394,33 +515,9 @@ async def preview_season_torrent(req: SeasonTorrentRequest):
     new_torrent_name = new_base_name + ".torrent"
 
     # Generate preview of renamed video filenames
-    renamed_video_files = []
-    for vf in video_files:
-        ext = os.path.splitext(vf)[1]
-
-        # Parse the filename to extract episode info
-        parsed = guessit(vf)
-        episode_num = parsed.get("episode")
-
-        if episode_num is not None:
-            # Build new filename: ShowName.S01E02.quality.source.codec-group.ext
-            new_filename = f"{details['show_name']}.S{details['season']:02d}E{episode_num:02d}"
-
-            # Add quality, source, codec, group if available
-            if details.get("resolution"):
-                new_filename += f".{details['resolution']}"
-            if details.get("source"):
-                new_filename += f".{details['source']}"
-            if details.get("video_codec"):
-                new_filename += f".{details['video_codec']}"
-            if details.get("release_group"):
-                new_filename += f"-{details['release_group']}"
-
-            new_filename += ext
-            renamed_video_files.append(new_filename)
-        else:
-            # Couldn't parse episode number, keep original name
-            renamed_video_files.append(vf)
+    renamed_video_files = _episode_file_names(
+        video_files, details, get_template(config, "episode_file")
+    )
 
     # Build file list with sizes for NFO (using renamed filenames)
     file_list_with_sizes = []
@@ -463,7 +560,16 @@ def create_season_torrent(req: SeasonTorrentRequest):
     4. Create a .torrent file from the folder contents
 
     NOTE: This is a regular def (not async) so FastAPI runs it in a thread pool.
-    torrent.generate() hashes all video files and would block the event loop.
+    hashing all video files would block the event loop.
+    """
+    return run_season_pipeline(req)
+
+
+def run_season_pipeline(req: SeasonTorrentRequest, callback=None) -> dict:
+    """Run the rename -> NFO -> hash pipeline for a season pack folder.
+
+    Shared by /create-season-torrent and the background job queue.  callback receives
+    hashing progress and may cancel it (see hashing.hash_pieces).
     """
     folder_path = req.folder_path
     if folder_path.startswith("~"):
@@ -475,8 +581,11 @@ def create_season_torrent(req: SeasonTorrentRequest):
     video_files = find_all_video_files(folder_path)
     if not video_files:
         raise HTTPException(status_code=400, detail="No video files found in the torrent folder.")
+    # The order /parse-season ingested them in; renaming doesn't change it
+    video_files.sort(key=episode_sort_key)
 
     config = load_config()
+    torrent_format = get_torrent_format(config, req.torrent_format)
     template = config.get("naming_templates", {}).get(
         "season", "{title}.S{season:02}.{quality}.{source}.{codec}-{group}"
     )
@@ -491,48 +600,22 @@ def create_season_torrent(req: SeasonTorrentRequest):
 
     new_nfo_name = new_base_name + ".NFO"
 
+    parent_dir = os.path.dirname(folder_path)
+    new_folder_path = os.path.join(parent_dir, new_base_name)
+    if folder_path != new_folder_path and os.path.exists(new_folder_path):
+        raise HTTPException(
+            status_code=409,
+            detail=f"A folder named '{new_base_name}' already exists."
+        )
+
     # --- Step 1: Rename individual video files ---
-    # Parse each video file to extract episode number and rename consistently
-    renamed_video_files = []
-    for vf in video_files:
-        old_path = os.path.join(folder_path, vf)
-        ext = os.path.splitext(vf)[1]
-
-        # Parse the filename to extract episode info
-        parsed = guessit(vf)
-        episode_num = parsed.get("episode")
-
-        if episode_num is not None:
-            # Build new filename: ShowName.S01E02.quality.source.codec-group.ext
-            new_filename = f"{details['show_name']}.S{details['season']:02d}E{episode_num:02d}"
-
-            # Add quality, source, codec, group if available
-            if details.get("resolution"):
-                new_filename += f".{details['resolution']}"
-            if details.get("source"):
-                new_filename += f".{details['source']}"
-            if details.get("video_codec"):
-                new_filename += f".{details['video_codec']}"
-            if details.get("release_group"):
-                new_filename += f"-{details['release_group']}"
-
-            new_filename += ext
-            new_path = os.path.join(folder_path, new_filename)
-
-            # Only rename if the name is different
-            if old_path != new_path:
-                if os.path.exists(new_path):
-                    raise HTTPException(
-                        status_code=409,
-                        detail=f"A file named '{new_filename}' already exists."
-                    )
-                os.rename(old_path, new_path)
-                renamed_video_files.append(new_filename)
-            else:
-                renamed_video_files.append(vf)
-        else:
-            # Couldn't parse episode number, keep original name
-            renamed_video_files.append(vf)
+    # Parse each video file to extract episode number and rename consistently.
+    # The whole set is planned and checked first, then applied under a
+    # journal so a failure can't leave the folder half renamed.
+    renamed_video_files = _episode_file_names(
+        video_files, details, get_template(config, "episode_file")
+    )
+    apply_renames(folder_path, plan_renames(folder_path, zip(video_files, renamed_video_files)))
 
     # Update video_files list with renamed files
     video_files = renamed_video_files
@@ -554,31 +637,22 @@ def create_season_torrent(req: SeasonTorrentRequest):
     with open(nfo_path, "w", encoding="utf-8") as fh:
         fh.write(nfo_content)
 
-    # --- Step 3: Rename the folder ---
-    parent_dir = os.path.dirname(folder_path)
-    new_folder_path = os.path.join(parent_dir, new_base_name)
-
+    # --- Step 3: Rename the folder (checked for a clash before step 1) ---
     if folder_path != new_folder_path:
-        if os.path.exists(new_folder_path):
-            raise HTTPException(
-                status_code=409,
-                detail=f"A folder named '{new_base_name}' already exists."
-            )
         os.rename(folder_path, new_folder_path)
 
     # --- Step 4: Create .torrent file ---
-    trackers = config.get("trackers", [])
-
-    torrent = Torrent(
-        path=new_folder_path,
-        trackers=trackers if trackers else None,
-        comment="Created by Torrent Creator",
-    )
-    torrent.generate()
-
     torrent_filename = new_base_name + ".torrent"
     torrent_file_path = os.path.join(parent_dir, torrent_filename)
-    torrent.write(torrent_file_path, overwrite=True)
+    hash_stats = _write_torrent_file(
+        new_folder_path, torrent_file_path, config, callback, torrent_format, video_files
+    )
+    get_library_index().refresh(folder_path, new_folder_path)
+    write_manifest(
+        new_folder_path,
+        _creation_params("season", template, details, torrent_format, config),
+        previous_folder=folder_path,
+    )
 
     output_dir = config.get("output_directory", "~/Documents/torrents")
 
@@ -589,4 +663,6 @@ def create_season_torrent(req: SeasonTorrentRequest):
         "output_dir": output_dir,
         "torrent_file": torrent_file_path,
         "torrent_filename": torrent_filename,
+        "torrent_format": torrent_format,
+        "hash_cache": hash_stats,
     }
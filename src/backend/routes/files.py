@@ -1,20 +1,24 @@
 """File parsing and conflict checking endpoints."""
 
 import os
-import shutil
 from datetime import datetime
 
 from fastapi import APIRouter, HTTPException
-from guessit import guessit
 
 from ..config import load_config
-from ..models import FileRequest
+from ..models import FileRequest, ParseBatchRequest
+from ..parsing import get_parse_workers, parse_batch, parse_name, parse_stats
 from ..metadata import get_file_metadata
-from ..helpers import format_file_size, serialize_parsed, get_torrent_type_dir
+from ..helpers import format_file_size, serialize_parsed, get_torrent_type_dir, infer_media_type
 from ..nfo import generate_nfo
+from ..ingest import get_hash_options, get_ingest_strategy, ingest_file
+from ..library import get_library_index
+from ..manifest import remove_manifest, write_manifest
 
 router = APIRouter()
 
+MAX_BATCH_FILENAMES = 5000
+
 
 @router.post("/check-conflict")
 def check_torrent_conflict(file_req: FileRequest):
@@ -41,16 +45,7 @@ def check_torrent_conflict(file_req: FileRequest):
 
     # Check target folder (need to parse to determine type first)
     config = load_config()
-    parsed_temp = guessit(filename)
-    parsed_type = parsed_temp.get("type", "")
-    if parsed_type == "movie":
-        temp_media_type = "movie"
-    elif "season" in parsed_temp and "episode" not in parsed_temp:
-        temp_media_type = "season"
-    elif "episode" in parsed_temp:
-        temp_media_type = "episode"
-    else:
-        temp_media_type = "unknown"
+    temp_media_type = infer_media_type(parse_name(filename))
     
     torrents_dir = get_torrent_type_dir(config, temp_media_type)
     target_folder = os.path.join(torrents_dir, base_name)
@@ -114,21 +109,13 @@ def parse_and_process_file(file_req: FileRequest):
     base_name = os.path.splitext(filename)[0]
 
     # Parse filename with guessit
-    parsed = guessit(filename)
+    parsed = parse_name(filename)
 
     # Extract file metadata using ffprobe
     file_metadata = get_file_metadata(filepath)
 
     # Determine media type
-    parsed_type = parsed.get("type", "")
-    if parsed_type == "movie":
-        media_type = "movie"
-    elif "season" in parsed and "episode" not in parsed:
-        media_type = "season"
-    elif "episode" in parsed:
-        media_type = "episode"
-    else:
-        media_type = "unknown"
+    media_type = infer_media_type(parsed)
 
     # Create target directory structure
     config = load_config()
@@ -141,12 +128,14 @@ def parse_and_process_file(file_req: FileRequest):
     # Target file path
     target_file = os.path.join(target_folder, filename)
 
-    # Copy the file (only if not already there)
+    # Place the file using the cheapest ingest strategy (only if not already there)
+    ingest = {"strategy": "none", "bytes_written": 0}
     if os.path.abspath(filepath) != os.path.abspath(target_file):
         # Remove existing file if present (allows overwrite)
         if os.path.exists(target_file):
             os.remove(target_file)
-        shutil.copy2(filepath, target_file)
+        hash_options = get_hash_options(config, os.path.getsize(filepath))
+        ingest = ingest_file(filepath, target_file, get_ingest_strategy(config), hash_options)
 
     # Create NFO file
     nfo_path = os.path.join(target_folder, f"{base_name}.NFO")
@@ -154,6 +143,10 @@ def parse_and_process_file(file_req: FileRequest):
 
     with open(nfo_path, "w") as f:
         f.write(nfo_content)
+    get_library_index().refresh(target_folder)
+    # A fresh parse starts a new manifest; the probe above is reused rather than rerun
+    remove_manifest(target_folder)
+    write_manifest(target_folder, probed={filename: file_metadata})
 
     # Convert parsed dict (may contain non-serializable objects)
     parsed_dict = serialize_parsed(parsed)
@@ -165,5 +158,28 @@ def parse_and_process_file(file_req: FileRequest):
         "metadata": file_metadata,
         "media_type": media_type,
         "target_folder": target_folder,
-        "nfo_path": nfo_path
+        "nfo_path": nfo_path,
+        "ingest": ingest,
     }
+
+
+@router.post("/parse/batch")
+def parse_filenames_batch(req: ParseBatchRequest):
+    """
+    Parse many filenames at once without touching the files.
+    Returns the parsed fields and inferred media type for each, in order.
+    """
+    if len(req.filenames) > MAX_BATCH_FILENAMES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many filenames ({len(req.filenames)}); the limit is {MAX_BATCH_FILENAMES}."
+        )
+    names = [os.path.basename(f) for f in req.filenames]
+    results = parse_batch(names, get_parse_workers(load_config()))
+    return {"success": True, "results": results}
+
+
+@router.get("/parse/stats")
+def get_parse_stats():
+    """Filename parse cache hit rate and latency."""
+    return {"success": True, **parse_stats()}
@@ -0,0 +1,97 @@
+"""Background torrent creation jobs with Server-Sent Events progress."""
+
+import asyncio
+import json
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+
+from ..config import load_config
+from ..jobs import FINAL_STATUSES, get_job_manager
+from ..models import TorrentRequest, EpisodeTorrentRequest, SeasonTorrentRequest
+from .create import run_movie_pipeline, run_episode_pipeline, run_season_pipeline
+
+# Seconds between progress checks on an event stream
+EVENT_INTERVAL = 0.5
+
+router = APIRouter()
+
+
+def _get_job(job_id: str):
+    job = get_job_manager(load_config()).get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job
+
+
+def _submit(kind: str, pipeline, req) -> dict:
+    job = get_job_manager(load_config()).submit(kind, pipeline, req)
+    return {"success": True, "job_id": job.id, "status": job.status}
+
+
+@router.post("/jobs/create-movie")
+def create_movie_job(req: TorrentRequest):
+    """Queue a movie torrent creation and return its job id."""
+    return _submit("movie", run_movie_pipeline, req)
+
+
+@router.post("/jobs/create-episode")
+def create_episode_job(req: EpisodeTorrentRequest):
+    """Queue an episode torrent creation and return its job id."""
+    return _submit("episode", run_episode_pipeline, req)
+
+
+@router.post("/jobs/create-season")
+def create_season_job(req: SeasonTorrentRequest):
+    """Queue a season pack torrent creation and return its job id."""
+    return _submit("season", run_season_pipeline, req)
+
+
+@router.get("/jobs")
+def list_jobs():
+    """List queued, running and recently finished jobs."""
+    jobs = get_job_manager(load_config()).list()
+    return {"jobs": [job.snapshot() for job in jobs]}
+
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """Get the current state of a job."""
+    return _get_job(job_id).snapshot()
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """
+    Stream job progress as Server-Sent Events.
+    Sends a "progress" event whenever the job changes and a final event named
+    after the end status ("done", "failed" or "cancelled"), then closes.
+    """
+    job = _get_job(job_id)
+
+    async def events():
+        last_version = -1
+        while True:
+            snapshot = job.snapshot()
+            if snapshot["version"] != last_version:
+                last_version = snapshot["version"]
+                event = snapshot["status"] if snapshot["status"] in FINAL_STATUSES else "progress"
+                yield f"event: {event}\ndata: {json.dumps(snapshot)}\n\n"
+            if snapshot["status"] in FINAL_STATUSES:
+                break
+            await asyncio.sleep(EVENT_INTERVAL)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
+
+
+@router.delete("/jobs/{job_id}")
+def cancel_job(job_id: str):
+    """Cancel a job. Hashing stops after the piece currently being hashed."""
+    job = _get_job(job_id)
+    if job.status not in FINAL_STATUSES:
+        job.cancel()
+    return {"success": True, "job_id": job.id, "status": job.status}
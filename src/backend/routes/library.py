@@ -0,0 +1,27 @@
+"""Library maintenance endpoints."""
+
+from fastapi import APIRouter
+
+from ..config import load_config
+from ..duplicates import get_fingerprint_index
+from ..helpers import get_torrents_base_dir
+
+router = APIRouter()
+
+
+@router.get("/library/duplicates")
+def library_duplicates(verify: bool = False):
+    """Find files stored more than once in the library and the space their extra copies take.
+
+    Groups match on size and sampled blocks; verify=true fully hashes the
+    candidates to confirm them.
+    """
+    index = get_fingerprint_index()
+    scan = index.scan(get_torrents_base_dir(load_config()))
+    report = index.duplicates(verify)
+    return {
+        "success": True,
+        "groups": report["groups"],
+        "reclaimable": report["reclaimable"],
+        "scan": {**scan, "bytes_read": scan["bytes_read"] + report["bytes_read"]},
+    }
@@ -0,0 +1,27 @@
+"""Metadata cache endpoints."""
+
+from fastapi import APIRouter
+
+from ..config import load_config
+from ..metadata_cache import get_metadata_cache
+from ..models import MetadataInvalidateRequest
+
+router = APIRouter()
+
+
+@router.get("/metadata/cache/stats")
+def metadata_cache_stats():
+    """Get metadata cache size and hit counters."""
+    cache = get_metadata_cache(load_config())
+    if cache is None:
+        return {"success": True, "enabled": False}
+    return {"success": True, "enabled": True, **cache.stats()}
+
+
+@router.post("/metadata/cache/invalidate")
+def invalidate_metadata_cache(req: MetadataInvalidateRequest):
+    """Drop cached metadata for a file or folder, or the whole cache if no path is given."""
+    cache = get_metadata_cache(load_config())
+    if cache is None:
+        return {"success": True, "removed": 0}
+    return {"success": True, "removed": cache.invalidate(req.filepath)}
@@ -1,17 +1,19 @@
 """Season pack parsing and conflict checking endpoints."""
 
 import os
-import shutil
 from datetime import datetime
 
 from fastapi import APIRouter, HTTPException
-from guessit import guessit
 
 from ..config import load_config
 from ..models import FolderRequest
-from ..metadata import get_file_metadata
+from ..parsing import episode_sort_key, parse_name
+from ..metadata import get_files_metadata, summarize_metadata
 from ..helpers import find_all_video_files, format_file_size, serialize_parsed, get_torrent_type_dir
 from ..nfo import generate_nfo
+from ..ingest import get_hash_options, get_ingest_strategy, ingest_file, summarize_ingest
+from ..library import get_library_index
+from ..manifest import remove_manifest, write_manifest
 
 router = APIRouter()
 
@@ -92,8 +94,9 @@ def check_season_conflict(folder_req: FolderRequest):
 def parse_season_folder(folder_req: FolderRequest):
     """
     Parse a folder of episode files for season pack creation.
-    Finds all video files, extracts metadata from the first, and copies them
-    into a new folder in the output directory.
+    Finds all video files, probes every episode's metadata concurrently,
+    reports where episodes disagree, and places them into a new folder in the
+    output directory.
     """
     folder_path = folder_req.folder_path
 
@@ -112,25 +115,26 @@ def parse_season_folder(folder_req: FolderRequest):
             detail="No video files found in the selected folder."
         )
 
-    # Sort files naturally (by name)
-    video_files.sort()
+    # Episode order, which the season's torrent keeps after renaming
+    video_files.sort(key=episode_sort_key)
 
     # Parse the first file with guessit for show/season metadata
-    parsed = guessit(video_files[0])
+    parsed = parse_name(video_files[0])
     parsed_dict = serialize_parsed(parsed)
 
-    # Extract metadata from the first file (representative of the season)
-    first_file_path = os.path.join(folder_path, video_files[0])
-    file_metadata = get_file_metadata(first_file_path)
+    # Probe every episode; the first stays representative of the season
+    episode_metadata = get_files_metadata([os.path.join(folder_path, vf) for vf in video_files])
+    file_metadata = episode_metadata[0]
+    consistency = summarize_metadata(list(zip(video_files, episode_metadata)))
 
     # Calculate total size of all video files
     total_bytes = 0
     file_list = []
-    for vf in video_files:
+    for vf, vf_metadata in zip(video_files, episode_metadata):
         vf_path = os.path.join(folder_path, vf)
         vf_size = os.path.getsize(vf_path)
         total_bytes += vf_size
-        file_list.append({"name": vf, "size": format_file_size(vf_size)})
+        file_list.append({"name": vf, "size": format_file_size(vf_size), "metadata": vf_metadata})
 
     total_size = format_file_size(total_bytes)
 
@@ -142,7 +146,13 @@ def parse_season_folder(folder_req: FolderRequest):
 
     os.makedirs(target_folder, exist_ok=True)
 
-    # Copy all video files to the target folder
+    # Place all video files in the target folder using the cheapest ingest strategy
+    strategy = get_ingest_strategy(config)
+    hash_options = get_hash_options(config, total_bytes)
+    ingest_results = []
+    # Videos come first in the torrent, in episode order, so each one's offset
+    # in the piece stream is the total size of the episodes before it
+    stream_offset = 0
     for vf in video_files:
         src = os.path.join(folder_path, vf)
         dst = os.path.join(target_folder, vf)
@@ -150,23 +160,33 @@ def parse_season_folder(folder_req: FolderRequest):
             # Remove existing file if present (allows overwrite)
             if os.path.exists(dst):
                 os.remove(dst)
-            shutil.copy2(src, dst)
+            result = ingest_file(src, dst, strategy, hash_options, stream_offset)
+        else:
+            result = {"strategy": "none", "bytes_written": 0}
+        ingest_results.append({"name": vf, **result})
+        stream_offset += os.path.getsize(dst)
 
     # Create initial NFO
     nfo_path = os.path.join(target_folder, f"{folder_name}.NFO")
     nfo_content = generate_nfo(parsed, video_files[0], "season")
     with open(nfo_path, "w") as f:
         f.write(nfo_content)
+    get_library_index().refresh(target_folder)
+    # A fresh parse starts a new manifest; the probes above are reused rather than rerun
+    remove_manifest(target_folder)
+    write_manifest(target_folder, probed=dict(zip(video_files, episode_metadata)))
 
     return {
         "success": True,
         "folder_name": folder_name,
         "parsed": parsed_dict,
         "metadata": file_metadata,
+        "consistency": consistency,
         "media_type": "season",
         "target_folder": target_folder,
         "video_files": file_list,
         "episode_count": len(video_files),
         "total_size": total_size,
         "nfo_path": nfo_path,
+        "ingest": summarize_ingest(ingest_results),
     }
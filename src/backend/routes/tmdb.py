@@ -1,15 +1,29 @@
 """TMDB API endpoints for movies and TV shows."""
 
+import asyncio
+import json
+import math
+import os
+from typing import Optional
+
 import httpx
 from fastapi import APIRouter, HTTPException
 
 from ..config import load_config
-from ..models import TMDBSearchRequest
-
-TMDB_BASE_URL = "https://api.themoviedb.org/3"
+from ..models import TMDBCatalogImportRequest, TMDBSearchRequest
+from ..tmdb_cache import cache_key, get_tmdb_cache, get_ttl
+from ..tmdb_catalog import export_kind, get_tmdb_catalog
+from ..tmdb_client import retry_after_seconds, tmdb_request
 
 router = APIRouter()
 
+# TMDB's cap on append_to_response items per request
+MAX_APPENDS = 20
+
+# Cache key -> the task fetching it from TMDB
+_in_flight = {}
+_flight_stats = {"upstream": 0, "coalesced": 0}
+
 
 def _get_tmdb_api_key() -> str:
     """Get TMDB API key from config, raising if not configured."""
@@ -23,12 +37,159 @@ def _get_tmdb_api_key() -> str:
     return api_key
 
 
+async def _tmdb_get(path: str, params: dict, kind: str) -> dict:
+    """GET a TMDB API path, raising HTTPException on errors.
+
+    Responses are cached on disk per kind (see tmdb_cache.py).  Identical
+    lookups that miss the cache while one is already on its way to TMDB
+    wait for that request instead of sending their own.
+    """
+    config = load_config()
+    cache = get_tmdb_cache(config)
+    key = cache_key(path, params)
+    cached = cache.get(key) if cache is not None else None
+    if cached is not None and cached["fresh"]:
+        return json.loads(cached["body"])
+
+    flight = _in_flight.get(key)
+    if flight is None:
+        flight = asyncio.ensure_future(_fetch(path, params, kind, key, cached, config))
+        _in_flight[key] = flight
+        flight.add_done_callback(lambda _: _landed(key, flight))
+    else:
+        _flight_stats["coalesced"] += 1
+    # A waiter going away (the renderer cancelling a search) mustn't cancel
+    # the request the others are waiting on
+    return await asyncio.shield(flight)
+
+
+def _landed(key: str, flight: asyncio.Future):
+    _in_flight.pop(key, None)
+    # Mark the error as seen even if every waiter went away
+    if not flight.cancelled():
+        flight.exception()
+
+
+async def _fetch(path: str, params: dict, kind: str, key: str, cached, config: dict) -> dict:
+    """Fetch (or revalidate) one response from TMDB and store it in the cache."""
+    _flight_stats["upstream"] += 1
+    cache = get_tmdb_cache(config)
+    headers = {}
+    if cached is not None:
+        if cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+        if cached["last_modified"]:
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    try:
+        response = await tmdb_request(path, params, headers, config)
+    except httpx.TransportError as e:
+        if cached is not None:
+            # Better an expired answer than none while TMDB is unreachable
+            return json.loads(cached["body"])
+        raise HTTPException(status_code=502, detail=f"Could not reach TMDB: {e}")
+
+    if cached is not None and response.status_code == 304:
+        cache.refresh(key, get_ttl(config, kind))
+        return json.loads(cached["body"])
+
+    if response.status_code == 429:
+        if cached is not None:
+            return json.loads(cached["body"])
+        retry_after = retry_after_seconds(response)
+        raise HTTPException(
+            status_code=503,
+            detail="TMDB rate limit reached. Try again shortly.",
+            headers={"Retry-After": str(math.ceil(retry_after or 1))},
+        )
+
+    if response.status_code != 200:
+        if cached is not None and response.status_code >= 500:
+            return json.loads(cached["body"])
+        raise HTTPException(
+            status_code=response.status_code,
+            detail=f"TMDB API error: {response.text}"
+        )
+
+    if cache is not None:
+        cache.put(
+            key, kind, response.text, response.headers.get("etag"),
+            response.headers.get("last-modified"), get_ttl(config, kind),
+        )
+    return response.json()
+
+
+@router.get("/tmdb/cache/stats")
+def tmdb_cache_stats():
+    """Get TMDB response cache size and hit counters."""
+    cache = get_tmdb_cache(load_config())
+    if cache is None:
+        return {"success": True, "enabled": False, **_flight_stats}
+    return {"success": True, "enabled": True, **cache.stats(), **_flight_stats}
+
+
+def _search_catalog(kind: str, request: TMDBSearchRequest):
+    """Results from the local catalog, or None if TMDB should be searched instead.
+
+    The exports have no release dates, so searches for a year go to TMDB, as
+    do searches the catalog has nothing for.
+    """
+    catalog = get_tmdb_catalog(load_config())
+    if catalog is None or request.year or not catalog.has(kind):
+        return None
+    return catalog.search(kind, request.query) or None
+
+
+@router.post("/tmdb/catalog/import")
+def tmdb_catalog_import(request: TMDBCatalogImportRequest):
+    """Import a TMDB daily ID export into the local catalog."""
+    filepath = os.path.expanduser(request.filepath)
+    if not os.path.isfile(filepath):
+        raise HTTPException(status_code=400, detail=f"File not found: {filepath}")
+    kind = request.kind or export_kind(filepath)
+    if kind not in ("movie", "tv"):
+        raise HTTPException(
+            status_code=400,
+            detail="Not a TMDB movie_ids or tv_series_ids export; set kind to \"movie\" or \"tv\"",
+        )
+    catalog = get_tmdb_catalog(load_config())
+    if catalog is None:
+        raise HTTPException(status_code=400, detail="The TMDB catalog is disabled in config")
+    try:
+        result = catalog.import_export(filepath, kind)
+    except (OSError, EOFError, UnicodeDecodeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Could not import {os.path.basename(filepath)}: {e}")
+    return {"success": True, **result}
+
+
+@router.get("/tmdb/catalog/stats")
+def tmdb_catalog_stats():
+    """Get the titles imported into the local catalog for each kind."""
+    catalog = get_tmdb_catalog(load_config())
+    if catalog is None:
+        return {"success": True, "enabled": False}
+    return {"success": True, "enabled": True, "kinds": catalog.stats()}
+
+
 # ============================================
 # Movie Endpoints
 # ============================================
 @router.post("/tmdb/search")
 async def tmdb_search_movies(request: TMDBSearchRequest):
-    """Search for movies on TMDB."""
+    """Search for movies in the local catalog, or on TMDB."""
+    local = _search_catalog("movie", request)
+    if local is not None:
+        results = [{
+            "id": movie["id"],
+            "title": movie["title"],
+            "original_title": movie["title"],
+            "year": "",
+            "overview": "",
+            "poster_path": None,
+            "vote_average": None
+        } for movie in local]
+        return {"success": True, "source": "catalog", "results": results}
+
     api_key = _get_tmdb_api_key()
 
     params = {
@@ -40,33 +201,21 @@ async def tmdb_search_movies(request: TMDBSearchRequest):
     if request.year:
         params["year"] = request.year
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"{TMDB_BASE_URL}/search/movie",
-            params=params
-        )
-
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=response.status_code,
-                detail=f"TMDB API error: {response.text}"
-            )
-
-        data = response.json()
-        results = []
+    data = await _tmdb_get("/search/movie", params, "search")
+    results = []
 
-        for movie in data.get("results", [])[:10]:
-            results.append({
-                "id": movie.get("id"),
-                "title": movie.get("title"),
-                "original_title": movie.get("original_title"),
-                "year": movie.get("release_date", "")[:4] if movie.get("release_date") else "",
-                "overview": movie.get("overview", ""),
-                "poster_path": movie.get("poster_path"),
-                "vote_average": movie.get("vote_average")
-            })
+    for movie in data.get("results", [])[:10]:
+        results.append({
+            "id": movie.get("id"),
+            "title": movie.get("title"),
+            "original_title": movie.get("original_title"),
+            "year": movie.get("release_date", "")[:4] if movie.get("release_date") else "",
+            "overview": movie.get("overview", ""),
+            "poster_path": movie.get("poster_path"),
+            "vote_average": movie.get("vote_average")
+        })
 
-        return {"success": True, "results": results}
+    return {"success": True, "source": "tmdb", "results": results}
 
 
 @router.get("/tmdb/movie/{movie_id}")
@@ -74,40 +223,27 @@ async def tmdb_get_movie(movie_id: int):
     """Get detailed movie information from TMDB."""
     api_key = _get_tmdb_api_key()
 
-    async with httpx.AsyncClient() as client:
-        # Get movie details
-        response = await client.get(
-            f"{TMDB_BASE_URL}/movie/{movie_id}",
-            params={"api_key": api_key}
-        )
-
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=response.status_code,
-                detail=f"TMDB API error: {response.text}"
-            )
-
-        movie = response.json()
-
-        # Extract relevant details
-        result = {
-            "id": movie.get("id"),
-            "tmdb_id": movie.get("id"),
-            "imdb_id": movie.get("imdb_id", ""),
-            "title": movie.get("title"),
-            "original_title": movie.get("original_title"),
-            "year": movie.get("release_date", "")[:4] if movie.get("release_date") else "",
-            "overview": movie.get("overview", ""),
-            "runtime": movie.get("runtime"),
-            "poster_path": movie.get("poster_path"),
-            "backdrop_path": movie.get("backdrop_path"),
-            "vote_average": movie.get("vote_average"),
-            "genres": [g.get("name") for g in movie.get("genres", [])],
-            "spoken_languages": [l.get("english_name") for l in movie.get("spoken_languages", [])],
-            "original_language": movie.get("original_language"),
-        }
+    movie = await _tmdb_get(f"/movie/{movie_id}", {"api_key": api_key}, "movie")
+
+    # Extract relevant details
+    result = {
+        "id": movie.get("id"),
+        "tmdb_id": movie.get("id"),
+        "imdb_id": movie.get("imdb_id", ""),
+        "title": movie.get("title"),
+        "original_title": movie.get("original_title"),
+        "year": movie.get("release_date", "")[:4] if movie.get("release_date") else "",
+        "overview": movie.get("overview", ""),
+        "runtime": movie.get("runtime"),
+        "poster_path": movie.get("poster_path"),
+        "backdrop_path": movie.get("backdrop_path"),
+        "vote_average": movie.get("vote_average"),
+        "genres": [g.get("name") for g in movie.get("genres", [])],
+        "spoken_languages": [l.get("english_name") for l in movie.get("spoken_languages", [])],
+        "original_language": movie.get("original_language"),
+    }
 
-        return {"success": True, "movie": result}
+    return {"success": True, "movie": result}
 
 
 # ============================================
@@ -115,7 +251,20 @@ async def tmdb_get_movie(movie_id: int):
 # ============================================
 @router.post("/tmdb/search-tv")
 async def tmdb_search_tv(request: TMDBSearchRequest):
-    """Search for TV shows on TMDB."""
+    """Search for TV shows in the local catalog, or on TMDB."""
+    local = _search_catalog("tv", request)
+    if local is not None:
+        results = [{
+            "id": show["id"],
+            "name": show["title"],
+            "original_name": show["title"],
+            "year": "",
+            "overview": "",
+            "poster_path": None,
+            "vote_average": None
+        } for show in local]
+        return {"success": True, "source": "catalog", "results": results}
+
     api_key = _get_tmdb_api_key()
 
     params = {
@@ -127,33 +276,69 @@ async def tmdb_search_tv(request: TMDBSearchRequest):
     if request.year:
         params["first_air_date_year"] = request.year
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"{TMDB_BASE_URL}/search/tv",
-            params=params
-        )
+    data = await _tmdb_get("/search/tv", params, "search")
+    results = []
 
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=response.status_code,
-                detail=f"TMDB API error: {response.text}"
-            )
+    for show in data.get("results", [])[:10]:
+        results.append({
+            "id": show.get("id"),
+            "name": show.get("name"),
+            "original_name": show.get("original_name"),
+            "year": show.get("first_air_date", "")[:4] if show.get("first_air_date") else "",
+            "overview": show.get("overview", ""),
+            "poster_path": show.get("poster_path"),
+            "vote_average": show.get("vote_average")
+        })
+
+    return {"success": True, "source": "tmdb", "results": results}
+
+
+def _show_result(show: dict, external_ids: dict) -> dict:
+    return {
+        "id": show.get("id"),
+        "tmdb_id": show.get("id"),
+        "imdb_id": external_ids.get("imdb_id", ""),
+        "name": show.get("name"),
+        "original_name": show.get("original_name"),
+        "year": show.get("first_air_date", "")[:4] if show.get("first_air_date") else "",
+        "overview": show.get("overview", ""),
+        "poster_path": show.get("poster_path"),
+        "vote_average": show.get("vote_average"),
+        "genres": [g.get("name") for g in show.get("genres", [])],
+        "spoken_languages": [l.get("english_name") for l in show.get("spoken_languages", [])],
+        "original_language": show.get("original_language"),
+        "number_of_seasons": show.get("number_of_seasons", 0),
+        "seasons": [
+            {
+                "season_number": s.get("season_number"),
+                "name": s.get("name"),
+                "episode_count": s.get("episode_count"),
+                "air_date": s.get("air_date", ""),
+            }
+            for s in show.get("seasons", [])
+            if s.get("season_number", 0) > 0  # Skip specials (season 0)
+        ],
+    }
 
-        data = response.json()
-        results = []
 
-        for show in data.get("results", [])[:10]:
-            results.append({
-                "id": show.get("id"),
-                "name": show.get("name"),
-                "original_name": show.get("original_name"),
-                "year": show.get("first_air_date", "")[:4] if show.get("first_air_date") else "",
-                "overview": show.get("overview", ""),
-                "poster_path": show.get("poster_path"),
-                "vote_average": show.get("vote_average")
-            })
+def _season_result(season: dict) -> dict:
+    episodes = []
+    for ep in season.get("episodes", []):
+        episodes.append({
+            "episode_number": ep.get("episode_number"),
+            "name": ep.get("name", ""),
+            "overview": ep.get("overview", ""),
+            "air_date": ep.get("air_date", ""),
+            "runtime": ep.get("runtime"),
+            "still_path": ep.get("still_path"),
+            "vote_average": ep.get("vote_average"),
+        })
 
-        return {"success": True, "results": results}
+    return {
+        "season_number": season.get("season_number"),
+        "name": season.get("name"),
+        "episodes": episodes,
+    }
 
 
 @router.get("/tmdb/tv/{tv_id}")
@@ -161,54 +346,69 @@ async def tmdb_get_tv(tv_id: int):
     """Get detailed TV show information from TMDB."""
     api_key = _get_tmdb_api_key()
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"{TMDB_BASE_URL}/tv/{tv_id}",
-            params={"api_key": api_key}
-        )
+    # External IDs (for IMDB ID) come back in the same response
+    show = await _tmdb_get(
+        f"/tv/{tv_id}", {"api_key": api_key, "append_to_response": "external_ids"}, "tv"
+    )
 
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=response.status_code,
-                detail=f"TMDB API error: {response.text}"
-            )
+    return {"success": True, "show": _show_result(show, show.get("external_ids") or {})}
 
-        show = response.json()
 
-        # Get external IDs (for IMDB ID)
-        ext_response = await client.get(
-            f"{TMDB_BASE_URL}/tv/{tv_id}/external_ids",
-            params={"api_key": api_key}
-        )
-        external_ids = ext_response.json() if ext_response.status_code == 200 else {}
+@router.get("/tmdb/tv/{tv_id}/bundle")
+async def tmdb_get_tv_bundle(tv_id: int, seasons: Optional[str] = None):
+    """Get a show, its external IDs and the episode lists of several seasons at once.
 
-        result = {
-            "id": show.get("id"),
-            "tmdb_id": show.get("id"),
-            "imdb_id": external_ids.get("imdb_id", ""),
-            "name": show.get("name"),
-            "original_name": show.get("original_name"),
-            "year": show.get("first_air_date", "")[:4] if show.get("first_air_date") else "",
-            "overview": show.get("overview", ""),
-            "poster_path": show.get("poster_path"),
-            "vote_average": show.get("vote_average"),
-            "genres": [g.get("name") for g in show.get("genres", [])],
-            "spoken_languages": [l.get("english_name") for l in show.get("spoken_languages", [])],
-            "original_language": show.get("original_language"),
-            "number_of_seasons": show.get("number_of_seasons", 0),
-            "seasons": [
-                {
-                    "season_number": s.get("season_number"),
-                    "name": s.get("name"),
-                    "episode_count": s.get("episode_count"),
-                    "air_date": s.get("air_date", ""),
-                }
-                for s in show.get("seasons", [])
-                if s.get("season_number", 0) > 0  # Skip specials (season 0)
-            ],
-        }
-
-        return {"success": True, "show": result}
+    seasons is a comma-separated list of season numbers; without it every
+    season is included.  TMDB's append_to_response folds up to
+    MAX_APPENDS extras into one request, so most shows take one round trip.
+    """
+    api_key = _get_tmdb_api_key()
+
+    if seasons:
+        try:
+            wanted = sorted({int(n) for n in seasons.split(",") if n.strip()})
+        except ValueError:
+            raise HTTPException(
+                status_code=400,
+                detail=f"seasons must be comma-separated season numbers, got: {seasons}"
+            )
+    else:
+        # Season count isn't known before the first response, so it asks for
+        # seasons 1 onwards and TMDB leaves out any that don't exist
+        wanted = list(range(1, MAX_APPENDS))
+
+    first = wanted[:MAX_APPENDS - 1]
+    show = await _tmdb_get(
+        f"/tv/{tv_id}",
+        {"api_key": api_key, "append_to_response": ",".join(["external_ids"] + [f"season/{n}" for n in first])},
+        "tv",
+    )
+    if not seasons:
+        wanted = [s["season_number"] for s in _show_result(show, {})["seasons"]]
+
+    # Seasons that didn't fit go out together, MAX_APPENDS per request
+    rest = [n for n in wanted if f"season/{n}" not in show]
+    chunks = [rest[i:i + MAX_APPENDS] for i in range(0, len(rest), MAX_APPENDS)]
+    extra = await asyncio.gather(*(
+        _tmdb_get(
+            f"/tv/{tv_id}",
+            {"api_key": api_key, "append_to_response": ",".join(f"season/{n}" for n in chunk)},
+            "tv",
+        )
+        for chunk in chunks
+    ))
+
+    appended = dict(show)
+    for response in extra:
+        appended.update(response)
+
+    return {
+        "success": True,
+        "show": _show_result(show, show.get("external_ids") or {}),
+        "seasons": [
+            _season_result(appended[f"season/{n}"]) for n in wanted if appended.get(f"season/{n}")
+        ],
+    }
 
 
 @router.get("/tmdb/tv/{tv_id}/season/{season_number}")
@@ -216,38 +416,9 @@ async def tmdb_get_season(tv_id: int, season_number: int):
     """Get season details including episode list from TMDB."""
     api_key = _get_tmdb_api_key()
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"{TMDB_BASE_URL}/tv/{tv_id}/season/{season_number}",
-            params={"api_key": api_key}
-        )
+    season = await _tmdb_get(f"/tv/{tv_id}/season/{season_number}", {"api_key": api_key}, "season")
 
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=response.status_code,
-                detail=f"TMDB API error: {response.text}"
-            )
-
-        season = response.json()
-
-        episodes = []
-        for ep in season.get("episodes", []):
-            episodes.append({
-                "episode_number": ep.get("episode_number"),
-                "name": ep.get("name", ""),
-                "overview": ep.get("overview", ""),
-                "air_date": ep.get("air_date", ""),
-                "runtime": ep.get("runtime"),
-                "still_path": ep.get("still_path"),
-                "vote_average": ep.get("vote_average"),
-            })
-
-        return {
-            "success": True,
-            "season_number": season.get("season_number"),
-            "name": season.get("name"),
-            "episodes": episodes,
-        }
+    return {"success": True, **_season_result(season)}
 
 
 @router.get("/tmdb/tv/{tv_id}/season/{season_number}/episode/{episode_number}")
@@ -255,29 +426,19 @@ async def tmdb_get_episode(tv_id: int, season_number: int, episode_number: int):
     """Get detailed episode information from TMDB."""
     api_key = _get_tmdb_api_key()
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"{TMDB_BASE_URL}/tv/{tv_id}/season/{season_number}/episode/{episode_number}",
-            params={"api_key": api_key}
-        )
-
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=response.status_code,
-                detail=f"TMDB API error: {response.text}"
-            )
-
-        ep = response.json()
-
-        result = {
-            "episode_number": ep.get("episode_number"),
-            "season_number": ep.get("season_number"),
-            "name": ep.get("name", ""),
-            "overview": ep.get("overview", ""),
-            "air_date": ep.get("air_date", ""),
-            "runtime": ep.get("runtime"),
-            "still_path": ep.get("still_path"),
-            "vote_average": ep.get("vote_average"),
-        }
+    ep = await _tmdb_get(
+        f"/tv/{tv_id}/season/{season_number}/episode/{episode_number}", {"api_key": api_key}, "episode"
+    )
+
+    result = {
+        "episode_number": ep.get("episode_number"),
+        "season_number": ep.get("season_number"),
+        "name": ep.get("name", ""),
+        "overview": ep.get("overview", ""),
+        "air_date": ep.get("air_date", ""),
+        "runtime": ep.get("runtime"),
+        "still_path": ep.get("still_path"),
+        "vote_average": ep.get("vote_average"),
+    }
 
-        return {"success": True, "episode": result}
+    return {"success": True, "episode": result}
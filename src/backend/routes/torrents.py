@@ -3,14 +3,16 @@
 import os
 import shutil
 import platform
+from typing import Optional
 
-from fastapi import APIRouter, HTTPException
-from guessit import guessit
+from fastapi import APIRouter, Header, HTTPException, Query, Response
 
 from ..config import load_config
 from ..models import FolderRequest
-from ..metadata import get_file_metadata
-from ..helpers import find_video_file, find_all_video_files, serialize_parsed, get_torrents_base_dir, get_torrent_subfolder
+from ..parsing import get_parse_workers
+from ..helpers import get_torrents_base_dir, get_torrent_subfolder
+from ..library import MEDIA_TYPES, SORT_COLUMNS, get_library_index
+from ..manifest import load_manifest, remove_manifest
 
 # Try to import send2trash for safe deletion
 try:
@@ -22,45 +24,120 @@ except ImportError:
 router = APIRouter()
 
 
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header lists etag (weak comparison)."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in [tag[2:] if tag.startswith("W/") else tag for tag in candidates]
+
+
 @router.get("/torrents")
-def list_torrents():
-    """List all existing torrent folders grouped by type."""
+def list_torrents(
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    type: Optional[str] = None,
+    q: Optional[str] = None,
+    title: Optional[str] = None,
+    year: Optional[int] = None,
+    season: Optional[int] = None,
+    resolution: Optional[str] = None,
+    source: Optional[str] = None,
+    video_codec: Optional[str] = None,
+    sort: str = "name",
+    order: str = "asc",
+    limit: Optional[int] = Query(None, ge=1),
+    offset: int = Query(0, ge=0),
+):
+    """List existing torrent folders grouped by type, from the library index.
+
+    Optional filters narrow the list (type is movie, episode or season; q
+    matches part of the folder name; the rest match the parsed name).  Sort
+    by name, created, size or files.  limit and offset page through the
+    matching folders in sort order before they are grouped.
+
+    The ETag is the library version, so a client sending it back in
+    If-None-Match gets a 304 until something in the library changes.
+    """
+    if type is not None and type not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unknown type: {type}")
+    if sort not in SORT_COLUMNS:
+        raise HTTPException(status_code=400, detail=f"Unknown sort: {sort}")
+
     config = load_config()
     base_dir = get_torrents_base_dir(config)
 
-    if not os.path.exists(base_dir):
-        return {"torrents": {"movies": [], "episodes": [], "seasons": []}}
-
     torrents_by_type = {
         "movies": [],
         "episodes": [],
         "seasons": []
     }
 
-    # Scan each type subfolder
-    for media_type in ["movie", "episode", "season"]:
-        subfolder = get_torrent_subfolder(media_type)
-        type_dir = os.path.join(base_dir, subfolder)
-        
-        if not os.path.exists(type_dir):
-            continue
-            
-        for name in os.listdir(type_dir):
-            folder_path = os.path.join(type_dir, name)
-            if os.path.isdir(folder_path):
-                file_count = len([f for f in os.listdir(folder_path) if os.path.isfile(os.path.join(folder_path, f))])
-                torrents_by_type[subfolder].append({
-                    "name": name,
-                    "path": folder_path,
-                    "file_count": file_count,
-                    "type": media_type
-                })
-
-    # Sort each category
-    for category in torrents_by_type.values():
-        category.sort(key=lambda x: x["name"].lower())
-
-    return {"torrents": torrents_by_type}
+    index = get_library_index()
+    index.ensure_current(base_dir)
+    filters = {
+        "title": title, "year": year, "season": season,
+        "resolution": resolution, "source": source, "video_codec": video_codec,
+    }
+    if any(value is not None for value in filters.values()):
+        # Filtering on parsed fields needs every name parsed, not just those the watcher got to
+        index.fill_parsed(get_parse_workers(config))
+
+    # Read before querying: if a change lands in between, the client just
+    # gets a stale ETag and fetches again next time
+    version = index.version()
+    etag = f'"{version}"'
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
+    total, entries = index.query(type, q, filters, sort, order, limit, offset)
+    for entry in entries:
+        torrents_by_type[get_torrent_subfolder(entry["type"])].append(entry)
+
+    return {
+        "torrents": torrents_by_type,
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "version": version,
+    }
+
+
+@router.get("/torrents/changes")
+def torrent_changes(since: int = Query(..., ge=0)):
+    """Torrents added, updated and removed since a library version.
+
+    Pass the version from a previous /torrents or /torrents/changes response.
+    When "reset" is true the version is too old to diff against and the
+    client should reload /torrents.
+    """
+    config = load_config()
+    index = get_library_index()
+    index.ensure_current(get_torrents_base_dir(config))
+    return index.changes(since)
+
+
+@router.get("/torrents/search")
+def search_torrents(
+    q: str = Query(..., min_length=1),
+    type: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+):
+    """Search the library by folder name, title, IMDb/TMDB id, technical fields and NFO text.
+
+    Results are ranked with name and title matches first.  When no torrent
+    matches every word, typo-tolerant matches on names and titles are
+    returned instead and "fuzzy" is true.
+    """
+    if type is not None and type not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unknown type: {type}")
+
+    config = load_config()
+    index = get_library_index()
+    index.ensure_current(get_torrents_base_dir(config))
+    result = index.search(q, type, limit)
+    return {"query": q, "results": result["results"], "fuzzy": result["fuzzy"]}
 
 
 @router.post("/torrent-details")
@@ -74,59 +151,19 @@ def get_torrent_details(folder_req: FolderRequest):
             detail=f"Folder not found: {folder_path}"
         )
 
-    # Find all video files to determine if this is a season pack
-    all_video_files = find_all_video_files(folder_path)
-    video_file_count = len(all_video_files)
-
-    video_file, video_ext = find_video_file(folder_path)
-    video_file_found = video_file is not None
-    files = os.listdir(folder_path)
-
-    if not video_file:
-        video_file = os.path.basename(folder_path) + ".mp4"
-
-    parsed = guessit(video_file)
-    parsed_dict = serialize_parsed(parsed)
-
-    # Extract metadata from the actual video file only if one was found
-    file_metadata = {}
-    if video_file_found:
-        video_file_path = os.path.join(folder_path, video_file)
-        if os.path.exists(video_file_path):
-            file_metadata = get_file_metadata(video_file_path)
-
-    # Determine media type
-    # Parse the folder name itself to get better context (not just the video file)
-    folder_name = os.path.basename(folder_path)
-    folder_parsed = guessit(folder_name)
-    folder_has_season = "season" in folder_parsed
-    folder_has_episode = "episode" in folder_parsed
-
-    # If multiple video files exist, it's definitely a season pack
-    if video_file_count > 1:
-        media_type = "season"
-    # If folder name indicates season without specific episode, it's a season pack
-    # (e.g., "Show.S01.1080p.WEB-DL" or "Show.Season.1.Complete")
-    elif folder_has_season and not folder_has_episode:
-        media_type = "season"
-    else:
-        # Fall back to parsing the video file or folder
-        parsed_type = parsed.get("type", "")
-        if parsed_type == "movie":
-            media_type = "movie"
-        elif "episode" in parsed:
-            media_type = "episode"
-        else:
-            media_type = "unknown"
+    # Served from the folder's sidecar manifest unless the folder changed since
+    manifest = load_manifest(folder_path)
 
     return {
         "success": True,
-        "filename": video_file,
-        "parsed": parsed_dict,
-        "metadata": file_metadata,
-        "media_type": media_type,
+        "filename": manifest["filename"],
+        "parsed": manifest["parsed"],
+        "metadata": manifest["metadata"],
+        "media_type": manifest["media_type"],
         "target_folder": folder_path,
-        "files": files
+        "files": [entry["name"] for entry in manifest["files"]],
+        "infohash": manifest["infohash"],
+        "infohash_v2": manifest["infohash_v2"],
     }
 
 
@@ -149,6 +186,8 @@ async def delete_torrent(folder_req: FolderRequest):
         if HAS_TRASH:
             # Use send2trash to move to recycle bin/trash
             send2trash(folder_path)
+            get_library_index().remove(folder_path)
+            remove_manifest(folder_path)
             return {
                 "success": True,
                 "message": "Torrent moved to trash",
@@ -157,6 +196,8 @@ async def delete_torrent(folder_req: FolderRequest):
         else:
             # Permanently delete if send2trash not available
             shutil.rmtree(folder_path)
+            get_library_index().remove(folder_path)
+            remove_manifest(folder_path)
             return {
                 "success": True,
                 "message": "Torrent permanently deleted",
@@ -0,0 +1,319 @@
+"""Compiled fast path for well-formed scene release names.
+
+Most names this app sees follow one of a few layouts: the movie, episode
+and season-pack templates from config.json, or the usual scene form
+Title[.Year][.SxxEyy].tags-GROUP.ext.  ScenePatterns compiles those layouts
+into regular expressions once and maps each release tag through a fixed
+table, returning the same dict guessit would in a few microseconds.
+
+The fast path only answers when it is sure.  A title word that guessit
+could read as something else (a language, a streaming service, an edition,
+...), a tag it does not know, or a layout it does not recognise returns
+None and the caller falls back to guessit.  benchmarks/bench_scene_parser.py
+checks the fast path against guessit over a generated corpus.
+"""
+
+import json
+import os
+import re
+
+import guessit
+
+# Release tags and the fields guessit sets for each.  Only tags whose result
+# does not depend on their neighbours are listed.
+TAGS = {
+    "screen_size": {
+        "480p": {"screen_size": "480p"},
+        "576p": {"screen_size": "576p"},
+        "720p": {"screen_size": "720p"},
+        "1080p": {"screen_size": "1080p"},
+        "1080i": {"screen_size": "1080i"},
+        "1440p": {"screen_size": "1440p"},
+        "2160p": {"screen_size": "2160p"},
+        "4320p": {"screen_size": "4320p"},
+    },
+    "source": {
+        "WEB-DL": {"source": "Web"},
+        "WEBDL": {"source": "Web"},
+        "WEB": {"source": "Web"},
+        "WEBRip": {"source": "Web", "other": "Rip"},
+        "WEB-Rip": {"source": "Web", "other": "Rip"},
+        "BluRay": {"source": "Blu-ray"},
+        "Blu-Ray": {"source": "Blu-ray"},
+        "BDRip": {"source": "Blu-ray", "other": "Rip"},
+        "HDTV": {"source": "HDTV"},
+        "HDTVRip": {"source": "HDTV", "other": "Rip"},
+        "DVD": {"source": "DVD"},
+        "DVDRip": {"source": "DVD", "other": "Rip"},
+        "REMUX": {"other": "Remux"},
+    },
+    "video_codec": {
+        "x264": {"video_codec": "H.264"},
+        "x265": {"video_codec": "H.265"},
+        "h264": {"video_codec": "H.264"},
+        "h265": {"video_codec": "H.265"},
+        "H.264": {"video_codec": "H.264"},
+        "H.265": {"video_codec": "H.265"},
+        "HEVC": {"video_codec": "H.265", "video_profile": "High Efficiency Video Coding"},
+        "AVC": {"video_codec": "H.264", "video_profile": "Advanced Video Codec High Definition"},
+        "XviD": {"video_codec": "Xvid"},
+        "DivX": {"video_codec": "DivX"},
+        "VP9": {"video_codec": "VP9"},
+    },
+    "audio": {
+        "DDP5.1": {"audio_codec": "Dolby Digital Plus", "audio_channels": "5.1"},
+        "DD5.1": {"audio_codec": "Dolby Digital", "audio_channels": "5.1"},
+        "AAC2.0": {"audio_codec": "AAC", "audio_channels": "2.0"},
+        "AAC": {"audio_codec": "AAC"},
+        "AC3": {"audio_codec": "Dolby Digital"},
+        "EAC3": {"audio_codec": "Dolby Digital Plus"},
+        "DTS": {"audio_codec": "DTS"},
+        "DTS-HD.MA.5.1": {"audio_codec": "DTS-HD", "audio_profile": "Master Audio", "audio_channels": "5.1"},
+        "TrueHD.7.1.Atmos": {"audio_codec": ["Dolby TrueHD", "Dolby Atmos"], "audio_channels": "7.1"},
+        "FLAC": {"audio_codec": "FLAC"},
+    },
+    "other": {
+        "10bit": {"color_depth": "10-bit"},
+        "HDR": {"other": "HDR10"},
+        "HDR10": {"other": "HDR10"},
+    },
+}
+
+# Placeholders in naming templates and the tag kinds they accept
+TEMPLATE_TAGS = {"quality": "screen_size", "source": "source", "codec": "video_codec"}
+
+# x264/x265 straight after a number is read by guessit as a resolution
+# (e.g. 2019.x264 -> 2019x264), so those names go to guessit
+NUMBER_SENSITIVE_TAGS = {"x264", "x265"}
+
+CONTAINERS = {
+    "mkv": "video/x-matroska",
+    "mp4": "video/mp4",
+    "avi": "video/x-msvideo",
+}
+
+# Common English words that appear in guessit's patterns but that it does
+# not treat as keywords in a title
+TITLE_WORDS_ALLOWED = {"the", "of", "and", "in", "on", "at", "by", "for", "from", "with"}
+
+_tag_fields = {}
+_tag_kinds = {}
+for _kind, _tags in TAGS.items():
+    for _tag, _fields in _tags.items():
+        _tag_fields[_tag.lower()] = _fields
+        _tag_kinds[_tag.lower()] = _kind
+
+
+def _alternation(tags) -> str:
+    # Longest first so WEB-DL is tried before WEB
+    return "|".join(re.escape(tag) for tag in sorted(tags, key=len, reverse=True))
+
+
+_ANY_TAG = _alternation(_tag_fields)
+_TITLE = r"(?P<title>[A-Za-z]+(?:[. ][A-Za-z]+)*?)"
+_YEAR = r"(?P<year>(?:19|20)\d\d)"
+_GROUP = r"(?P<group>[A-Za-z0-9]+)"
+_EXTENSION = r"(?:\.(?P<container>" + "|".join(CONTAINERS) + r"))?"
+
+# Title[.Year][.SxxEyy[Ezz]|.Sxx][.tag...][-GROUP][.ext]
+SCENE_PATTERN = re.compile(
+    "^" + _TITLE
+    + r"(?:\." + _YEAR + ")?"
+    + r"(?:\.S(?P<season>\d{1,2})(?:E(?P<episode>\d{1,3})(?:E(?P<episode2>\d{1,3}))?)?)?"
+    + r"(?P<tags>(?:\.(?:" + _ANY_TAG + "))*)"
+    + "(?:-" + _GROUP + ")?"
+    + _EXTENSION + "$",
+    re.IGNORECASE,
+)
+_TAG_RE = re.compile(r"\.(" + _ANY_TAG + ")", re.IGNORECASE)
+
+_PLACEHOLDER_RE = re.compile(r"\{(\w+)(?::[^}]*)?\}")
+
+
+def _load_reserved_words() -> set:
+    """Words guessit may read as something other than a title."""
+    words = set()
+    options_path = os.path.join(os.path.dirname(guessit.__file__), "config", "options.json")
+    with open(options_path, "r", encoding="utf-8") as f:
+        options = json.load(f)
+
+    def walk(value):
+        if isinstance(value, dict):
+            for key, item in value.items():
+                walk(key)
+                walk(item)
+        elif isinstance(value, list):
+            for item in value:
+                walk(item)
+        elif isinstance(value, str):
+            words.update(word.lower() for word in re.findall(r"[A-Za-z]+", value))
+
+    walk(options)
+
+    # Languages and countries guessit accepts, by code and by name
+    from babelfish import Country, Language
+
+    for code in options.get("allowed_languages", []):
+        try:
+            language = Language.fromietf(code)
+        except ValueError:
+            continue
+        words.add(language.alpha3)
+        words.update(word.lower() for word in re.findall(r"[A-Za-z]+", language.name))
+        try:
+            words.add(language.alpha2)
+        except Exception:
+            pass
+    for code in options.get("allowed_countries", []):
+        country = Country(code.upper())
+        words.add(code.lower())
+        words.update(word.lower() for word in re.findall(r"[A-Za-z]+", country.name))
+
+    return words - TITLE_WORDS_ALLOWED
+
+
+RESERVED_WORDS = _load_reserved_words()
+
+
+def _template_pattern(template: str):
+    """Compile a naming template into a regex, or None if it uses unknown placeholders.
+
+    Fields the template renderers drop when empty are optional, along with
+    the separator in front of them.  Names with an episode title always go
+    to guessit, so {episode_title} segments are left out.
+    """
+    parts = ["^"]
+    pos = 0
+    seen = set()
+    for match in _PLACEHOLDER_RE.finditer(template):
+        literal = template[pos:match.start()]
+        pos = match.end()
+        field = match.group(1)
+        if field in seen:
+            return None
+        seen.add(field)
+
+        if field == "title":
+            regex = _TITLE
+        elif field == "year":
+            regex = _YEAR
+        elif field in ("season", "episode"):
+            regex = rf"(?P<{field}>\d{{1,3}})"
+        elif field in TEMPLATE_TAGS:
+            regex = f"(?P<{field}>{_alternation(TAGS[TEMPLATE_TAGS[field]])})"
+        elif field == "group":
+            regex = _GROUP
+        elif field == "episode_title":
+            if literal.strip(".-_ "):
+                parts.append(re.escape(literal))
+            continue
+        else:
+            return None
+
+        if field in ("title", "season", "episode") or literal.strip(".-_ "):
+            parts.append(re.escape(literal) + regex)
+        else:
+            parts.append(f"(?:{re.escape(literal)}{regex})?")
+    parts.append(re.escape(template[pos:]))
+    parts.append(_EXTENSION + "$")
+    return re.compile("".join(parts), re.IGNORECASE)
+
+
+def _add_fields(result: dict, fields: dict) -> bool:
+    """Merge one tag's fields into result. False if guessit would resolve a clash."""
+    for key, value in fields.items():
+        if key not in result:
+            result[key] = value
+        elif key == "other" and value not in result[key]:
+            existing = result[key] if isinstance(result[key], list) else [result[key]]
+            result[key] = existing + [value]
+        else:
+            return False
+    return True
+
+
+class ScenePatterns:
+    """The built-in scene layout plus the configured naming templates, compiled."""
+
+    def __init__(self, templates=None):
+        self.patterns = [SCENE_PATTERN]
+        for template in (templates or {}).values():
+            if not isinstance(template, str):
+                continue
+            pattern = _template_pattern(template)
+            if pattern is not None:
+                self.patterns.append(pattern)
+
+    def parse(self, name: str):
+        """Return guessit's result for name, or None if guessit is needed."""
+        for pattern in self.patterns:
+            match = pattern.match(name)
+            if match is not None:
+                parsed = self._build(name, match)
+                if parsed is not None:
+                    return parsed
+        return None
+
+    def _build(self, name: str, match):
+        groups = match.groupdict()
+        title = groups["title"]
+        words = re.split(r"[. ]", title)
+        for word in words:
+            if len(word) < 2 or word.lower() in RESERVED_WORDS:
+                return None
+
+        result = {"title": " ".join(words)}
+        if groups.get("year"):
+            year = int(groups["year"])
+            if not 1920 <= year < 2030:
+                return None
+            result["year"] = year
+        if groups.get("season") is not None:
+            result["season"] = int(groups["season"])
+        if groups.get("episode") is not None:
+            episode = int(groups["episode"])
+            if groups.get("episode2") is not None:
+                second = int(groups["episode2"])
+                if second != episode + 1:
+                    return None
+                result["episode"] = [episode, second]
+            else:
+                result["episode"] = episode
+
+        # Tags in the order they appear, wherever the pattern captured them
+        tags = []
+        if groups.get("tags"):
+            offset = match.start("tags")
+            tags = [(offset + m.start(1), m.group(1)) for m in _TAG_RE.finditer(groups["tags"])]
+        for field in TEMPLATE_TAGS:
+            if groups.get(field):
+                tags.append((match.start(field), groups[field]))
+        tags.sort()
+        for start, tag in tags:
+            if tag.lower() in NUMBER_SENSITIVE_TAGS and name[start - 2:start - 1].isdigit():
+                return None
+            if not _add_fields(result, _tag_fields[tag.lower()]):
+                return None
+        # guessit upgrades Blu-ray to Ultra HD Blu-ray for 2160p releases
+        if result.get("source") == "Blu-ray" and result.get("screen_size") == "2160p":
+            result["source"] = "Ultra HD Blu-ray"
+
+        group = groups.get("group")
+        if group:
+            # guessit only reads -GROUP as the release group reliably after a
+            # codec; after a year, episode or source it may become a title
+            if not tags or _tag_kinds[tags[-1][1].lower()] != "video_codec":
+                return None
+            if group.isdigit() or group.lower() in RESERVED_WORDS or group.lower() in _tag_fields:
+                return None
+            result["release_group"] = group
+
+        container = groups.get("container")
+        if container:
+            if container != container.lower():
+                return None
+            result["container"] = container
+            result["mimetype"] = CONTAINERS[container]
+
+        result["type"] = "episode" if "season" in result or "episode" in result else "movie"
+        return result
@@ -0,0 +1,201 @@
+"""Persistent cache of TMDB API responses.
+
+Batch episode naming looks up the same show, season and episodes again for
+every file, and every lookup went to the network.  Response bodies are
+stored in SQLite keyed by API path plus the normalized query parameters
+(never the API key).  Each kind of response (search, movie, tv, season,
+episode) has its own time to live; once an entry is stale it is revalidated
+with its ETag / Last-Modified, so an unchanged response costs a 304 rather
+than a full download.  The cache is capped by size, evicting the least
+recently used entries.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlencode
+
+from .config import CONFIG_DIR
+
+TMDB_CACHE_PATH = os.path.join(CONFIG_DIR, "tmdb-cache.db")
+DEFAULT_MAX_MB = 64
+
+# Hours each kind of response is served without asking TMDB again.  Shows
+# and seasons gain episodes while airing; searches pick up new titles.
+DEFAULT_TTL_HOURS = {
+    "search": 24,
+    "movie": 168,
+    "tv": 24,
+    "season": 24,
+    "episode": 168,
+}
+
+# Seconds between last_used updates for an entry; hits inside the window
+# don't write
+TOUCH_INTERVAL = 60
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS responses (
+        key TEXT PRIMARY KEY,
+        kind TEXT NOT NULL,
+        body TEXT NOT NULL,
+        etag TEXT,
+        last_modified TEXT,
+        expires REAL NOT NULL,
+        size INTEGER NOT NULL,
+        last_used REAL NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)",
+)
+
+
+def cache_key(path: str, params: dict) -> str:
+    """API path plus sorted query parameters, without the API key.
+
+    Search text is case- and whitespace-folded, as TMDB's search is.
+    """
+    items = []
+    for name, value in sorted(params.items()):
+        if name == "api_key" or value is None:
+            continue
+        if isinstance(value, bool):
+            value = "true" if value else "false"
+        elif name == "query":
+            value = " ".join(str(value).lower().split())
+        items.append((name, str(value)))
+    return f"{path}?{urlencode(items)}" if items else path
+
+
+class TMDBCache:
+    """SQLite-backed store of TMDB response bodies with hit/miss counters."""
+
+    def __init__(self, path: str = TMDB_CACHE_PATH, max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Lookups run on the event loop, so one connection stays open and
+        # commits don't wait for fsync
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode = WAL")
+            self._conn.execute("PRAGMA synchronous = NORMAL")
+            for statement in _SCHEMA:
+                self._conn.execute(statement)
+            self._conn.commit()
+
+    def get(self, key: str):
+        """Return {"body", "etag", "last_modified", "fresh"} for key, or None if not cached.
+
+        Counts a hit for fresh entries and a miss otherwise; a stale entry
+        is returned so the caller can revalidate it.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, etag, last_modified, expires, last_used FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[3] <= now:
+                self.misses += 1
+            else:
+                self.hits += 1
+            if row is None:
+                return None
+            if now - row[4] > TOUCH_INTERVAL:
+                self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+        return {"body": row[0], "etag": row[1], "last_modified": row[2], "fresh": row[3] > now}
+
+    def put(self, key: str, kind: str, body: str, etag, last_modified, ttl: float):
+        """Store a response body, evicting the least recently used entries if over the cap."""
+        size = len(key) + len(body)
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, kind, body, etag, last_modified, expires, size, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, kind, body, etag, last_modified, now + ttl, size, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def refresh(self, key: str, ttl: float):
+        """Mark a stale entry fresh again after TMDB answered 304 Not Modified."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE responses SET expires = ?, last_used = ? WHERE key = ?", (now + ttl, now, key)
+            )
+            self._conn.commit()
+            self.revalidated += 1
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        victims = []
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY last_used"):
+            victims.append((key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+
+    def stats(self) -> dict:
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT kind, COUNT(*), COALESCE(SUM(size), 0), SUM(expires <= ?) FROM responses GROUP BY kind",
+                (now,),
+            ).fetchall()
+        lookups = self.hits + self.misses
+        return {
+            "entries": sum(row[1] for row in rows),
+            "size_bytes": sum(row[2] for row in rows),
+            "max_bytes": self.max_bytes,
+            "stale": sum(row[3] for row in rows),
+            "by_kind": {row[0]: row[1] for row in rows},
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "revalidated": self.revalidated,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_tmdb_cache(config: dict):
+    """Get the shared TMDBCache, or None if disabled in config."""
+    global _cache
+    cache_config = config.get("tmdb_cache", {})
+    if not cache_config.get("enabled", True):
+        return None
+    try:
+        max_bytes = int(cache_config.get("max_mb", DEFAULT_MAX_MB)) * 1024 * 1024
+    except (TypeError, ValueError):
+        max_bytes = DEFAULT_MAX_MB * 1024 * 1024
+    with _cache_lock:
+        if _cache is None:
+            _cache = TMDBCache(TMDB_CACHE_PATH, max_bytes)
+        _cache.max_bytes = max_bytes
+        return _cache
+
+
+def get_ttl(config: dict, kind: str) -> float:
+    """Seconds a response of this kind stays fresh, from config["tmdb_cache"]["ttl_hours"]."""
+    ttl_hours = config.get("tmdb_cache", {}).get("ttl_hours", {})
+    try:
+        return float(ttl_hours.get(kind, DEFAULT_TTL_HOURS[kind])) * 3600
+    except (TypeError, ValueError):
+        return DEFAULT_TTL_HOURS[kind] * 3600
@@ -0,0 +1,271 @@
+"""Local catalog of TMDB titles imported from TMDB's daily ID exports.
+
+TMDB publishes the id, original title and popularity of every movie and TV
+series each day (movie_ids_MM_DD_YYYY.json.gz, tv_series_ids_MM_DD_YYYY.json.gz;
+see https://developer.themoviedb.org/docs/daily-id-exports).  Imported into
+SQLite, title searches are answered locally and offline; only detail lookups
+go to TMDB.
+
+Each kind has a table of titles numbered from the most popular down, and a
+contentless FTS5 trigram index over the folded titles sharing those ids, so
+a substring match scanned in id order finds the most popular titles first
+and can stop early.  Imports stream the file line by line into a staging
+table and swap the new tables in when done, so searches keep answering from
+the previous import meanwhile.
+"""
+
+import gzip
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import Counter
+
+from .config import CONFIG_DIR
+from .library import fts_string, trigrams
+
+TMDB_CATALOG_PATH = os.path.join(CONFIG_DIR, "tmdb-catalog.db")
+
+# Export file name prefix -> kind, and the field holding each kind's title
+EXPORT_PREFIXES = {"movie_ids": "movie", "tv_series_ids": "tv"}
+TITLE_FIELDS = {"movie": "original_title", "tv": "original_name"}
+
+# Rows scanned per kind of match; the most popular come first, so a common
+# word costs no more than a rare one
+CANDIDATES = 200
+FUZZY_CANDIDATES = 100
+FUZZY_MIN_SIMILARITY = 0.3
+
+# A popularity 10x higher is worth this much trigram similarity, enough to
+# order equally close titles without burying a closer one
+POPULARITY_WEIGHT = 0.05
+
+_WORD_SEPARATORS = re.compile(r"[\W_]+")
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS catalog_meta (
+        kind TEXT PRIMARY KEY,
+        rows INTEGER NOT NULL,
+        skipped INTEGER NOT NULL,
+        source TEXT NOT NULL,
+        imported_at TEXT NOT NULL
+    )
+    """,
+)
+
+
+def fold_title(text: str) -> str:
+    """Lowercase words without accents, separated by single spaces; punctuation doesn't matter to a search."""
+    text = text.lower()
+    if not text.isascii():
+        text = "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+    return " ".join(word for word in _WORD_SEPARATORS.split(text) if word)
+
+
+def export_kind(filepath: str):
+    """"movie" or "tv" from an export's file name, or None if it isn't one."""
+    name = os.path.basename(filepath)
+    for prefix, kind in EXPORT_PREFIXES.items():
+        if name.startswith(prefix):
+            return kind
+    return None
+
+
+def _similarity(wanted: set, title: str) -> float:
+    have = trigrams(title)
+    return len(wanted & have) / len(wanted | have) if have else 0.0
+
+
+class TMDBCatalog:
+    """SQLite catalog of TMDB movie and TV titles with trigram search."""
+
+    def __init__(self, path: str = TMDB_CATALOG_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._import_lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Searches run on the event loop, so one connection stays open;
+        # imports use their own so searches don't wait for them
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode = WAL")
+            for statement in _SCHEMA:
+                self._conn.execute(statement)
+            self._conn.commit()
+        self._kinds = self._imported_kinds()
+
+    def _imported_kinds(self) -> set:
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT kind FROM catalog_meta")}
+
+    def has(self, kind: str) -> bool:
+        """Whether an export of this kind has been imported."""
+        return kind in self._kinds
+
+    def import_export(self, filepath: str, kind: str) -> dict:
+        """Import a TMDB ID export (gzipped or plain JSON lines), replacing the kind's titles.
+
+        Adult titles and lines that aren't valid entries are skipped.
+        Raises ValueError if no titles were found.
+        """
+        if kind not in TITLE_FIELDS:
+            raise ValueError(f"Unknown catalog kind: {kind}")
+        title_field = TITLE_FIELDS[kind]
+        counts = {"rows": 0, "skipped": 0}
+
+        def entries(lines):
+            for line in lines:
+                try:
+                    entry = json.loads(line)
+                    title = entry[title_field]
+                    tmdb_id = int(entry["id"])
+                except (ValueError, KeyError, TypeError):
+                    counts["skipped"] += 1
+                    continue
+                folded = fold_title(title) if isinstance(title, str) else ""
+                if entry.get("adult") or not folded:
+                    counts["skipped"] += 1
+                    continue
+                counts["rows"] += 1
+                yield tmdb_id, title, folded, float(entry.get("popularity") or 0)
+
+        start = time.monotonic()
+        opener = gzip.open if filepath.endswith(".gz") else open
+        with self._import_lock:
+            conn = sqlite3.connect(self.path, timeout=30)
+            try:
+                conn.execute("DROP TABLE IF EXISTS temp.staging")
+                conn.execute("CREATE TEMP TABLE staging (tmdb_id INTEGER, title TEXT, folded TEXT, popularity REAL)")
+                with opener(filepath, "rt", encoding="utf-8") as f:
+                    conn.executemany("INSERT INTO staging VALUES (?, ?, ?, ?)", entries(f))
+                if not counts["rows"]:
+                    raise ValueError(f"No {kind} titles found in {os.path.basename(filepath)}")
+
+                titles, index = f"{kind}_titles", f"{kind}_trigrams"
+                conn.execute(f"DROP TABLE IF EXISTS {titles}_new")
+                conn.execute(f"DROP TABLE IF EXISTS {index}_new")
+                conn.execute(
+                    f"CREATE TABLE {titles}_new (id INTEGER PRIMARY KEY, tmdb_id INTEGER NOT NULL, "
+                    "title TEXT NOT NULL, folded TEXT NOT NULL, popularity REAL NOT NULL)"
+                )
+                conn.execute(f"CREATE VIRTUAL TABLE {index}_new USING fts5(folded, content='', tokenize='trigram')")
+                # Ids follow popularity, so scans in id order meet the most popular titles first
+                conn.execute(
+                    f"INSERT INTO {titles}_new (tmdb_id, title, folded, popularity) "
+                    "SELECT tmdb_id, title, folded, popularity FROM staging ORDER BY popularity DESC, tmdb_id"
+                )
+                conn.execute("DROP TABLE staging")
+                conn.execute(f"INSERT INTO {index}_new (rowid, folded) SELECT id, folded FROM {titles}_new")
+                conn.commit()
+
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute(f"DROP TABLE IF EXISTS {titles}")
+                conn.execute(f"DROP TABLE IF EXISTS {index}")
+                conn.execute(f"ALTER TABLE {titles}_new RENAME TO {titles}")
+                conn.execute(f"ALTER TABLE {index}_new RENAME TO {index}")
+                conn.execute(f"CREATE INDEX {titles}_folded ON {titles} (folded)")
+                conn.execute(
+                    "INSERT OR REPLACE INTO catalog_meta (kind, rows, skipped, source, imported_at) "
+                    "VALUES (?, ?, ?, ?, datetime('now'))",
+                    (kind, counts["rows"], counts["skipped"], os.path.basename(filepath)),
+                )
+                conn.commit()
+                # The new tables went through the write-ahead log; don't leave it that size
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            finally:
+                conn.close()
+        self._kinds.add(kind)
+        return {"kind": kind, **counts, "seconds": round(time.monotonic() - start, 1)}
+
+    def search(self, kind: str, query: str, limit: int = 10) -> list:
+        """Titles of a kind matching query, best first.
+
+        Exact titles, titles containing every word of the query and, if those
+        are too few, titles sharing enough trigrams with it are ranked by
+        trigram similarity, with popularity ordering close matches.  Returns
+        [{"id", "title", "popularity", "score"}].
+        """
+        folded = fold_title(query)
+        if not folded or not self.has(kind):
+            return []
+        titles, index = f"{kind}_titles", f"{kind}_trigrams"
+        columns = "id, tmdb_id, title, folded, popularity"
+        long_words = [word for word in folded.split() if len(word) >= 3]
+
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {columns} FROM {titles} WHERE folded = ? ORDER BY id LIMIT ?", (folded, CANDIDATES)
+            ).fetchall()
+            if long_words:
+                # Trigram matches are substrings; short words would need a scan
+                match = " AND ".join(fts_string(word) for word in long_words)
+                ids = [row[0] for row in self._conn.execute(
+                    f"SELECT rowid FROM {index} WHERE {index} MATCH ? ORDER BY rowid LIMIT ?",
+                    (match, CANDIDATES),
+                )]
+                rows += self._rows(titles, columns, ids)
+            else:
+                rows += self._conn.execute(
+                    f"SELECT {columns} FROM {titles} WHERE folded > ? AND folded < ? LIMIT ?",
+                    (folded, folded + "\U0010ffff", CANDIDATES),
+                ).fetchall()
+
+            wanted = trigrams(folded)
+            matched = {row[0] for row in rows}
+            if len(matched) < limit:
+                shared = Counter()
+                for gram in wanted:
+                    if " " not in gram:
+                        shared.update(row[0] for row in self._conn.execute(
+                            f"SELECT rowid FROM {index} WHERE {index} MATCH ? ORDER BY rowid LIMIT ?",
+                            (fts_string(gram), FUZZY_CANDIDATES),
+                        ))
+                rows += self._rows(titles, columns, [rowid for rowid, _ in shared.most_common(FUZZY_CANDIDATES)])
+
+        scored = {}
+        for rowid, tmdb_id, title, row_folded, popularity in rows:
+            if rowid in scored:
+                continue
+            similarity = 1.0 if row_folded == folded else _similarity(wanted, row_folded)
+            if rowid not in matched and similarity < FUZZY_MIN_SIMILARITY:
+                continue
+            score = similarity + POPULARITY_WEIGHT * math.log10(1 + popularity)
+            scored[rowid] = {"id": tmdb_id, "title": title, "popularity": popularity, "score": round(score, 3)}
+        return sorted(scored.values(), key=lambda result: -result["score"])[:limit]
+
+    def _rows(self, titles: str, columns: str, ids: list) -> list:
+        if not ids:
+            return []
+        return self._conn.execute(
+            f"SELECT {columns} FROM {titles} WHERE id IN ({', '.join('?' * len(ids))})", ids
+        ).fetchall()
+
+    def stats(self) -> dict:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT kind, rows, skipped, source, imported_at FROM catalog_meta ORDER BY kind"
+            ).fetchall()
+        return {
+            row[0]: {"rows": row[1], "skipped": row[2], "source": row[3], "imported_at": row[4]}
+            for row in rows
+        }
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_tmdb_catalog(config: dict):
+    """Get the shared TMDBCatalog, or None if disabled in config."""
+    global _catalog
+    if not config.get("tmdb_catalog", {}).get("enabled", True):
+        return None
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = TMDBCatalog()
+        return _catalog
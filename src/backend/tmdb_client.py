@@ -0,0 +1,180 @@
+"""Shared HTTP client for the TMDB API.
+
+Opening a new httpx.AsyncClient per request paid a TCP and TLS handshake on
+every search keystroke.  One client is opened for the app's lifetime instead
+(see main.py's lifespan), so connections to TMDB are pooled and kept alive
+between requests, and multiplexed over HTTP/2 when the optional h2 package
+is installed.
+
+Requests go through a token bucket (requests_per_second, with a burst
+allowance) so a batch can't trip TMDB's rate limit.  A 429 pauses the
+bucket for everyone until its Retry-After has passed, and 429s, 5xx
+answers and connection errors are retried with jittered exponential
+backoff.
+"""
+
+import asyncio
+import random
+import time
+from email.utils import parsedate_to_datetime
+
+import httpx
+
+# HTTP/2 needs the optional h2 package (pip install h2)
+try:
+    import h2  # noqa: F401
+    HAS_HTTP2 = True
+except ImportError:
+    HAS_HTTP2 = False
+
+TMDB_BASE_URL = "https://api.themoviedb.org/3"
+
+# Fail fast when TMDB is unreachable, but allow slow responses to large appends
+TIMEOUT = httpx.Timeout(15.0, connect=5.0, pool=10.0)
+
+# A batch of lookups can open a handful of connections; idle ones stay open
+# long enough to serve the next keystroke.  Keeping as many idle connections
+# as may be open stops a burst from closing connections that queued
+# requests could have reused.
+LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=20, keepalive_expiry=60.0)
+
+DEFAULT_REQUESTS_PER_SECOND = 40
+DEFAULT_BURST = 20
+DEFAULT_MAX_RETRIES = 3
+
+# Backoff before retry n is random in [0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** n)]
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 8.0
+
+# Longer Retry-After waits are not sat out; the caller gets the 429
+MAX_RETRY_AFTER = 30.0
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_client = None
+_limiter = None
+
+
+def _new_client(base_url: str) -> httpx.AsyncClient:
+    return httpx.AsyncClient(base_url=base_url, http2=HAS_HTTP2, timeout=TIMEOUT, limits=LIMITS)
+
+
+def start_tmdb_client(base_url: str = TMDB_BASE_URL) -> httpx.AsyncClient:
+    """Open the shared client; called from the app's lifespan."""
+    global _client
+    if _client is None:
+        _client = _new_client(base_url)
+    return _client
+
+
+async def close_tmdb_client():
+    """Close the shared client and its pooled connections."""
+    global _client
+    if _client is not None:
+        client, _client = _client, None
+        await client.aclose()
+
+
+def get_tmdb_client() -> httpx.AsyncClient:
+    """Get the shared client, opening it if the lifespan hasn't."""
+    return start_tmdb_client()
+
+
+class TokenBucket:
+    """Async token bucket; pause() holds every caller back until a deadline."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    async def acquire(self):
+        """Wait for a token.  Tokens go negative while callers queue, so each
+        waits its turn without a lock."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        await asyncio.sleep(max(wait, self.paused_until - now))
+        # A 429 may have paused the bucket while this caller waited
+        while time.monotonic() < self.paused_until:
+            await asyncio.sleep(self.paused_until - time.monotonic())
+
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+def get_rate_limiter(config: dict) -> TokenBucket:
+    """Get the shared TokenBucket, updated from config["tmdb_requests"]."""
+    global _limiter
+    request_config = config.get("tmdb_requests", {})
+    try:
+        rate = float(request_config.get("requests_per_second", DEFAULT_REQUESTS_PER_SECOND))
+        burst = int(request_config.get("burst", DEFAULT_BURST))
+    except (TypeError, ValueError):
+        rate, burst = DEFAULT_REQUESTS_PER_SECOND, DEFAULT_BURST
+    rate, burst = max(rate, 0.1), max(burst, 1)
+    if _limiter is None:
+        _limiter = TokenBucket(rate, burst)
+    _limiter.rate, _limiter.burst = rate, burst
+    return _limiter
+
+
+def get_max_retries(config: dict) -> int:
+    try:
+        return max(0, int(config.get("tmdb_requests", {}).get("max_retries", DEFAULT_MAX_RETRIES)))
+    except (TypeError, ValueError):
+        return DEFAULT_MAX_RETRIES
+
+
+def retry_after_seconds(response: httpx.Response):
+    """Seconds from a Retry-After header (delay or HTTP date), or None."""
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _backoff(attempt: int) -> float:
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+async def tmdb_request(path: str, params: dict, headers: dict, config: dict) -> httpx.Response:
+    """GET path through the rate limiter, retrying 429s, 5xx answers and connection errors.
+
+    Returns the last response, which may still be an error; raises
+    httpx.TransportError if TMDB could not be reached at all.
+    """
+    client = get_tmdb_client()
+    limiter = get_rate_limiter(config)
+    max_retries = get_max_retries(config)
+    for attempt in range(max_retries + 1):
+        await limiter.acquire()
+        try:
+            response = await client.get(path, params=params, headers=headers)
+        except httpx.TransportError:
+            if attempt == max_retries:
+                raise
+            await asyncio.sleep(_backoff(attempt))
+            continue
+        if response.status_code not in RETRY_STATUSES or attempt == max_retries:
+            return response
+
+        wait = retry_after_seconds(response)
+        if response.status_code == 429:
+            # Everyone else is over the limit too, not just this request
+            limiter.pause(wait if wait is not None else _backoff(attempt))
+        if wait is not None and wait > MAX_RETRY_AFTER:
+            return response
+        await asyncio.sleep(wait if wait is not None else _backoff(attempt))
+    return response
@@ -0,0 +1,378 @@
+"""BitTorrent v2 (BEP 52) and hybrid v1+v2 torrent generation.
+
+torf only writes v1 torrents, so v2 and hybrid metainfo is built here.  Every
+file is read once in piece-sized chunks; a thread pool turns each chunk into
+its SHA-256 16 KiB leaf hashes, reduces them to the chunk's node in the piece
+layer and, for hybrid torrents, also computes the chunk's SHA-1 v1 digest.
+Hybrid torrents pad every file except the last to a piece boundary (BEP 47
+pad files), so a v1 piece never spans two files and both digests come from
+the same buffer.
+"""
+
+import hashlib
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+from torf import Torrent
+
+from .hash_cache import file_key
+from .hashing import HashingCancelled, PIECES_PER_WORKER
+
+BLOCK_SIZE = 16 * 1024
+ZERO_HASH = bytes(32)
+TORRENT_FORMATS = ("v1", "v2", "hybrid")
+
+
+def get_torrent_format(config: dict, requested=None) -> str:
+    """Resolve the torrent format for a request, falling back to config.
+
+    Raises HTTPException(400) for unknown formats.
+    """
+    torrent_format = requested or config.get("torrent_format", "v1")
+    if torrent_format not in TORRENT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown torrent format '{torrent_format}'. Use one of: {', '.join(TORRENT_FORMATS)}."
+        )
+    return torrent_format
+
+
+def bencode(value) -> bytes:
+    """Encode ints, strings, bytes, lists and dicts as bencoded bytes."""
+    if isinstance(value, int):
+        return b"i%de" % value
+    if isinstance(value, str):
+        value = value.encode("utf-8")
+    if isinstance(value, bytes):
+        return b"%d:%s" % (len(value), value)
+    if isinstance(value, list):
+        return b"l" + b"".join(bencode(v) for v in value) + b"e"
+    if isinstance(value, dict):
+        items = sorted((k.encode("utf-8") if isinstance(k, str) else k, v) for k, v in value.items())
+        return b"d" + b"".join(bencode(k) + bencode(v) for k, v in items) + b"e"
+    raise TypeError(f"Cannot bencode {type(value).__name__}")
+
+
+def _bdecode_span(data: bytes, pos: int) -> tuple:
+    """Decode the value at data[pos:]. Returns (value, end position)."""
+    token = data[pos:pos + 1]
+    if token == b"i":
+        end = data.index(b"e", pos)
+        return int(data[pos + 1:end]), end + 1
+    if token == b"l":
+        items, pos = [], pos + 1
+        while data[pos:pos + 1] != b"e":
+            item, pos = _bdecode_span(data, pos)
+            items.append(item)
+        return items, pos + 1
+    if token == b"d":
+        items, pos = {}, pos + 1
+        while data[pos:pos + 1] != b"e":
+            key, pos = _bdecode_span(data, pos)
+            start = pos
+            value, pos = _bdecode_span(data, pos)
+            # Keep the raw bytes of each value so the info dict can be hashed as written
+            items[key] = (value, data[start:pos])
+        return items, pos + 1
+    if token.isdigit():
+        colon = data.index(b":", pos)
+        end = colon + 1 + int(data[pos:colon])
+        if end > len(data):
+            raise ValueError("Truncated string")
+        return data[colon + 1:end], end
+    raise ValueError(f"Invalid bencode at offset {pos}")
+
+
+def read_infohashes(torrent_file_path: str) -> dict:
+    """Read a .torrent file's info hashes: {"v1": SHA-1 hex or None, "v2": SHA-256 hex or None}.
+
+    Raises OSError or ValueError if the file can't be read or parsed.
+    """
+    with open(torrent_file_path, "rb") as f:
+        data = f.read()
+    try:
+        root, _ = _bdecode_span(data, 0)
+        info, raw_info = root[b"info"]
+    except (IndexError, KeyError, TypeError) as e:
+        raise ValueError(f"Not a torrent file: {e}") from None
+    return {
+        "v1": hashlib.sha1(raw_info).hexdigest() if b"pieces" in info else None,
+        "v2": hashlib.sha256(raw_info).hexdigest() if b"meta version" in info else None,
+    }
+
+
+def _next_pow2(n: int) -> int:
+    return 1 << max(0, n - 1).bit_length()
+
+
+def merkle_root(hashes: list, width: int, pad: bytes = ZERO_HASH) -> bytes:
+    """Root of a SHA-256 Merkle tree whose bottom layer is hashes padded to width with pad."""
+    layer = list(hashes) + [pad] * (width - len(hashes))
+    while len(layer) > 1:
+        layer = [hashlib.sha256(layer[i] + layer[i + 1]).digest() for i in range(0, len(layer), 2)]
+    return layer[0]
+
+
+def hash_chunk(chunk: bytearray, leaf_width: int, v1_length: int) -> tuple:
+    """Hash one piece-sized chunk of a file.
+
+    Returns (node, v1_digest): the Merkle root of the chunk's 16 KiB leaves
+    padded to leaf_width, and its SHA-1 digest zero-padded to v1_length (or
+    None if v1_length is 0).
+    """
+    view = memoryview(chunk)
+    leaves = [hashlib.sha256(view[i:i + BLOCK_SIZE]).digest() for i in range(0, len(chunk), BLOCK_SIZE)]
+    node = merkle_root(leaves, leaf_width)
+    v1_digest = None
+    if v1_length:
+        sha1 = hashlib.sha1(chunk)
+        if v1_length > len(chunk):
+            sha1.update(bytes(v1_length - len(chunk)))
+        v1_digest = sha1.digest()
+    return node, v1_digest
+
+
+def list_files(path: str) -> list:
+    """List (relative parts, absolute path, size) for the files of a torrent.
+
+    Hidden and empty files are skipped like torf does.  Files are ordered the
+    way a bencoded file tree sorts them, which hybrid torrents require for the
+    v1 file list too.
+    """
+    if os.path.isfile(path):
+        return [((os.path.basename(path),), path, os.path.getsize(path))]
+
+    files = []
+    for dirpath, dirnames, filenames in os.walk(path, followlinks=True):
+        dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+        for filename in filenames:
+            if filename.startswith("."):
+                continue
+            filepath = os.path.join(dirpath, filename)
+            size = os.path.getsize(filepath)
+            if size > 0:
+                parts = tuple(os.path.relpath(filepath, path).split(os.sep))
+                files.append((parts, filepath, size))
+    files.sort(key=lambda f: tuple(p.encode("utf-8") for p in f[0]))
+    return files
+
+
+class FileHashes:
+    """Hash results collected for one file."""
+
+    def __init__(self, filepath: str, size: int, piece_size: int, hybrid: bool, last: bool):
+        self.filepath = filepath
+        self.size = size
+        self.piece_count = -(-size // piece_size)
+        self.layer = [None] * self.piece_count
+        self.v1 = [None] * self.piece_count if hybrid else None
+        self.root = None
+        self.v1_length_last = piece_size
+        if last:
+            self.v1_length_last = size - (self.piece_count - 1) * piece_size
+        blocks_per_piece = piece_size // BLOCK_SIZE
+        if self.piece_count == 1:
+            self.leaf_width = _next_pow2(-(-size // BLOCK_SIZE))
+        else:
+            self.leaf_width = blocks_per_piece
+        self.piece_pad = merkle_root([], blocks_per_piece)
+
+    def finish(self):
+        if self.root is None:
+            if self.piece_count == 1:
+                self.root = self.layer[0]
+            else:
+                self.root = merkle_root(self.layer, _next_pow2(self.piece_count), self.piece_pad)
+
+
+def _load_cached(result: FileHashes, piece_size: int, cache) -> tuple:
+    """Fill result from the cache where possible.
+
+    Returns (hit, pending_pieces, store_keys) where pending_pieces are the
+    piece indexes that still have to be read.
+    """
+    full_pieces = result.size // piece_size
+    sha256_key = file_key(result.filepath, piece_size, 0, "sha256")
+    sha1_key = file_key(result.filepath, piece_size, 0, "sha1")
+    cached = cache.lookup(sha256_key)
+    cached_v1 = cache.lookup(sha1_key) if result.v1 is not None else b""
+
+    if (cached is None or len(cached) != 32 * (result.piece_count + 1)
+            or cached_v1 is None or (result.v1 is not None and len(cached_v1) != 20 * full_pieces)):
+        return False, list(range(result.piece_count)), (sha256_key, sha1_key)
+
+    result.root = cached[:32]
+    result.layer = [cached[32 + i * 32:64 + i * 32] for i in range(result.piece_count)]
+    pending = []
+    if result.v1 is not None:
+        for i in range(full_pieces):
+            result.v1[i] = cached_v1[i * 20:(i + 1) * 20]
+        if full_pieces < result.piece_count:
+            # The zero-padded tail piece depends on the file's position, so hash it
+            pending.append(result.piece_count - 1)
+    return True, pending, None
+
+
+def hash_files(files: list, piece_size: int, workers: int, hybrid: bool, cache=None, callback=None) -> tuple:
+    """Compute v2 Merkle hashes (and hybrid v1 digests) for files.
+
+    files is the output of list_files().  Returns (results, stats) with one
+    FileHashes per file.  callback follows the hashing.hash_pieces convention.
+    """
+    results = []
+    work = []
+    to_store = []
+    stats = {"hits": 0, "misses": 0}
+    for index, (_, filepath, size) in enumerate(files):
+        result = FileHashes(filepath, size, piece_size, hybrid, index == len(files) - 1)
+        results.append(result)
+        if cache is not None:
+            hit, pending, store_keys = _load_cached(result, piece_size, cache)
+            stats["hits" if hit else "misses"] += 1
+            if store_keys:
+                to_store.append((result, store_keys))
+        else:
+            pending = list(range(result.piece_count))
+        work.extend((result, piece) for piece in pending)
+
+    piece_count = sum(r.piece_count for r in results)
+    total_size = sum(r.size for r in results)
+    done = piece_count - len(work)
+    pending = deque()
+    max_pending = max(1, workers) * PIECES_PER_WORKER
+
+    def finish(result, piece, future):
+        nonlocal done
+        node, v1_digest = future.result()
+        if result.root is None:
+            result.layer[piece] = node
+        if result.v1 is not None:
+            result.v1[piece] = v1_digest
+        done += 1
+        if callback is not None:
+            bytes_done = min(done * piece_size, total_size)
+            if callback(done, piece_count, bytes_done, total_size) is not None:
+                raise HashingCancelled()
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        fh = None
+        current = None
+        try:
+            for result, piece in work:
+                if result is not current:
+                    if fh is not None:
+                        fh.close()
+                    fh = open(result.filepath, "rb", buffering=0)
+                    current = result
+                offset = piece * piece_size
+                if fh.tell() != offset:
+                    fh.seek(offset)
+                chunk = bytearray(min(piece_size, result.size - offset))
+                view = memoryview(chunk)
+                filled = 0
+                while filled < len(chunk):
+                    read = fh.readinto(view[filled:])
+                    if not read:
+                        raise IOError(f"Unexpected end of file: {result.filepath}")
+                    filled += read
+                v1_length = 0
+                if result.v1 is not None:
+                    v1_length = result.v1_length_last if piece == result.piece_count - 1 else piece_size
+                leaf_width = result.leaf_width
+                pending.append((result, piece, pool.submit(hash_chunk, chunk, leaf_width, v1_length)))
+                if len(pending) >= max_pending:
+                    finish(*pending.popleft())
+            while pending:
+                finish(*pending.popleft())
+        except HashingCancelled:
+            for _, _, future in pending:
+                future.cancel()
+            raise
+        finally:
+            if fh is not None:
+                fh.close()
+
+    for result in results:
+        result.finish()
+
+    if cache is not None:
+        for result, (sha256_key, sha1_key) in to_store:
+            cache.store(sha256_key, result.root + b"".join(result.layer))
+            if result.v1 is not None:
+                full_pieces = result.size // piece_size
+                cache.store(sha1_key, b"".join(result.v1[:full_pieces]))
+
+    stats["pieces_reused"] = piece_count - len(work)
+    stats["pieces_hashed"] = len(work)
+    return results, stats
+
+
+def build_metainfo(path: str, files: list, results: list, piece_size: int, hybrid: bool,
+                   trackers: list, comment: str) -> dict:
+    """Assemble the metainfo dict for a v2 or hybrid torrent."""
+    name = os.path.basename(os.path.normpath(path))
+    single_file = os.path.isfile(path)
+
+    file_tree = {}
+    piece_layers = {}
+    for (parts, _, size), result in zip(files, results):
+        node = file_tree
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+        node[parts[-1]] = {"": {"length": size, "pieces root": result.root}}
+        if size > piece_size:
+            piece_layers[result.root] = b"".join(result.layer)
+
+    info = {
+        "name": name,
+        "piece length": piece_size,
+        "meta version": 2,
+        "file tree": file_tree,
+    }
+
+    if hybrid:
+        info["pieces"] = b"".join(b"".join(r.v1) for r in results)
+        if single_file:
+            info["length"] = files[0][2]
+        else:
+            v1_files = []
+            for index, (parts, _, size) in enumerate(files):
+                v1_files.append({"length": size, "path": list(parts)})
+                pad = -size % piece_size
+                if pad and index < len(files) - 1:
+                    v1_files.append({"attr": "p", "length": pad, "path": [".pad", str(pad)]})
+            info["files"] = v1_files
+
+    metainfo = {
+        "info": info,
+        "piece layers": piece_layers,
+        "created by": "Torrent Creator",
+        "creation date": int(time.time()),
+    }
+    if comment:
+        metainfo["comment"] = comment
+    if trackers:
+        metainfo["announce"] = trackers[0]
+        if len(trackers) > 1:
+            metainfo["announce-list"] = [[t] for t in trackers]
+    return metainfo
+
+
+def write_torrent(path: str, torrent_file_path: str, torrent_format: str, trackers: list, comment: str,
+                  workers: int, cache=None, callback=None) -> dict:
+    """Hash path and write a v2 or hybrid .torrent file. Returns the hashing stats."""
+    files = list_files(path)
+    if not files:
+        raise HTTPException(status_code=400, detail="The torrent folder contains no non-empty files.")
+
+    hybrid = torrent_format == "hybrid"
+    piece_size = Torrent.calculate_piece_size(sum(size for _, _, size in files))
+    results, stats = hash_files(files, piece_size, workers, hybrid, cache, callback)
+    metainfo = build_metainfo(path, files, results, piece_size, hybrid, trackers, comment)
+
+    with open(torrent_file_path, "wb") as fh:
+        fh.write(bencode(metainfo))
+    return stats
@@ -114,6 +114,7 @@ const settingOutputDir = document.getElementById("setting-output-dir");
 const settingTemplateMovie = document.getElementById("setting-template-movie");
 const settingTemplateEpisode = document.getElementById("setting-template-episode");
 const settingTemplateSeason = document.getElementById("setting-template-season");
+const settingTemplateEpisodeFile = document.getElementById("setting-template-episode-file");
 const settingNfoNotes = document.getElementById("setting-nfo-notes");
 const settingNfoNotesText = document.getElementById("setting-nfo-notes-text");
 const settingAsciiArt = document.getElementById("setting-ascii-art");
@@ -149,6 +150,7 @@ let settingTrackers = [];
 const previewMovie = document.getElementById("preview-movie");
 const previewEpisode = document.getElementById("preview-episode");
 const previewSeason = document.getElementById("preview-season");
+const previewEpisodeFile = document.getElementById("preview-episode-file");
 
 // Movie details screen
 const torrentTree = document.getElementById("torrent-tree");
@@ -753,6 +755,11 @@ async function processSeasonUpload(folderPath) {
     if (response.success) {
       seasonUploadStatus.textContent = `Found ${response.episode_count} episode(s)!`;
       seasonUploadStatus.style.color = "var(--success)";
+      if (response.consistency && !response.consistency.consistent) {
+        const fields = Object.keys(response.consistency.differences).map((f) => f.replace(/_/g, " "));
+        seasonUploadStatus.textContent = `Found ${response.episode_count} episode(s), but they differ in: ${fields.join(", ")}`;
+        seasonUploadStatus.style.color = "var(--warning)";
+      }
       currentTorrentFolder = response.target_folder;
       seasonUploadInProgress = false;
       showSeasonDetails(response);
@@ -839,6 +846,8 @@ const spinnerFrames = ['|', '/', '-', '\\'];
 // Batch edit state
 let batchSelectedShow = null;
 let batchSeasons = [];
+// Episode lists of every season of the selected show, by season number
+let batchSeasonEpisodes = new Map();
 let batchSearchTimeout = null;
 
 async function handleBatchEpisodeUpload(filepaths) {
@@ -852,6 +861,18 @@ async function handleBatchEpisodeUpload(filepaths) {
     index,
     assignedEpisode: null
   }));
+
+  // Parse every filename in one request. The results pre-select episodes
+  // below, and later /check-conflict and /parse calls hit the parse cache
+  const parsedEpisodes = batchEpisodes;
+  window.api.fetch("/parse/batch", {
+    method: "POST",
+    body: JSON.stringify({ filenames: parsedEpisodes.map(ep => ep.filename) }),
+  }).then((response) => {
+    (response.results || []).forEach((result, i) => {
+      parsedEpisodes[i].parsed = result.parsed;
+    });
+  }).catch((error) => console.error("Batch parse error:", error));
   
   // Navigate to batch edit screen
   hideAllScreens();
@@ -1093,12 +1114,43 @@ listBack.addEventListener("click", () => {
   showScreen("menu");
 });
 
+// Local copy of the library, kept in sync with /torrents/changes so
+// reopening the list only transfers what changed since last time
+const torrentLibrary = { version: null, entries: new Map() };
+
+async function syncTorrentLibrary() {
+  if (torrentLibrary.version !== null) {
+    const changes = await window.api.fetch(`/torrents/changes?since=${torrentLibrary.version}`);
+    if (!changes.reset) {
+      changes.removed.forEach((path) => torrentLibrary.entries.delete(path));
+      [...changes.added, ...changes.updated].forEach((entry) => torrentLibrary.entries.set(entry.path, entry));
+      torrentLibrary.version = changes.version;
+      return;
+    }
+  }
+
+  const response = await window.api.fetch("/torrents");
+  torrentLibrary.entries.clear();
+  Object.values(response.torrents).forEach((list) => {
+    list.forEach((entry) => torrentLibrary.entries.set(entry.path, entry));
+  });
+  torrentLibrary.version = response.version;
+}
+
+function groupTorrentLibrary() {
+  const torrents = { movies: [], episodes: [], seasons: [] };
+  const groups = { movie: torrents.movies, episode: torrents.episodes, season: torrents.seasons };
+  torrentLibrary.entries.forEach((entry) => groups[entry.type]?.push(entry));
+  Object.values(torrents).forEach((list) => list.sort((a, b) => a.name.toLowerCase().localeCompare(b.name.toLowerCase())));
+  return torrents;
+}
+
 async function loadTorrentList() {
   torrentListContainer.innerHTML = '<p class="loading">Loading...</p>';
 
   try {
-    const response = await window.api.fetch("/torrents");
-    const torrents = response.torrents;
+    await syncTorrentLibrary();
+    const torrents = groupTorrentLibrary();
 
     // Check if there are any torrents at all
     const totalCount = (torrents.movies?.length || 0) + (torrents.episodes?.length || 0) + (torrents.seasons?.length || 0);
@@ -1642,6 +1694,46 @@ previewCancel.addEventListener("click", closeTorrentPreview);
 // Track the torrent file path for the success screen
 let lastTorrentFilePath = null;
 
+// Queue a torrent creation job and resolve with its result once it finishes.
+// onProgress receives each progress snapshot streamed by the backend.
+async function runCreateJob(jobEndpoint, data, onProgress) {
+  const job = await window.api.fetch(jobEndpoint, {
+    method: "POST",
+    body: JSON.stringify(data),
+  });
+
+  return new Promise((resolve, reject) => {
+    const events = new EventSource(`${window.api.backendUrl}/jobs/${job.job_id}/events`);
+
+    events.addEventListener("progress", (event) => {
+      if (onProgress) onProgress(JSON.parse(event.data));
+    });
+    events.addEventListener("done", (event) => {
+      events.close();
+      resolve(JSON.parse(event.data).result);
+    });
+    events.addEventListener("failed", (event) => {
+      events.close();
+      reject(new Error(JSON.parse(event.data).error || "Torrent creation failed"));
+    });
+    events.addEventListener("cancelled", () => {
+      events.close();
+      reject(new Error("Torrent creation was cancelled"));
+    });
+    events.onerror = () => {
+      events.close();
+      reject(new Error("Lost connection to the backend while creating the torrent"));
+    };
+  });
+}
+
+function formatEta(seconds) {
+  const total = Math.max(0, Math.round(seconds));
+  const minutes = Math.floor(total / 60);
+  const secs = total % 60;
+  return `${minutes}:${String(secs).padStart(2, "0")}`;
+}
+
 previewConfirm.addEventListener("click", async () => {
   if (!pendingTorrentData) return;
 
@@ -1649,17 +1741,22 @@ previewConfirm.addEventListener("click", async () => {
   previewConfirm.textContent = "Creating torrent...";
 
   try {
-    let createEndpoint;
+    let jobEndpoint;
     if (currentMediaType === "episode") {
-      createEndpoint = "/create-episode-torrent";
+      jobEndpoint = "/jobs/create-episode";
     } else if (currentMediaType === "season") {
-      createEndpoint = "/create-season-torrent";
+      jobEndpoint = "/jobs/create-season";
     } else {
-      createEndpoint = "/create-torrent";
+      jobEndpoint = "/jobs/create-movie";
     }
-    const response = await window.api.fetch(createEndpoint, {
-      method: "POST",
-      body: JSON.stringify(pendingTorrentData),
+    const response = await runCreateJob(jobEndpoint, pendingTorrentData, (progress) => {
+      if (progress.piece_count > 0) {
+        const percent = Math.floor((progress.pieces_done / progress.piece_count) * 100);
+        let label = `Hashing ${percent}%`;
+        if (progress.mb_per_s > 0) label += ` · ${progress.mb_per_s} MB/s`;
+        if (progress.eta_seconds !== null) label += ` · ${formatEta(progress.eta_seconds)} left`;
+        previewConfirm.textContent = label;
+      }
     });
 
     if (response.success) {
@@ -1837,6 +1934,7 @@ async function loadSettings() {
       settingTemplateMovie.value = templates.movie || "";
       settingTemplateEpisode.value = templates.episode || "";
       settingTemplateSeason.value = templates.season || "";
+      settingTemplateEpisodeFile.value = templates.episode_file || settingTemplateEpisodeFile.placeholder;
 
       // Populate NFO tab
       const nfoConfig = originalConfig.nfo || {};
@@ -1891,6 +1989,7 @@ function updateTemplatePreviews() {
   previewMovie.textContent = applyTemplate(settingTemplateMovie.value) || "No template set";
   previewEpisode.textContent = applyTemplate(settingTemplateEpisode.value) || "No template set";
   previewSeason.textContent = applyTemplate(settingTemplateSeason.value) || "No template set";
+  previewEpisodeFile.textContent = applyTemplate(settingTemplateEpisodeFile.value) || "No template set";
 }
 
 // Update previews when templates change
@@ -1906,6 +2005,10 @@ settingTemplateSeason.addEventListener("input", () => {
   updateTemplatePreviews();
   markSettingsModified();
 });
+settingTemplateEpisodeFile.addEventListener("input", () => {
+  updateTemplatePreviews();
+  markSettingsModified();
+});
 settingReleaseGroup.addEventListener("input", () => {
   updateTemplatePreviews();
   markSettingsModified();
@@ -1979,7 +2082,10 @@ trackerNewInput.addEventListener("keypress", (e) => {
 
 // Save settings
 settingsSave.addEventListener("click", async () => {
+  // Start from the loaded config so settings without a UI control
+  // (torrent_format, hashing, ...) survive a save
   const config = {
+    ...originalConfig,
     api_keys: {
       tmdb: settingTmdbKey.value,
       tvdb: settingTvdbKey.value,
@@ -1988,6 +2094,7 @@ settingsSave.addEventListener("click", async () => {
       movie: settingTemplateMovie.value,
       episode: settingTemplateEpisode.value,
       season: settingTemplateSeason.value,
+      episode_file: settingTemplateEpisodeFile.value,
     },
     trackers: [...settingTrackers],
     output_directory: settingOutputDir.value,
@@ -2039,6 +2146,7 @@ settingsExport.addEventListener("click", async () => {
 
   try {
     const config = {
+      ...originalConfig,
       api_keys: {
         tmdb: settingTmdbKey.value,
         tvdb: settingTvdbKey.value,
@@ -2047,6 +2155,7 @@ settingsExport.addEventListener("click", async () => {
         movie: settingTemplateMovie.value,
         episode: settingTemplateEpisode.value,
         season: settingTemplateSeason.value,
+        episode_file: settingTemplateEpisodeFile.value,
       },
       trackers: [...settingTrackers],
       output_directory: settingOutputDir.value,
@@ -2095,6 +2204,7 @@ settingsImport.addEventListener("click", () => {
         settingTemplateMovie.value = config.naming_templates.movie || "";
         settingTemplateEpisode.value = config.naming_templates.episode || "";
         settingTemplateSeason.value = config.naming_templates.season || "";
+        settingTemplateEpisodeFile.value = config.naming_templates.episode_file || "";
       }
       if (config.trackers) {
         settingTrackers = [...config.trackers];
@@ -2892,10 +3002,11 @@ async function searchBatchShow(query) {
 
 async function selectBatchShow(showId) {
   try {
-    // Fetch show details
-    const data = await window.api.fetch(`/tmdb/tv/${showId}`);
+    // Fetch show details and every season's episodes in one call
+    const data = await window.api.fetch(`/tmdb/tv/${showId}/bundle`);
     const show = data.show;
     batchSelectedShow = show;
+    batchSeasonEpisodes = new Map(data.seasons.map(season => [season.season_number, season.episodes]));
     
     // Hide search, show selected display
     batchShowSearch.style.display = "none";
@@ -2936,6 +3047,7 @@ async function selectBatchShow(showId) {
 changeShowBtn.addEventListener("click", () => {
   batchSelectedShow = null;
   batchSeasons = [];
+  batchSeasonEpisodes = new Map();
   selectedShowDisplay.classList.remove("show");
   batchShowSearch.style.display = "block";
   batchShowSearch.value = "";
@@ -2960,9 +3072,8 @@ batchSeasonSelect.addEventListener("change", async () => {
   if (!seasonNumber || !batchSelectedShow) return;
   
   try {
-    // Fetch episodes for this season
-    const seasonData = await window.api.fetch(`/tmdb/tv/${batchSelectedShow.id}/season/${seasonNumber}`);
-    const episodes = seasonData.episodes || [];
+    // Episodes were fetched with the show
+    const episodes = batchSeasonEpisodes.get(seasonNumber) || [];
     
     // Create assignment list
     episodeAssignmentList.innerHTML = batchEpisodes.map((file, index) => `
@@ -2972,7 +3083,7 @@ batchSeasonSelect.addEventListener("change", async () => {
         <select class="assignment-episode-select" data-file-index="${index}">
           <option value="">Unassigned</option>
           ${episodes.map(ep => 
-            `<option value="${ep.episode_number}">E${ep.episode_number.toString().padStart(2, '0')} - ${ep.name}</option>`
+            `<option value="${ep.episode_number}"${guessedEpisode(file, seasonNumber) === ep.episode_number ? " selected" : ""}>E${ep.episode_number.toString().padStart(2, '0')} - ${ep.name}</option>`
           ).join("")}
         </select>
       </div>
@@ -2982,6 +3093,7 @@ batchSeasonSelect.addEventListener("change", async () => {
     document.querySelectorAll(".assignment-episode-select").forEach(select => {
       select.addEventListener("change", checkBatchAssignments);
     });
+    checkBatchAssignments();
     
     // Update step states
     document.getElementById("batch-step-2").classList.remove("step-active");
@@ -2995,6 +3107,47 @@ batchSeasonSelect.addEventListener("change", async () => {
   }
 });
 
+// Episode number parsed from the filename, if it belongs to the selected season
+function guessedEpisode(file, seasonNumber) {
+  if (!file.parsed || typeof file.parsed.episode !== "number") return null;
+  if (file.parsed.season !== undefined && file.parsed.season !== seasonNumber) return null;
+  return file.parsed.episode;
+}
+
+// Episode torrent request for a parsed batch file, named from the selected show's episode list
+function batchEpisodeRequest(parseData, seasonNumber, episodeNumber) {
+  const show = batchSelectedShow;
+  const parsed = parseData.parsed || {};
+  const metadata = parseData.metadata || {};
+  const episode = (batchSeasonEpisodes.get(seasonNumber) || [])
+    .find(ep => ep.episode_number === episodeNumber) || {};
+
+  return {
+    folder_path: parseData.target_folder,
+    name: show.name,
+    show_name: show.name,
+    season: seasonNumber,
+    episode: episodeNumber,
+    episode_title: episode.name || "",
+    year: show.year || "",
+    runtime: metadata.duration || (episode.runtime ? `${episode.runtime} min` : ""),
+    size: metadata.file_size || "",
+    language: show.spoken_languages[0] || parsed.language || "",
+    resolution: metadata.resolution || parsed.resolution || "",
+    source: normalizeSource(parsed.source),
+    video_codec: metadata.video_codec || parsed.video_codec || "",
+    audio_codec: metadata.audio_codec || parsed.audio_codec || "",
+    container: (parsed.container || "").toUpperCase(),
+    release_group: parsed.release_group || cachedReleaseGroup,
+    tmdb_id: String(show.tmdb_id),
+    imdb_id: show.imdb_id || "",
+    overview: episode.overview || "",
+    bit_depth: metadata.bit_depth || "",
+    hdr_format: metadata.hdr_format || "",
+    audio_channels: metadata.audio_channels || "",
+  };
+}
+
 function checkBatchAssignments() {
   const selects = document.querySelectorAll(".assignment-episode-select");
   let allAssigned = true;
@@ -3076,13 +3229,7 @@ async function createBatchTorrents() {
       // Create torrent with TMDB metadata
       await window.api.fetch("/create-episode-torrent", {
         method: "POST",
-        body: JSON.stringify({
-          filepath: file.filepath,
-          target_folder: parseData.target_folder,
-          tmdb_id: batchSelectedShow.id,
-          season_number: seasonNumber,
-          episode_number: file.assignedEpisode
-        })
+        body: JSON.stringify(batchEpisodeRequest(parseData, seasonNumber, file.assignedEpisode))
       });
       
       file.status = "success";